@@ -2,9 +2,11 @@ import logging
 
 import networkx as nx
 import numpy as np
+from scipy.sparse.csgraph import csgraph_from_dense, shortest_path
 
 import mapel.core.persistence.experiment_exports as exports
 import mapel.core.printing as pr
+from mapel.core.objects.DistanceMatrix import as_distance_matrix
 from mapel.core.embedding.kamada_kawai.kamada_kawai import KamadaKawai
 from mapel.core.embedding.simulated_annealing.simulated_annealing import SimulatedAnnealing
 
@@ -25,6 +27,31 @@ except ImportError as error:
     print(error)
 
 
+def complete_distances(x: np.ndarray, missing: np.ndarray) -> np.ndarray:
+    """
+    Fills in the missing distances (e.g., of a graph of nearest neighbors)
+    with the lengths of the shortest paths between the instances.
+
+    Parameters
+    ----------
+        x : np.ndarray
+            Matrix of distances.
+        missing : np.ndarray
+            Mask of the missing distances.
+    Returns
+    -------
+        np.ndarray
+            Completed matrix of distances.
+    """
+    graph = csgraph_from_dense(np.where(missing, np.inf, x), null_value=np.inf)
+    paths = shortest_path(graph, directed=False)
+    # instances in different components are put further than all the other ones
+    unreachable = np.isinf(paths)
+    if unreachable.any():
+        paths[unreachable] = 2 * paths[~unreachable].max(initial=1.)
+    return paths
+
+
 def embed(experiment_id,
           embedding_id: str = None,
           num_iterations: int = 1000,
@@ -49,48 +76,38 @@ def embed(experiment_id,
         if embedding_id in {'fr', 'spring'}:
             attraction_factor = 2
 
-    num_elections = len(experiment_id.distances)
-
-    x = np.zeros((num_elections, num_elections))
+    distances = as_distance_matrix(experiment_id.distances)
+    instance_ids = distances.ids
 
     initial_positions = None
 
     if init_pos is not None:
         initial_positions = {}
-        for i, instance_id_1 in enumerate(experiment_id.distances):
+        for i, instance_id_1 in enumerate(instance_ids):
             if instance_id_1 in init_pos:
                 initial_positions[i] = init_pos[instance_id_1]
 
-    for i, instance_id_1 in enumerate(experiment_id.distances):
-        for j, instance_id_2 in enumerate(experiment_id.distances):
-            if i < j:
-
-                experiment_id.distances[instance_id_1][instance_id_2] *= factor
-                if embedding_id in {'fr', 'spring'}:
-                    if experiment_id.distances[instance_id_1][instance_id_2] == 0.:
-                        experiment_id.distances[instance_id_1][instance_id_2] = zero_distance
-                        experiment_id.distances[instance_id_2][instance_id_1] = zero_distance
-                    normal = True
-                    if experiment_id.distances[instance_id_1][instance_id_2] > radius:
-                        x[i][j] = 0.
-                        normal = False
-                    if num_neighbors is not None:
-                        tmp = experiment_id.distances[instance_id_1]
-                        sorted_list_1 = list((dict(sorted(tmp.items(),
-                                                          key=lambda item: item[1]))).keys())
-                        tmp = experiment_id.distances[instance_id_2]
-                        sorted_list_2 = list((dict(sorted(tmp.items(),
-                                                          key=lambda item: item[1]))).keys())
-                        if (instance_id_1 not in sorted_list_2[0:num_neighbors]) and (
-                                instance_id_2 not in sorted_list_1[0:num_neighbors]):
-                            x[i][j] = 0.
-                            normal = False
-                    if normal:
-                        x[i][j] = 1. / experiment_id.distances[instance_id_1][instance_id_2]
-                else:
-                    x[i][j] = experiment_id.distances[instance_id_1][instance_id_2]
-                x[i][j] = x[i][j] ** attraction_factor
-                x[j][i] = x[i][j]
+    x = distances.matrix * factor
+    off_diagonal = ~np.eye(len(instance_ids), dtype=bool)
+    # missing distances (e.g., of a sparse graph of nearest neighbors)
+    missing = np.isnan(x) & off_diagonal
+    x = np.nan_to_num(x)
+    np.fill_diagonal(x, 0.)
+
+    if embedding_id in {'fr', 'spring'}:
+        x[(x == 0.) & off_diagonal] = zero_distance
+        normal = off_diagonal & ~missing & (x <= radius)
+        if num_neighbors is not None:
+            ranked = np.where(off_diagonal & ~missing, x, np.inf)
+            nearest = np.argsort(ranked, axis=1, kind='stable')[:, :num_neighbors]
+            is_neighbor = np.zeros_like(normal)
+            np.put_along_axis(is_neighbor, nearest, True, axis=1)
+            normal &= is_neighbor | is_neighbor.T
+        x = np.divide(1., x, out=np.zeros_like(x), where=normal)
+    elif missing.any():
+        x = complete_distances(x, missing)
+
+    x = x ** attraction_factor
 
     dt = [('weight', float)]
     y = x.view(dt)
@@ -156,7 +173,7 @@ def embed(experiment_id,
         logging.warning("Unknown method!")
 
     experiment_id.coordinates = {}
-    for i, instance_id in enumerate(experiment_id.distances):
+    for i, instance_id in enumerate(instance_ids):
         experiment_id.coordinates[instance_id] = [my_pos[i][d] for d in range(dim)]
 
     pr.adjust_the_map(experiment_id, left=left, up=up, right=right, down=down)
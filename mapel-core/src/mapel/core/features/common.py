@@ -2,20 +2,15 @@ from typing import List, Dict
 
 import numpy as np
 
+from mapel.core.objects.DistanceMatrix import as_distance_matrix
 from mapel.core.objects.Experiment import Experiment
 
 
 def extract_selected_distances(experiment: Experiment, election_ids: List[str]):
-    n = len(election_ids)
+    distances = np.array(as_distance_matrix(experiment.distances).submatrix(election_ids))
+    distances = np.triu(distances, k=1)
 
-    distances = np.zeros(shape=(n, n))
-    for i in range(n):
-        for j in range(i + 1, n):
-            election_id_1 = election_ids[i]
-            election_id_2 = election_ids[j]
-            distances[i, j] = distances[j, i] = experiment.distances[election_id_1][election_id_2]
-
-    return distances
+    return distances + distances.T
 
 
 def extract_selected_coordinates(coordinates: Dict, election_ids: List[str]):
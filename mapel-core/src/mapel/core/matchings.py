@@ -1,8 +1,14 @@
-import gurobipy as gp
 import numpy as np
-from gurobipy import GRB
 from scipy.optimize import linear_sum_assignment
 
+from mapel.core.qap import QuadraticAssignment
+
+try:
+    import gurobipy as gp
+    from gurobipy import GRB
+except ImportError:
+    gp = None
+
 
 def solve_matching_vectors(cost_table) -> (float, list):
     """
@@ -30,7 +36,8 @@ def solve_matching_matrices(
         inner_distance
 ) -> float:
     """
-    Computes the minimal distance between two matrices.
+    Computes the minimal distance between two matrices
+    (exactly, with Branch-and-Bound -- suitable for small matrices).
 
     Parameters
     ----------
@@ -47,6 +54,67 @@ def solve_matching_matrices(
         float
             Objective value
     """
+    objective_value, _ = QuadraticAssignment(matrix_1, matrix_2, inner_distance).solve_bb()
+    return objective_value
+
+
+def solve_matching_matrices_approx(
+        matrix_1,
+        matrix_2,
+        length,
+        inner_distance
+) -> (float, list):
+    """
+    Computes an upper bound on the minimal distance between two matrices
+    (with the Frank-Wolfe relaxation and 2-opt refinement).
+
+    Parameters
+    ----------
+        matrix_1
+           First square matrix.
+        matrix_2
+            Second square matrix.
+        length
+            Length of the matrix.
+        inner_distance
+            The inner distance (like L1 or L2).
+    Returns
+    -------
+        (float, list)
+            Objective value, Matching (for every row of the second matrix, the matched
+            row of the first one -- as in solve_matching_vectors)
+    """
+    objective_value, mapping = QuadraticAssignment(matrix_1, matrix_2, inner_distance).solve_faq()
+    return objective_value, list(np.argsort(mapping))
+
+
+def solve_matching_matrices_gurobi(
+        matrix_1,
+        matrix_2,
+        length,
+        inner_distance
+) -> float:
+    """
+    Computes the minimal distance between two matrices (using Gurobi).
+
+    Parameters
+    ----------
+        matrix_1
+           First square matrix.
+        matrix_2
+            Second square matrix.
+        length
+            Length of the matrix.
+        inner_distance
+            The inner distance (like L1 or L2).
+    Returns
+    -------
+        float
+            Objective value
+    """
+
+    if gp is None:
+        raise ImportError("`gurobipy` module not found")
 
     m = gp.Model()
     m.ModelSense = GRB.MINIMIZE
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+"""
+Vantage-point tree (VP-tree) over the instances of an experiment.
+
+Every node picks a vantage instance and splits the remaining instances by the
+median of their distances to it. Since the distance (e.g., emd-positionwise)
+satisfies the triangle inequality, a query skips the subtrees which cannot
+contain instances closer than the current k-th nearest one (or the radius).
+The tree is stored in flat arrays, so it can be saved with the experiment.
+"""
+
+import heapq
+from typing import Callable
+
+import numpy as np
+
+
+class VPTree:
+    """ Vantage-point tree over instances given by their ids """
+
+    def __init__(self,
+                 instance_ids: list,
+                 vantage: np.ndarray,
+                 thresholds: np.ndarray,
+                 inside: np.ndarray,
+                 outside: np.ndarray,
+                 buckets: np.ndarray,
+                 bucket_items: np.ndarray,
+                 content_hash: str = None):
+        self.instance_ids = list(instance_ids)
+        # vantage[node] is -1 for leaves, whose items are
+        # bucket_items[buckets[node]:buckets[node + 1]]
+        self.vantage = vantage
+        self.thresholds = thresholds
+        self.inside = inside
+        self.outside = outside
+        self.buckets = buckets
+        self.bucket_items = bucket_items
+        # hash of the instances the tree was built for (the thresholds are valid only for them)
+        self.content_hash = content_hash
+        self.num_evaluations = 0
+
+    @classmethod
+    def build(cls,
+              instance_ids: list,
+              distance: Callable,
+              leaf_size: int = 8,
+              seed: int = 0):
+        """
+        Builds the tree.
+
+        Parameters
+        ----------
+            instance_ids : list
+                Ids of the instances.
+            distance : Callable
+                Distance between two instances (given by their ids).
+            leaf_size : int
+                Maximal number of instances in a leaf.
+            seed : int
+                Seed of the random choice of the vantage instances.
+        Returns
+        -------
+            VPTree
+                The tree.
+        """
+        rng = np.random.default_rng(seed)
+        vantage, thresholds, inside, outside = [], [], [], []
+        buckets, bucket_items = [], []
+
+        def add_node(items: list) -> int:
+            node = len(vantage)
+            vantage.append(-1)
+            thresholds.append(0.)
+            inside.append(-1)
+            outside.append(-1)
+            buckets.append(len(bucket_items))
+            if len(items) <= leaf_size:
+                bucket_items.extend(items)
+                return node
+            point = items[rng.integers(len(items))]
+            others = [item for item in items if item != point]
+            values = np.array([distance(instance_ids[point], instance_ids[item])
+                               for item in others])
+            threshold = float(np.median(values))
+            vantage[node] = point
+            thresholds[node] = threshold
+            near = [item for item, value in zip(others, values) if value < threshold]
+            far = [item for item, value in zip(others, values) if value >= threshold]
+            if not near:
+                # (almost) all the instances are equally distant, so they are not split
+                vantage[node] = -1
+                bucket_items.extend(items)
+                return node
+            inside[node] = add_node(near)
+            outside[node] = add_node(far)
+            return node
+
+        add_node(list(range(len(instance_ids))))
+        buckets.append(len(bucket_items))
+        return cls(instance_ids,
+                   np.array(vantage, dtype=np.int64),
+                   np.array(thresholds, dtype=float),
+                   np.array(inside, dtype=np.int64),
+                   np.array(outside, dtype=np.int64),
+                   np.array(buckets, dtype=np.int64),
+                   np.array(bucket_items, dtype=np.int64))
+
+    def _search(self, distance_to: Callable, k: int = None, radius: float = np.inf) -> list:
+        # max-heap (by negated distance) of the best instances found so far
+        best = []
+
+        def tau() -> float:
+            if k is not None and len(best) == k:
+                return min(radius, -best[0][0])
+            return radius
+
+        def consider(item: int) -> float:
+            value = distance_to(self.instance_ids[item])
+            self.num_evaluations += 1
+            if value <= tau():
+                heapq.heappush(best, (-value, item))
+                if k is not None and len(best) > k:
+                    heapq.heappop(best)
+            return value
+
+        # nodes with lower bounds on the distances to their instances
+        stack = [(0, 0.)]
+        while stack:
+            node, bound = stack.pop()
+            if node < 0 or bound > tau():
+                continue
+            if self.vantage[node] < 0:
+                for item in self.bucket_items[self.buckets[node]:self.buckets[node + 1]]:
+                    consider(int(item))
+                continue
+            value = consider(int(self.vantage[node]))
+            threshold = self.thresholds[node]
+            inside = (self.inside[node], max(bound, value - threshold))
+            outside = (self.outside[node], max(bound, threshold - value))
+            # the subtree containing the query is visited first
+            if value < threshold:
+                stack.extend([outside, inside])
+            else:
+                stack.extend([inside, outside])
+        return sorted((-value, item) for value, item in best)
+
+    def query(self, distance_to: Callable, k: int = 1) -> list:
+        """
+        Finds the k nearest instances.
+
+        Parameters
+        ----------
+            distance_to : Callable
+                Distance from the query to an instance (given by its id).
+            k : int
+                Number of the nearest instances.
+        Returns
+        -------
+            list
+                Pairs (instance_id, distance), from the nearest one.
+        """
+        return [(self.instance_ids[item], value)
+                for value, item in self._search(distance_to, k=k)]
+
+    def query_radius(self, distance_to: Callable, radius: float) -> list:
+        """
+        Finds all the instances within a given distance.
+
+        Parameters
+        ----------
+            distance_to : Callable
+                Distance from the query to an instance (given by its id).
+            radius : float
+                Maximal distance.
+        Returns
+        -------
+            list
+                Pairs (instance_id, distance), from the nearest one.
+        """
+        return [(self.instance_ids[item], value)
+                for value, item in self._search(distance_to, radius=radius)]
+
+    def to_arrays(self) -> dict:
+        """ Return: arrays describing the tree (see from_arrays) """
+        arrays = {'instance_ids': np.array(self.instance_ids, dtype=str),
+                  'vantage': self.vantage,
+                  'thresholds': self.thresholds,
+                  'inside': self.inside,
+                  'outside': self.outside,
+                  'buckets': self.buckets,
+                  'bucket_items': self.bucket_items}
+        if self.content_hash is not None:
+            arrays['content_hash'] = np.array(self.content_hash)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """ Creates the tree from the arrays returned by to_arrays """
+        return cls([str(instance_id) for instance_id in arrays['instance_ids']],
+                   arrays['vantage'],
+                   arrays['thresholds'],
+                   arrays['inside'],
+                   arrays['outside'],
+                   arrays['buckets'],
+                   arrays['bucket_items'],
+                   str(arrays['content_hash']) if 'content_hash' in arrays.files else None)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+from typing import Iterable
+
+import numpy as np
+
+
+class DistanceRow:
+    """ Dict-like view of a single row of a distance matrix """
+
+    def __init__(self, matrix, index: int):
+        self._matrix = matrix
+        self._index = index
+
+    def _present(self) -> np.ndarray:
+        return np.flatnonzero(~np.isnan(self._matrix.matrix[self._index]))
+
+    def __getitem__(self, instance_id):
+        value = self._matrix.matrix[self._index, self._matrix.index[instance_id]]
+        if np.isnan(value):
+            raise KeyError(instance_id)
+        return float(value)
+
+    def __setitem__(self, instance_id, value) -> None:
+        if instance_id not in self._matrix.index:
+            self._matrix.add_ids([instance_id])
+        self._matrix.matrix[self._index, self._matrix.index[instance_id]] = value
+
+    def __delitem__(self, instance_id) -> None:
+        self._matrix.matrix[self._index, self._matrix.index[instance_id]] = np.nan
+
+    def __contains__(self, instance_id) -> bool:
+        return instance_id in self._matrix.index and \
+            not np.isnan(self._matrix.matrix[self._index, self._matrix.index[instance_id]])
+
+    def __iter__(self):
+        ids = self._matrix.ids
+        return iter([ids[j] for j in self._present()])
+
+    def __len__(self) -> int:
+        return len(self._present())
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def get(self, instance_id, default=None):
+        try:
+            return self[instance_id]
+        except KeyError:
+            return default
+
+    def keys(self) -> list:
+        return list(self)
+
+    def values(self) -> list:
+        row = self._matrix.matrix[self._index]
+        return [float(row[j]) for j in self._present()]
+
+    def items(self) -> list:
+        ids = self._matrix.ids
+        row = self._matrix.matrix[self._index]
+        return [(ids[j], float(row[j])) for j in self._present()]
+
+
+class DistanceMatrix:
+    """
+    Square matrix of values (distances, times, stds) between pairs of instances.
+
+    The values are kept in a single NumPy array (missing pairs are NaN) together
+    with the instance_id -> index map. Indexing with an instance id returns a
+    dict-like row, so `matrix[instance_id_1][instance_id_2]` works as for
+    a dict of dicts, while `matrix.matrix` gives the underlying array.
+    """
+
+    def __init__(self,
+                 instance_ids: Iterable = None,
+                 matrix: np.ndarray = None,
+                 dtype=float):
+        self.ids = [] if instance_ids is None else list(instance_ids)
+        self.index = {instance_id: i for i, instance_id in enumerate(self.ids)}
+        num_instances = len(self.ids)
+        if matrix is None:
+            self._data = np.full((num_instances, num_instances), np.nan, dtype=dtype)
+        else:
+            self._data = np.asarray(matrix, dtype=dtype)
+            if self._data.shape != (num_instances, num_instances):
+                raise ValueError(f'Matrix of shape {self._data.shape} does not match '
+                                 f'{num_instances} instances.')
+
+    @classmethod
+    def from_dict(cls, distances: dict, dtype=float):
+        """ Creates a matrix from a dict of dicts """
+        if isinstance(distances, cls):
+            return distances
+        instance_ids = list(distances)
+        for row in distances.values():
+            instance_ids.extend(row)
+        instance_ids = list(dict.fromkeys(instance_ids))
+        matrix = cls(instance_ids, dtype=dtype)
+        for instance_id_1, row in distances.items():
+            i = matrix.index[instance_id_1]
+            for instance_id_2, value in row.items():
+                matrix._data[i, matrix.index[instance_id_2]] = value
+        return matrix
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """ Underlying (num_instances x num_instances) array (no copy) """
+        return self._data[:len(self.ids), :len(self.ids)]
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes of the underlying array (including the spare capacity) """
+        return self._data.nbytes
+
+    def add_ids(self, instance_ids: Iterable) -> None:
+        """ Adds new instances (with all their values missing) """
+        new_ids = [instance_id for instance_id in dict.fromkeys(instance_ids)
+                   if instance_id not in self.index]
+        if not new_ids:
+            return
+        for instance_id in new_ids:
+            self.index[instance_id] = len(self.ids)
+            self.ids.append(instance_id)
+        num_instances = len(self.ids)
+        if num_instances > self._data.shape[0]:
+            capacity = max(num_instances, 2 * self._data.shape[0])
+            data = np.full((capacity, capacity), np.nan, dtype=self._data.dtype)
+            old_size = num_instances - len(new_ids)
+            data[:old_size, :old_size] = self._data[:old_size, :old_size]
+            self._data = data
+
+    def submatrix(self, instance_ids: Iterable) -> np.ndarray:
+        """ Returns the matrix restricted to (and ordered by) the given instances """
+        instance_ids = list(instance_ids)
+        if instance_ids == self.ids:
+            return self.matrix
+        indices = np.array([self.index[instance_id] for instance_id in instance_ids], dtype=int)
+        return self.matrix[np.ix_(indices, indices)]
+
+    def to_dict(self) -> dict:
+        """ Converts the matrix to a dict of dicts """
+        return {instance_id: dict(self[instance_id].items()) for instance_id in self.ids}
+
+    def copy(self):
+        return DistanceMatrix(self.ids, self.matrix.copy(), dtype=self._data.dtype)
+
+    def __getitem__(self, instance_id) -> DistanceRow:
+        return DistanceRow(self, self.index[instance_id])
+
+    def __setitem__(self, instance_id, row) -> None:
+        self.add_ids([instance_id])
+        self.add_ids(row)
+        i = self.index[instance_id]
+        self.matrix[i] = np.nan
+        for instance_id_2, value in row.items():
+            self.matrix[i, self.index[instance_id_2]] = value
+
+    def __contains__(self, instance_id) -> bool:
+        return instance_id in self.index
+
+    def __iter__(self):
+        return iter(list(self.ids))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self) -> str:
+        return f'DistanceMatrix({len(self.ids)} instances)'
+
+    def get(self, instance_id, default=None):
+        if instance_id in self.index:
+            return self[instance_id]
+        return default
+
+    def keys(self) -> list:
+        return list(self.ids)
+
+    def values(self) -> list:
+        return [self[instance_id] for instance_id in self.ids]
+
+    def items(self) -> list:
+        return [(instance_id, self[instance_id]) for instance_id in self.ids]
+
+
+class CrossDistanceMatrix:
+    """
+    Rectangular matrix of values (distances, times) between the instances of two
+    experiments: the rows correspond to the instances of the first experiment and
+    the columns to the instances of the second one (missing pairs are NaN).
+    `matrix[row_id][column_id]` works as for a dict of dicts.
+    """
+
+    def __init__(self,
+                 row_ids: Iterable = None,
+                 column_ids: Iterable = None,
+                 matrix: np.ndarray = None,
+                 dtype=float):
+        self.row_ids = [] if row_ids is None else list(row_ids)
+        self.column_ids = [] if column_ids is None else list(column_ids)
+        self.row_index = {instance_id: i for i, instance_id in enumerate(self.row_ids)}
+        self.column_index = {instance_id: j for j, instance_id in enumerate(self.column_ids)}
+        shape = (len(self.row_ids), len(self.column_ids))
+        if matrix is None:
+            self._data = np.full(shape, np.nan, dtype=dtype)
+        else:
+            self._data = np.asarray(matrix, dtype=dtype)
+            if self._data.shape != shape:
+                raise ValueError(f'Matrix of shape {self._data.shape} does not match '
+                                 f'{shape[0]} x {shape[1]} instances.')
+
+    # the rows (DistanceRow) look the columns up by ids and index
+    @property
+    def ids(self) -> list:
+        return self.column_ids
+
+    @property
+    def index(self) -> dict:
+        return self.column_index
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """ Underlying (num_rows x num_columns) array (no copy) """
+        return self._data
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes of the underlying array """
+        return self._data.nbytes
+
+    def add_ids(self, instance_ids: Iterable) -> None:
+        raise KeyError(f'Unknown columns: {list(instance_ids)}')
+
+    def transpose(self):
+        """ Returns the matrix with the rows and the columns swapped """
+        return CrossDistanceMatrix(self.column_ids, self.row_ids, self._data.T.copy(),
+                                   dtype=self._data.dtype)
+
+    def to_dict(self) -> dict:
+        """ Converts the matrix to a dict of dicts """
+        return {instance_id: dict(self[instance_id].items()) for instance_id in self.row_ids}
+
+    def __getitem__(self, instance_id) -> DistanceRow:
+        return DistanceRow(self, self.row_index[instance_id])
+
+    def __contains__(self, instance_id) -> bool:
+        return instance_id in self.row_index
+
+    def __iter__(self):
+        return iter(list(self.row_ids))
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def __repr__(self) -> str:
+        return f'CrossDistanceMatrix({len(self.row_ids)} x {len(self.column_ids)} instances)'
+
+
+def as_distance_matrix(distances) -> DistanceMatrix:
+    """ Converts a dict of dicts to a DistanceMatrix (DistanceMatrix is returned as is) """
+    if isinstance(distances, DistanceMatrix):
+        return distances
+    return DistanceMatrix.from_dict(distances)
@@ -14,7 +14,9 @@ import mapel.core.embedding.embed as embed
 import mapel.core.persistence.experiment_exports as exports
 import mapel.core.persistence.experiment_imports as imports
 import mapel.core.printing as pr
+from mapel.core.objects.DistanceMatrix import DistanceMatrix
 from mapel.core.objects.Family import Family
+from mapel.core.scheduler import DistanceScheduler
 
 COLORS = []
 
@@ -37,12 +39,19 @@ class Experiment:
                  fast_import: bool = False,
                  with_matrix: bool = False,
                  instance_type: str = None,
-                 dim: int = 2):
+                 dim: int = 2,
+                 distances_format: str = 'csv',
+                 lazy_import: bool = False,
+                 max_resident_instances: int = None):
 
+        self.scheduler = None
+        self.distances_format = distances_format
         self.is_imported = is_imported
         self.is_exported = is_exported
         self.fast_import = fast_import
         self.with_matrix = with_matrix
+        self.lazy_import = lazy_import
+        self.max_resident_instances = max_resident_instances
         self.distance_id = distance_id
         self.embedding_id = embedding_id
         self.instance_type = instance_type
@@ -53,8 +62,8 @@ class Experiment:
         self.features = {}
         self.cultures = {}
         self.families = {}
-        self.times = {}
-        self.stds = {}
+        self.times = DistanceMatrix()
+        self.stds = DistanceMatrix()
         self.matchings = {}
         self.coordinates_by_families = {}
         self.mappings = {}
@@ -80,7 +89,7 @@ class Experiment:
             self.import_coordinates(coordinates, coordinates_names)
         else:
             self.instances = {}
-            self.distances = {}
+            self.distances = DistanceMatrix()
             self.coordinates = {}
 
     def import_instances(self, instances):
@@ -97,13 +106,19 @@ class Experiment:
             self.instances = {}
 
     def import_distances(self, distances):
-        if isinstance(distances, dict):
-            self.distances = distances
+        if isinstance(distances, (dict, DistanceMatrix)):
+            self.distances = DistanceMatrix.from_dict(distances)
         elif self.is_imported and self.experiment_id is not None:
             self.distances, self.times, self.stds, self.mappings = \
                 imports.add_distances_to_experiment(self)
         else:
-            self.distances = {}
+            self.distances = DistanceMatrix()
+
+    def convert_distances_to_npy(self, distance_id: str = None) -> None:
+        """ Convert distances stored in a .csv file to (memory-mappable) .npy files """
+        if distance_id is None:
+            distance_id = self.distance_id
+        exports.convert_distances_to_npy(self, distance_id)
 
     def import_coordinates(self, coordinates, coordinates_names, dim=None):
         if dim is None:
@@ -127,6 +142,14 @@ class Experiment:
         else:
             self.coordinates = {}
 
+    def get_scheduler(self, num_processes: int) -> DistanceScheduler:
+        """ Return the (reusable) pool of processes used for computing distances """
+        if self.scheduler is None or self.scheduler.num_processes != num_processes:
+            if self.scheduler is not None:
+                self.scheduler.close()
+            self.scheduler = DistanceScheduler(num_processes)
+        return self.scheduler
+
     def reset_cultures(self):
         self.families = {}
         self.num_families = 0
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Callable, Iterable, Iterator
+
+
+class LazyInstances(MutableMapping):
+    """
+    Dict-like collection of instances that are imported only when they are accessed.
+
+    The ids of all the instances are known upfront (so iterating over the ids,
+    len and `in` never import anything). An instance is imported by `load` on
+    the first access and kept in memory; with max_resident set, the least
+    recently used instances are dropped when more of them are resident (they
+    are imported again on the next access, so everything computed on them
+    in the meantime, e.g., their matrices or features, is lost too).
+
+    Instances added by assignment (e.g., new elections that are not stored on
+    disk) are never dropped.
+    """
+
+    def __init__(self,
+                 instance_ids: Iterable,
+                 load: Callable,
+                 max_resident: int = None):
+        self._ids = dict.fromkeys(instance_ids)
+        self._load = load
+        self.max_resident = max_resident
+        self._resident = OrderedDict()
+        self._pinned = {}
+        self.num_loads = 0
+
+    def __getitem__(self, instance_id):
+        if instance_id in self._pinned:
+            return self._pinned[instance_id]
+        if instance_id in self._resident:
+            self._resident.move_to_end(instance_id)
+            return self._resident[instance_id]
+        if instance_id not in self._ids:
+            raise KeyError(instance_id)
+        instance = self._load(instance_id)
+        self.num_loads += 1
+        self._resident[instance_id] = instance
+        self._evict()
+        return instance
+
+    def __setitem__(self, instance_id, instance) -> None:
+        self._ids[instance_id] = None
+        self._resident.pop(instance_id, None)
+        self._pinned[instance_id] = instance
+
+    def __delitem__(self, instance_id) -> None:
+        del self._ids[instance_id]
+        self._resident.pop(instance_id, None)
+        self._pinned.pop(instance_id, None)
+
+    def __iter__(self) -> Iterator:
+        return iter(list(self._ids))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, instance_id) -> bool:
+        return instance_id in self._ids
+
+    def __repr__(self) -> str:
+        return f'LazyInstances({len(self)} instances, {self.num_resident} resident)'
+
+    @property
+    def num_resident(self) -> int:
+        """ Number of the instances kept in memory """
+        return len(self._resident) + len(self._pinned)
+
+    def is_resident(self, instance_id) -> bool:
+        return instance_id in self._resident or instance_id in self._pinned
+
+    def resident_items(self) -> list:
+        """ Return: (instance_id, instance) pairs of the instances kept in memory """
+        return list(self._pinned.items()) + list(self._resident.items())
+
+    def _evict(self) -> None:
+        """ Drops the least recently used instances (above the limit) """
+        if self.max_resident is None:
+            return
+        while len(self._resident) > max(self.max_resident, 1):
+            self._resident.popitem(last=False)
+
+    def release(self) -> None:
+        """ Drops all the imported instances (the assigned ones are kept) """
+        self._resident.clear()
+
+    def prefetch(self, instance_ids: Iterable) -> None:
+        """ Imports the instances (the last ones become the most recently used) """
+        for instance_id in dict.fromkeys(instance_ids):
+            self[instance_id]
+
+    def get_block_size(self) -> int:
+        """ Return: number of instances in a block of ordered pairs (see order_pairs) """
+        if self.max_resident is None:
+            return len(self)
+        return max(1, self.max_resident // 2)
+
+    def order_pairs(self, pairs: list) -> list:
+        """
+        Orders the pairs of instance ids by blocks, so that both blocks
+        of every consecutive group of pairs fit in memory together.
+
+        The instances are split into blocks (in the order of the ids) of at
+        most half of the resident instances, and the pairs are grouped by their
+        pair of blocks. Each instance is then imported once per block instead of
+        (possibly) once per pair.
+        """
+        block_size = self.get_block_size()
+        if block_size >= len(self):
+            return list(pairs)
+        position = {instance_id: i for i, instance_id in enumerate(self._ids)}
+
+        def block_key(pair):
+            block_1 = position[pair[0]] // block_size
+            block_2 = position[pair[1]] // block_size
+            return min(block_1, block_2), max(block_1, block_2)
+
+        # the sort is stable, so the pairs keep their order within the blocks
+        return sorted(pairs, key=block_key)
+
+    def iterate_pairs(self, pairs: list) -> Iterator:
+        """
+        Yields the pairs (in the given order), importing the instances of the
+        next group of pairs (fitting in memory) before the group is yielded.
+        """
+        if self.max_resident is None:
+            yield from pairs
+            return
+        limit = max(1, self.max_resident)
+        start = 0
+        while start < len(pairs):
+            group = {}
+            end = start
+            while end < len(pairs):
+                new_ids = [instance_id for instance_id in pairs[end] if instance_id not in group]
+                if group and len(group) + len(new_ids) > limit:
+                    break
+                group.update(dict.fromkeys(new_ids))
+                end += 1
+            self.prefetch(group)
+            yield from pairs[start:end]
+            start = end
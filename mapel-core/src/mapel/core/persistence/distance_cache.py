@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+On-disk (SQLite) cache of computed distances shared between experiments.
+
+The entries are addressed by keys computed from the content of the instances
+(and the name of the distance), so the same pair of instances appearing in
+different experiments is computed only once. The cache is bounded by the number
+of entries, the least recently used entries are evicted first.
+"""
+
+import os
+import sqlite3
+from time import time
+
+import numpy as np
+
+from mapel.core.utils import make_folder_if_do_not_exist
+
+DEFAULT_MAX_ENTRIES = 10 ** 6
+
+# Maximal number of keys in a single SELECT ... IN (...) query
+_QUERY_CHUNK = 500
+
+
+class DistanceCache:
+    """ SQLite store of distances with least-recently-used eviction """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._pid = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # connections must not be shared with forked processes
+        if self._connection is None or self._pid != os.getpid():
+            make_folder_if_do_not_exist(os.path.dirname(os.path.abspath(self.path)))
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._pid = os.getpid()
+            self._connection.execute('CREATE TABLE IF NOT EXISTS distances ('
+                                     'key TEXT PRIMARY KEY, '
+                                     'distance REAL, '
+                                     'time REAL, '
+                                     'matching BLOB, '
+                                     'last_used REAL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS last_used_index '
+                                     'ON distances (last_used)')
+            self._connection.commit()
+        return self._connection
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Looks up many keys at once.
+
+        Parameters
+        ----------
+            keys : list
+                List of keys.
+        Returns
+        -------
+            dict
+                Dictionary mapping the found keys to (distance, time, matching) tuples.
+        """
+        connection = self._get_connection()
+        found = {}
+        for start in range(0, len(keys), _QUERY_CHUNK):
+            chunk = keys[start:start + _QUERY_CHUNK]
+            rows = connection.execute(
+                f'SELECT key, distance, time, matching FROM distances '
+                f'WHERE key IN ({",".join("?" * len(chunk))})', chunk)
+            for key, distance, time_, matching in rows:
+                if matching is not None:
+                    matching = np.frombuffer(matching, dtype=np.int64).copy()
+                found[key] = (distance, time_, matching)
+        if found:
+            now = time()
+            connection.executemany('UPDATE distances SET last_used = ? WHERE key = ?',
+                                   [(now, key) for key in found])
+            connection.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str):
+        """ Returns (distance, time, matching) or None if the key is not in the cache """
+        return self.get_many([key]).get(key)
+
+    def put_many(self, entries: list) -> None:
+        """
+        Stores many entries at once.
+
+        Parameters
+        ----------
+            entries : list
+                List of (key, distance, time, matching) tuples.
+        """
+        if not entries:
+            return
+        connection = self._get_connection()
+        now = time()
+        rows = []
+        for key, distance, time_, matching in entries:
+            if matching is not None:
+                matching = np.asarray(matching, dtype=np.int64).tobytes()
+            rows.append((key, float(distance), float(time_), matching, now))
+        connection.executemany('INSERT OR REPLACE INTO distances '
+                               '(key, distance, time, matching, last_used) '
+                               'VALUES (?, ?, ?, ?, ?)', rows)
+        self._evict(connection)
+        connection.commit()
+
+    def put(self, key: str, distance: float, time_: float, matching=None) -> None:
+        self.put_many([(key, distance, time_, matching)])
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        num_entries = connection.execute('SELECT COUNT(*) FROM distances').fetchone()[0]
+        if num_entries > self.max_entries:
+            connection.execute('DELETE FROM distances WHERE key IN '
+                               '(SELECT key FROM distances ORDER BY last_used LIMIT ?)',
+                               (num_entries - self.max_entries,))
+
+    def __len__(self) -> int:
+        return self._get_connection().execute('SELECT COUNT(*) FROM distances').fetchone()[0]
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+        self._pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_pid'] = None
+        return state
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Reading the files with distances (shared by the imports and the exports).
+"""
+
+import ast
+import csv
+import os
+
+import numpy as np
+
+from mapel.core.objects.DistanceMatrix import DistanceMatrix
+
+
+def get_distances_path(experiment, file_name: str) -> str:
+    return os.path.join(os.getcwd(), 'experiments', experiment.experiment_id,
+                        'distances', file_name)
+
+
+def read_distances_rows(experiment, path, all_ids: bool = False) -> (list, dict):
+    """ Reads the rows (with both instances in the experiment, unless all_ids)
+    of a distances file """
+    pairs = []
+    columns = {}
+    with open(path, 'r', newline='') as csv_file:
+
+        reader = csv.DictReader(csv_file, delimiter=';')
+        if 'election_id_1' in reader.fieldnames:
+            id_columns = ('election_id_1', 'election_id_2')
+        else:
+            id_columns = ('instance_id_1', 'instance_id_2')
+        value_columns = [name for name in ('distance', 'time', 'std', 'mapping')
+                         if name in reader.fieldnames]
+        columns = {name: [] for name in value_columns}
+
+        for row in reader:
+            instance_id_1 = row[id_columns[0]]
+            instance_id_2 = row[id_columns[1]]
+            if not all_ids and (instance_id_1 not in experiment.instances
+                                or instance_id_2 not in experiment.instances):
+                continue
+            pairs.append((instance_id_1, instance_id_2))
+            for name in value_columns:
+                columns[name].append(row[name])
+    return pairs, columns
+
+
+def to_floats(values: list) -> np.ndarray:
+    try:
+        return np.array(values, dtype=float).reshape(len(values))
+    except (TypeError, ValueError):
+        pass
+    # some of the values are not numbers (e.g., empty), they become nan
+    floats = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        try:
+            floats[i] = float(value)
+        except (TypeError, ValueError):
+            pass
+    return floats
+
+
+def fill_symmetric(matrix: DistanceMatrix, pairs: list, values: np.ndarray) -> None:
+    indices_1 = np.array([matrix.index[instance_id_1] for instance_id_1, _ in pairs], dtype=int)
+    indices_2 = np.array([matrix.index[instance_id_2] for _, instance_id_2 in pairs], dtype=int)
+    matrix.matrix[indices_1, indices_2] = values
+    matrix.matrix[indices_2, indices_1] = values
+
+
+def read_distances_from_csv(experiment, distance_id, all_ids: bool = False) \
+        -> (DistanceMatrix, DistanceMatrix, DistanceMatrix, dict):
+    """ Return: distances, times, stds and mappings stored in a .csv file """
+    pairs, columns = read_distances_rows(experiment,
+                                         get_distances_path(experiment, f'{distance_id}.csv'),
+                                         all_ids=all_ids)
+
+    instance_ids = list(dict.fromkeys(instance_id for pair in pairs for instance_id in pair))
+    distances = DistanceMatrix(instance_ids)
+    times = DistanceMatrix(instance_ids)
+    stds = DistanceMatrix(instance_ids)
+    mappings = {instance_id: {} for instance_id in instance_ids}
+
+    for name, matrix in (('distance', distances), ('time', times), ('std', stds)):
+        if name in columns:
+            fill_symmetric(matrix, pairs, to_floats(columns[name]))
+
+    for (instance_id_1, instance_id_2), mapping in zip(pairs, columns.get('mapping', [])):
+        try:
+            mappings[instance_id_1][instance_id_2] = ast.literal_eval(str(mapping))
+            mappings[instance_id_2][instance_id_1] = np.argsort(
+                mappings[instance_id_1][instance_id_2])
+        except:
+            pass
+
+    return distances, times, stds, mappings
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Append-only journal of computed distances.
+
+Each computed distance is appended to the journal as soon as it is known, so
+that a long computation that crashes can be resumed without recomputing the
+pairs which are already in the journal.
+"""
+
+import csv
+import os
+from time import time
+
+import numpy as np
+
+from mapel.core.utils import make_folder_if_do_not_exist
+
+JOURNAL_HEADER = ["instance_id_1", "instance_id_2", "distance", "time", "mapping"]
+
+
+def get_journal_path(experiment, distance_id: str) -> str:
+    return os.path.join(os.getcwd(), "experiments", experiment.experiment_id,
+                        "distances", f'{distance_id}.journal.csv')
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as file_:
+        file_.seek(-1, os.SEEK_END)
+        return file_.read(1) == b'\n'
+
+
+def _remove_incomplete_row(path: str) -> None:
+    """ Removes the last row if it was not completely written (it has no newline) """
+    with open(path, 'rb+') as file_:
+        content = file_.read()
+        file_.truncate(content.rfind(b'\n') + 1)
+
+
+def _parse_mapping(mapping: str) -> np.ndarray or None:
+    """ Return: mapping stored in the journal (raises ValueError if it is not a permutation) """
+    if not mapping:
+        return None
+    matching = np.array(mapping.split(), dtype=int)
+    if not np.array_equal(np.sort(matching), np.arange(len(matching))):
+        raise ValueError(f'Incomplete mapping: {mapping}')
+    return matching
+
+
+class DistancesJournal:
+    """ Append-only journal of computed distances (flushed periodically to disk) """
+
+    def __init__(self,
+                 path: str,
+                 resume: bool = False,
+                 flush_every: int = 100,
+                 flush_interval: float = 10.):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._num_pending = 0
+        self._last_flush = time()
+
+        make_folder_if_do_not_exist(os.path.dirname(path))
+        is_new = not resume or not os.path.isfile(path) or os.path.getsize(path) == 0
+        if not is_new and not _ends_with_newline(path):
+            # the last row of a crashed run was not completely written
+            _remove_incomplete_row(path)
+        self._file = open(path, 'w' if is_new else 'a', newline='')
+        self._writer = csv.writer(self._file, delimiter=';')
+        if is_new:
+            self._writer.writerow(JOURNAL_HEADER)
+            self.flush()
+
+    def append(self, instance_id_1, instance_id_2, distance, time_, matching=None) -> None:
+        """ Appends a single computed distance """
+        mapping = ''
+        if matching is not None and np.ndim(matching) == 1:
+            mapping = ' '.join(str(int(x)) for x in matching)
+        self._writer.writerow([instance_id_1, instance_id_2, float(distance), float(time_),
+                               mapping])
+        self._num_pending += 1
+        if self._num_pending >= self.flush_every \
+                or time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Forces the pending rows to disk """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._num_pending = 0
+        self._last_flush = time()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def remove(self) -> None:
+        """ Closes and deletes the journal """
+        self.close()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_journal(path: str) -> list:
+    """
+    Reads the journal (skipping rows that were not completely written,
+    i.e., the last row without a newline and rows with an incomplete mapping).
+
+    Parameters
+    ----------
+        path : str
+            Path to the journal.
+    Returns
+    -------
+        list
+            List of (instance_id_1, instance_id_2, distance, time, matching) tuples.
+    """
+    results = []
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return results
+    is_last_row_complete = _ends_with_newline(path)
+    with open(path, 'r', newline='') as csv_file:
+        reader = csv.reader(csv_file, delimiter=';')
+        next(reader, None)
+        rows = list(reader)
+    if not is_last_row_complete:
+        rows = rows[:-1]
+    for row in rows:
+        if len(row) != len(JOURNAL_HEADER):
+            continue
+        try:
+            distance = float(row[2])
+            time_ = float(row[3])
+            matching = _parse_mapping(row[4])
+        except ValueError:
+            continue
+        results.append((row[0], row[1], distance, time_, matching))
+    return results
@@ -1,7 +1,11 @@
 import csv
 import os
 
+import numpy as np
+
 from mapel.core.glossary import *
+from mapel.core.objects.DistanceMatrix import as_distance_matrix
+from mapel.core.persistence.distances_files import read_distances_from_csv
 from mapel.core.utils import make_folder_if_do_not_exist
 
 
@@ -139,7 +143,8 @@ def export_distances_to_file(experiment,
                              self_distances=False,
                              ids=None):
     """
-    Exports distances between each pair of instances to a .csv file.
+    Exports distances between each pair of instances to a .csv file
+    (or to .npy files, if selected for the experiment).
 
     Parameters
     ----------
@@ -157,6 +162,10 @@ def export_distances_to_file(experiment,
             List of the Ids.
     """
 
+    if experiment.distances_format == 'npy':
+        export_distances_to_npy(experiment, distance_id, distances, times)
+        return
+
     path_to_folder = os.path.join(os.getcwd(), "experiments", experiment.experiment_id, "distances")
     make_folder_if_do_not_exist(path_to_folder)
     path = os.path.join(path_to_folder, f'{distance_id}.csv')
@@ -172,6 +181,127 @@ def export_distances_to_file(experiment,
             writer.writerow([instance_1, instance_2, distance, time_])
 
 
+def export_distances_to_npy(experiment,
+                            distance_id,
+                            distances,
+                            times=None,
+                            stds=None):
+    """
+    Exports distances (and times, stds) between each pair of instances to .npy files,
+    together with a sidecar file listing the instance ids (one per line, in the
+    order of the rows of the matrices).
+
+    Parameters
+    ----------
+        experiment : Experiment
+           Experiment object.
+        distance_id : str
+            Name of the distance.
+        distances : DistanceMatrix
+            Distances between each pair of instances.
+        times : DistanceMatrix
+            Time of calculation of each distance.
+        stds : DistanceMatrix
+            Standard deviation of each distance.
+    """
+
+    path_to_folder = os.path.join(os.getcwd(), "experiments", experiment.experiment_id, "distances")
+    make_folder_if_do_not_exist(path_to_folder)
+
+    distances = as_distance_matrix(distances)
+    np.save(os.path.join(path_to_folder, f'{distance_id}.npy'), distances.matrix)
+    for suffix, values in (('_times', times), ('_stds', stds)):
+        if values is not None:
+            np.save(os.path.join(path_to_folder, f'{distance_id}{suffix}.npy'),
+                    as_distance_matrix(values).submatrix(distances.ids))
+
+    with open(os.path.join(path_to_folder, f'{distance_id}_ids.txt'), 'w') as ids_file:
+        ids_file.writelines(f'{instance_id}\n' for instance_id in distances.ids)
+
+
+def export_cross_distances_to_file(experiment,
+                                   other_experiment_id,
+                                   distance_id,
+                                   distances,
+                                   times=None) -> None:
+    """
+    Exports distances between the instances of two experiments to a .csv file
+    (or to .npy files, together with the ids of the rows and of the columns,
+    if selected for the experiment).
+
+    Parameters
+    ----------
+        experiment : Experiment
+           Experiment object (rows).
+        other_experiment_id : str
+            Id of the other experiment (columns).
+        distance_id : str
+            Name of the distance.
+        distances : CrossDistanceMatrix
+            Distances between the instances of the experiments.
+        times : CrossDistanceMatrix
+            Time of calculation of each distance.
+    """
+    path_to_folder = os.path.join(os.getcwd(), "experiments", experiment.experiment_id,
+                                  "distances", "cross", str(other_experiment_id))
+    make_folder_if_do_not_exist(path_to_folder)
+
+    if experiment.distances_format == 'npy':
+        np.save(os.path.join(path_to_folder, f'{distance_id}.npy'), distances.matrix)
+        if times is not None:
+            np.save(os.path.join(path_to_folder, f'{distance_id}_times.npy'), times.matrix)
+        for suffix, instance_ids in (('_row_ids', distances.row_ids),
+                                     ('_column_ids', distances.column_ids)):
+            with open(os.path.join(path_to_folder, f'{distance_id}{suffix}.txt'), 'w') \
+                    as ids_file:
+                ids_file.writelines(f'{instance_id}\n' for instance_id in instance_ids)
+        return
+
+    with open(os.path.join(path_to_folder, f'{distance_id}.csv'), 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file, delimiter=';')
+        writer.writerow(["instance_id_1", "instance_id_2", "distance", "time"])
+        for i, instance_id_1 in enumerate(distances.row_ids):
+            for j, instance_id_2 in enumerate(distances.column_ids):
+                time_ = '' if times is None else str(times.matrix[i, j])
+                writer.writerow([instance_id_1, instance_id_2, str(distances.matrix[i, j]), time_])
+
+
+def export_metric_index(experiment, distance_id, index) -> None:
+    """
+    Exports a metric index (see mapel.core.metric_index) to a .npz file.
+
+    Parameters
+    ----------
+        experiment : Experiment
+           Experiment object.
+        distance_id : str
+            Name of the distance.
+        index : VPTree
+            Metric index over the instances.
+    """
+    path_to_folder = os.path.join(os.getcwd(), "experiments", experiment.experiment_id, "indexes")
+    make_folder_if_do_not_exist(path_to_folder)
+    np.savez(os.path.join(path_to_folder, f'{distance_id}.npz'), **index.to_arrays())
+
+
+def convert_distances_to_npy(experiment, distance_id) -> None:
+    """
+    Converts distances stored in a .csv file to .npy files.
+
+    Parameters
+    ----------
+        experiment : Experiment
+           Experiment object.
+        distance_id : str
+            Name of the distance.
+    """
+    # all the distances in the file are kept (even if the instances are not loaded)
+    distances, times, stds, _ = read_distances_from_csv(experiment, distance_id, all_ids=True)
+    if np.isnan(stds.matrix).all():
+        stds = None
+    export_distances_to_npy(experiment, distance_id, distances, times, stds)
+
+
 def export_distances_multiple_processes(
         experiment,
         instances_ids,
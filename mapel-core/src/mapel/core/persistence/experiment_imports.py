@@ -1,170 +1,254 @@
-import ast
 import csv
 import logging
 import os
 
 import numpy as np
 
-
-def import_distances_from_file(experiment, distance_id) -> dict:
+from mapel.core.metric_index import VPTree
+from mapel.core.objects.DistanceMatrix import DistanceMatrix, CrossDistanceMatrix
+from mapel.core.persistence.distances_files import fill_symmetric, get_distances_path, \
+    read_distances_from_csv, read_distances_rows, to_floats
+
+
+def _load_npy_matrix(experiment, distance_id: str, suffix: str = '') -> DistanceMatrix:
+    """ Memory-maps a matrix stored with export_distances_to_npy (None if missing) """
+    path = get_distances_path(experiment, f'{distance_id}{suffix}.npy')
+    if not os.path.isfile(path):
+        return None
+    with open(get_distances_path(experiment, f'{distance_id}_ids.txt'), 'r') as ids_file:
+        instance_ids = ids_file.read().splitlines()
+    # copy-on-write, so that the values can still be modified in memory
+    matrix = DistanceMatrix(instance_ids, np.load(path, mmap_mode='c'))
+    selected_ids = [instance_id for instance_id in instance_ids
+                    if instance_id in experiment.instances]
+    if len(selected_ids) < len(instance_ids):
+        matrix = DistanceMatrix(selected_ids, matrix.submatrix(selected_ids))
+    return matrix
+
+
+def _import_cross_distances_from_npy(path_to_folder,
+                                     distance_id) -> (CrossDistanceMatrix, CrossDistanceMatrix):
+    """ Imports cross distances stored in .npy files (None if missing) """
+    npy_path = os.path.join(path_to_folder, f'{distance_id}.npy')
+    if not os.path.isfile(npy_path):
+        return None, None
+    instance_ids = []
+    for suffix in ('_row_ids', '_column_ids'):
+        with open(os.path.join(path_to_folder, f'{distance_id}{suffix}.txt'), 'r') as ids_file:
+            instance_ids.append(ids_file.read().splitlines())
+    distances = CrossDistanceMatrix(*instance_ids, np.load(npy_path))
+    times = None
+    times_path = os.path.join(path_to_folder, f'{distance_id}_times.npy')
+    if os.path.isfile(times_path):
+        times = CrossDistanceMatrix(*instance_ids, np.load(times_path))
+    return distances, times
+
+
+def _import_cross_distances_from_csv(path_to_folder,
+                                     distance_id) -> (CrossDistanceMatrix, CrossDistanceMatrix):
+    """ Imports cross distances stored in a .csv file (None if missing) """
+    csv_path = os.path.join(path_to_folder, f'{distance_id}.csv')
+    if not os.path.isfile(csv_path):
+        return None, None
+    with open(csv_path, 'r', newline='') as csv_file:
+        rows = list(csv.DictReader(csv_file, delimiter=';'))
+    row_ids = list(dict.fromkeys(row['instance_id_1'] for row in rows))
+    column_ids = list(dict.fromkeys(row['instance_id_2'] for row in rows))
+    distances = CrossDistanceMatrix(row_ids, column_ids)
+    times = CrossDistanceMatrix(row_ids, column_ids)
+    for row in rows:
+        i = distances.row_index[row['instance_id_1']]
+        j = distances.column_index[row['instance_id_2']]
+        distances.matrix[i, j] = float(row['distance'])
+        if row['time']:
+            times.matrix[i, j] = float(row['time'])
+    return distances, times
+
+
+def import_cross_distances(experiment,
+                           other_experiment_id,
+                           distance_id) -> (CrossDistanceMatrix, CrossDistanceMatrix):
     """
-    Imports distances between each pair of instances from a file.
+    Imports distances stored with export_cross_distances_to_file. Files in the
+    format selected for the experiment (.csv or .npy) are preferred, the other
+    format is used as a fallback.
 
     Parameters
     ----------
         experiment : Experiment
-            Experiment object.
+           Experiment object (rows).
+        other_experiment_id : str
+            Id of the other experiment (columns).
         distance_id : str
             Name of the distance.
-
     Returns
     -------
-        dict
-            Distances.
+        (CrossDistanceMatrix, CrossDistanceMatrix)
+            Distances and times (None if missing).
     """
+    path_to_folder = os.path.join(os.getcwd(), 'experiments', experiment.experiment_id,
+                                  'distances', 'cross', str(other_experiment_id))
+    importers = [_import_cross_distances_from_csv, _import_cross_distances_from_npy]
+    if experiment.distances_format == 'npy':
+        importers.reverse()
 
-    distances = {}
+    for importer in importers:
+        distances, times = importer(path_to_folder, distance_id)
+        if distances is not None:
+            return distances, times
+    return None, None
 
-    file_name = f'{distance_id}.csv'
-    path = os.path.join(os.getcwd(), 'experiments', experiment.experiment_id,
-                        'distances', file_name)
 
-    with open(path, 'r', newline='') as csv_file:
+def add_cross_distances_to_experiment(experiment) -> (dict, dict):
+    """
+    Imports the distances (of the distance of the experiment) to the instances
+    of all the other experiments stored in the distances/cross folder.
 
-        reader = csv.DictReader(csv_file, delimiter=';')
+    Parameters
+    ----------
+        experiment : Experiment
+            Experiment object.
+    Returns
+    -------
+        (dict, dict)
+            Distances and times (CrossDistanceMatrix) by the id of the other experiment.
+    """
+    path_to_cross = os.path.join(os.getcwd(), 'experiments', experiment.experiment_id,
+                                 'distances', 'cross')
+    cross_distances, cross_times = {}, {}
+    if not os.path.isdir(path_to_cross):
+        return cross_distances, cross_times
+    for other_experiment_id in sorted(os.listdir(path_to_cross)):
+        distances, times = import_cross_distances(experiment, other_experiment_id,
+                                                  experiment.distance_id)
+        if distances is not None:
+            cross_distances[other_experiment_id] = distances
+            cross_times[other_experiment_id] = times
+    return cross_distances, cross_times
+
+
+def import_metric_index(experiment, distance_id) -> VPTree or None:
+    """ Imports a metric index stored with export_metric_index (None if missing) """
+    path = os.path.join(os.getcwd(), 'experiments', experiment.experiment_id,
+                        'indexes', f'{distance_id}.npz')
+    if not os.path.isfile(path):
+        return None
+    with np.load(path) as arrays:
+        return VPTree.from_arrays(arrays)
 
-        for row in reader:
-            try:
-                instance_id_1 = row['election_id_1']
-                instance_id_2 = row['election_id_2']
-            except:
-                try:
-                    instance_id_1 = row['instance_id_1']
-                    instance_id_2 = row['instance_id_2']
-                except:
-                    pass
-            if instance_id_1 not in experiment.instances \
-                    or instance_id_2 not in experiment.instances:
-                continue
 
-            if instance_id_1 not in distances:
-                distances[instance_id_1] = {}
+def import_distances_from_file(experiment, distance_id) -> DistanceMatrix:
+    """
+    Imports distances between each pair of instances from a file
+    (either .npy or .csv).
+
+    Parameters
+    ----------
+        experiment : Experiment
+            Experiment object.
+        distance_id : str
+            Name of the distance.
 
-            if instance_id_2 not in distances:
-                distances[instance_id_2] = {}
+    Returns
+    -------
+        DistanceMatrix
+            Distances.
+    """
 
-            try:
-                distances[instance_id_1][instance_id_2] = float(row['distance'])
-                distances[instance_id_2][instance_id_1] = distances[instance_id_1][
-                    instance_id_2]
-            except KeyError:
-                pass
+    path = get_distances_path(experiment, f'{distance_id}.csv')
+    if experiment.distances_format == 'npy' or not os.path.isfile(path):
+        distances = _load_npy_matrix(experiment, distance_id)
+        if distances is not None:
+            return distances
+
+    pairs, columns = read_distances_rows(experiment, path)
+    distances = DistanceMatrix(dict.fromkeys(instance_id for pair in pairs
+                                             for instance_id in pair))
+    if 'distance' in columns:
+        fill_symmetric(distances, pairs, to_floats(columns['distance']))
     return distances
 
 
-def add_distances_to_experiment(experiment) -> (dict, dict, dict, dict):
+def import_distances_from_npy(experiment, distance_id) -> (DistanceMatrix, DistanceMatrix,
+                                                           DistanceMatrix, dict):
     """
-    Imports precomputed distances between each pair of instances
-    from a file while preparing an experiment
+    Imports (memory-mapped) distances, times and stds from .npy files.
 
     Parameters
     ----------
         experiment : Experiment
             Experiment object.
+        distance_id : str
+            Name of the distance.
 
     Returns
     -------
-        (dict, dict, dict, dict)
+        (DistanceMatrix, DistanceMatrix, DistanceMatrix, dict)
             distances, times, stds, mappings
     """
 
-    try:
-        file_name = f'{experiment.distance_id}.csv'
-        path = os.path.join(os.getcwd(),
-                            'experiments',
-                            experiment.experiment_id,
-                            'distances',
-                            file_name)
-
-        distances = {}
-        times = {}
-        stds = {}
-        mappings = {}
-        with open(path, 'r', newline='') as csv_file:
-
-            reader = csv.DictReader(csv_file, delimiter=';')
-            warn = False
-
-            for row in reader:
-                try:
-                    instance_id_1 = row['election_id_1']
-                    instance_id_2 = row['election_id_2']
-                except:
-                    try:
-                        instance_id_1 = row['instance_id_1']
-                        instance_id_2 = row['instance_id_2']
-                    except:
-                        pass
-
-                if instance_id_1 not in experiment.instances or \
-                        instance_id_2 not in experiment.instances:
-                    continue
-
-                if instance_id_1 not in distances:
-                    distances[instance_id_1] = {}
-                if instance_id_1 not in times:
-                    times[instance_id_1] = {}
-                if instance_id_1 not in stds:
-                    stds[instance_id_1] = {}
-                if instance_id_1 not in mappings:
-                    mappings[instance_id_1] = {}
-
-                if instance_id_2 not in distances:
-                    distances[instance_id_2] = {}
-                if instance_id_2 not in times:
-                    times[instance_id_2] = {}
-                if instance_id_2 not in stds:
-                    stds[instance_id_2] = {}
-                if instance_id_2 not in mappings:
-                    mappings[instance_id_2] = {}
+    distances = _load_npy_matrix(experiment, distance_id)
+    if distances is None:
+        raise FileNotFoundError(get_distances_path(experiment, f'{distance_id}.npy'))
+    times = _load_npy_matrix(experiment, distance_id, '_times')
+    if times is None:
+        times = DistanceMatrix(distances.ids)
+    stds = _load_npy_matrix(experiment, distance_id, '_stds')
+    if stds is None:
+        stds = DistanceMatrix(distances.ids)
+    mappings = {instance_id: {} for instance_id in distances.ids}
+    return distances, times, stds, mappings
+
+
+def import_distances_from_csv(experiment, distance_id) -> (DistanceMatrix, DistanceMatrix,
+                                                           DistanceMatrix, dict):
+    """
+    Imports distances, times, stds and mappings from a .csv file.
 
-                try:
-                    distances[instance_id_1][instance_id_2] = float(row['distance'])
-                    distances[instance_id_2][instance_id_1] = distances[instance_id_1][
-                        instance_id_2]
-                except:
-                    pass
+    Parameters
+    ----------
+        experiment : Experiment
+            Experiment object.
+        distance_id : str
+            Name of the distance.
 
-                try:
-                    times[instance_id_1][instance_id_2] = float(row['time'])
-                    times[instance_id_2][instance_id_1] = times[instance_id_1][instance_id_2]
-                except:
-                    pass
+    Returns
+    -------
+        (DistanceMatrix, DistanceMatrix, DistanceMatrix, dict)
+            distances, times, stds, mappings
+    """
+    return read_distances_from_csv(experiment, distance_id)
 
-                try:
-                    stds[instance_id_1][instance_id_2] = float(row['std'])
-                    stds[instance_id_2][instance_id_1] = stds[instance_id_1][instance_id_2]
-                except:
-                    pass
 
-                try:
-                    mappings[instance_id_1][instance_id_2] = ast.literal_eval(str(row['mapping']))
-                    mappings[instance_id_2][instance_id_1] = np.argsort(
-                        mappings[instance_id_1][instance_id_2])
-                except:
-                    pass
+def add_distances_to_experiment(experiment) -> (DistanceMatrix, DistanceMatrix,
+                                                DistanceMatrix, dict):
+    """
+    Imports precomputed distances between each pair of instances
+    from a file while preparing an experiment. Files in the format
+    selected for the experiment (.csv or .npy) are preferred, the other
+    format is used as a fallback.
 
-                if instance_id_1 not in experiment.instances:
-                    warn = True
+    Parameters
+    ----------
+        experiment : Experiment
+            Experiment object.
 
-            if warn:
-                text = f'Possibly outdated distances are imported!'
-                logging.warning(text)
+    Returns
+    -------
+        (DistanceMatrix, DistanceMatrix, DistanceMatrix, dict)
+            distances, times, stds, mappings
+    """
 
-        return distances, times, stds, mappings
+    importers = [import_distances_from_csv, import_distances_from_npy]
+    if experiment.distances_format == 'npy':
+        importers.reverse()
 
-    except FileNotFoundError:
-        return None, None, None, None
+    for importer in importers:
+        try:
+            return importer(experiment, experiment.distance_id)
+        except FileNotFoundError:
+            pass
+    return None, None, None, None
 
 
 def get_values_from_csv_file(experiment,
@@ -13,6 +13,7 @@ except ImportError:
 
 from mapel.core.glossary import *
 import mapel.core.persistence.experiment_imports as imports
+from mapel.core.objects.DistanceMatrix import as_distance_matrix
 
 
 def _get_main_mask(mask):
@@ -1238,17 +1239,19 @@ def print_matrix(experiment=None,
             quantities[family_id_1][family_id_2] = 0
 
     # ADD VALUES
-    for i in range(num_selected_instances):
-        limit = i + 1
-        if self_distances:
-            limit = i
-        for j in range(limit, num_selected_instances):
-            if time:
-                matrix[bucket[i]][bucket[j]] += experiment.times[mapping[i]][
-                    mapping[j]]
-            else:
-                matrix[bucket[i]][bucket[j]] += experiment.distances[mapping[i]][mapping[j]]
-            quantities[bucket[i]][bucket[j]] += 1
+    values = experiment.times if time else experiment.distances
+    values = as_distance_matrix(values).submatrix([mapping[i] for i in range(num_selected_instances)])
+    family_index = {family_id: i for i, family_id in enumerate(selected_families)}
+    buckets = np.array([family_index[family_id] for family_id in bucket], dtype=int)
+    rows, columns = np.triu_indices(num_selected_instances, k=0 if self_distances else 1)
+    sums = np.zeros((num_selected_families, num_selected_families))
+    counts = np.zeros((num_selected_families, num_selected_families), dtype=int)
+    np.add.at(sums, (buckets[rows], buckets[columns]), values[rows, columns])
+    np.add.at(counts, (buckets[rows], buckets[columns]), 1)
+    for i, family_id_1 in enumerate(selected_families):
+        for j, family_id_2 in enumerate(selected_families):
+            matrix[family_id_1][family_id_2] += sums[i, j]
+            quantities[family_id_1][family_id_2] += counts[i, j]
     # NORMALIZE
     # for family_id_1, family_id_2 in combinations(election.families, 2):
     # for family_id_1, family_id_2 in product(election.families, 2):
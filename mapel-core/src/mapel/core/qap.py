@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+"""
+Quadratic assignment engine for the matrix-matching distances.
+
+For two square matrices A and B (e.g., pairwise or voterlikeness matrices) and
+an inner distance d between their entries, we look for the permutation s
+minimizing
+
+    sum_{k != i} d(A[k, i], B[s(k), s(i)]),
+
+which is an instance of the Quadratic Assignment Problem (QAP). The entries
+are encoded by their distinct values, so d is evaluated only once per pair of
+distinct values and the (size^4) cost tensor is never materialized.
+
+  * "faq" -- Frank-Wolfe on the relaxation to doubly stochastic matrices
+    (the FAQ algorithm of Vogelstein et al.), projected to the closest
+    permutation and refined by exchanging pairs of matched rows (2-opt).
+    Fast, gives an upper bound together with the matching.
+  * "bb" -- exact Branch-and-Bound with Gilmore-Lawler lower bounds, for
+    small sizes.
+"""
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+# Tolerance used when comparing (floating point) objective values
+EPS = 1e-9
+
+
+class QuadraticAssignment:
+    """ Instance of the QAP between two square matrices """
+
+    def __init__(self, matrix_1, matrix_2, inner_distance):
+        matrix_1 = np.asarray(matrix_1, dtype=float)
+        matrix_2 = np.asarray(matrix_2, dtype=float)
+        self.size = len(matrix_1)
+        values_1, codes_1 = np.unique(matrix_1, return_inverse=True)
+        values_2, codes_2 = np.unique(matrix_2, return_inverse=True)
+        self.values_1, self.values_2 = values_1, values_2
+        self.codes_1 = codes_1.reshape(matrix_1.shape)
+        self.codes_2 = codes_2.reshape(matrix_2.shape)
+        self.costs = np.array([[inner_distance(np.array([value_1]), np.array([value_2]))
+                                for value_2 in values_2] for value_1 in values_1],
+                              dtype=float)
+        # |a - b| (e.g., l1 or l2 between single entries) allows tighter bounds
+        self.is_absolute = np.allclose(self.costs,
+                                       np.abs(values_1[:, None] - values_2[None, :]))
+
+        # the (size^4) cost tensor factorized by the distinct values of the first matrix
+        off_diagonal = 1. - np.eye(self.size)
+        indicators = np.stack([(self.codes_1 == code) * off_diagonal
+                               for code in range(len(values_1))])
+        entry_costs = self.costs[:, self.codes_2] * off_diagonal
+        self._factors = {
+            False: self._stack(indicators, entry_costs),
+            True: self._stack(indicators.transpose(0, 2, 1), entry_costs.transpose(0, 2, 1)),
+        }
+
+    def _stack(self, indicators, entry_costs) -> (np.ndarray, np.ndarray):
+        # layouts for which _contract is two (BLAS) matrix products:
+        # indicators[k, (u, i)] and entry_costs[j, (u, l)]
+        return (np.ascontiguousarray(indicators.transpose(1, 0, 2).reshape(self.size, -1)),
+                np.ascontiguousarray(entry_costs.transpose(2, 0, 1).reshape(self.size, -1)))
+
+    def cost_matrix(self, mapping) -> np.ndarray:
+        """ Return: cost[k, i] of the entry (k, i) for a given mapping """
+        mapping = np.asarray(mapping)
+        costs = self.costs[self.codes_1, self.codes_2[np.ix_(mapping, mapping)]]
+        np.fill_diagonal(costs, 0.)
+        return costs
+
+    def objective(self, mapping) -> float:
+        """ Return: objective value of a given mapping (mapping[k] is the row of B matched with k) """
+        return float(self.cost_matrix(mapping).sum())
+
+    def _contract(self, x: np.ndarray, transposed: bool = False) -> np.ndarray:
+        # result[k, l] = sum_{i, j} cost of matching entry (k, i) with (l, j) * x[i, j]
+        indicators, entry_costs = self._factors[transposed]
+        size = self.size
+        partial = (x @ entry_costs).reshape(size, -1, size).transpose(1, 0, 2).reshape(-1, size)
+        return indicators @ partial
+
+    def gradient(self, x: np.ndarray) -> np.ndarray:
+        return self._contract(x) + self._contract(x, transposed=True)
+
+    def solve_faq(self,
+                  max_iterations: int = 30,
+                  num_two_opt_passes: int = 5,
+                  tolerance: float = 1e-4) -> (float, np.ndarray):
+        """
+        Computes an upper bound with the FAQ algorithm (and 2-opt refinement).
+
+        Parameters
+        ----------
+            max_iterations : int
+                Maximal number of Frank-Wolfe iterations.
+            num_two_opt_passes : int
+                Maximal number of passes exchanging pairs of matched rows.
+            tolerance : float
+                Frank-Wolfe stops when the solution moves less than this.
+        Returns
+        -------
+            (float, np.ndarray)
+                Objective value, mapping
+        """
+        size = self.size
+        if size <= 1:
+            return 0., np.arange(size)
+
+        x = np.full((size, size), 1. / size)
+        for _ in range(max_iterations):
+            contracted = self._contract(x)
+            gradient = contracted + self._contract(x, transposed=True)
+            row_ind, col_ind = linear_sum_assignment(gradient)
+            direction = -x
+            direction[row_ind, col_ind] += 1.
+
+            # exact line search on the quadratic objective
+            contracted_direction = self._contract(direction)
+            quadratic = np.sum(direction * contracted_direction)
+            linear = np.sum(x * contracted_direction) + np.sum(direction * contracted)
+            if quadratic > 0:
+                step = min(1., max(0., -linear / (2 * quadratic)))
+            else:
+                step = 1. if quadratic + linear < 0 else 0.
+            if step * np.abs(direction).max() < tolerance:
+                break
+            x = x + step * direction
+
+        _, mapping = linear_sum_assignment(-x)
+        return self.two_opt(mapping, max_passes=num_two_opt_passes)
+
+    def two_opt(self, mapping, max_passes: int = 5) -> (float, np.ndarray):
+        """ Improves the mapping by exchanging pairs of matched rows """
+        mapping = np.array(mapping)
+        costs = self.cost_matrix(mapping)
+        for _ in range(max_passes):
+            improved = False
+            for a in range(self.size):
+                for b in range(a + 1, self.size):
+                    pair = [a, b]
+                    old = costs[pair].sum() + costs[:, pair].sum() - costs[np.ix_(pair, pair)].sum()
+                    mapping[pair] = mapping[[b, a]]
+                    rows = self.costs[self.codes_1[pair], self.codes_2[np.ix_(mapping[pair], mapping)]]
+                    cols = self.costs[self.codes_1[:, pair], self.codes_2[np.ix_(mapping, mapping[pair])]]
+                    rows[[0, 1], pair] = 0.
+                    cols[pair, [0, 1]] = 0.
+                    new = rows.sum() + cols.sum() - rows[:, pair].sum()
+                    if new < old - EPS:
+                        costs[pair] = rows
+                        costs[:, pair] = cols
+                        improved = True
+                    else:
+                        mapping[pair] = mapping[[b, a]]
+            if not improved:
+                break
+        return float(costs.sum()), mapping
+
+    def _free_bound(self, free_1: list, free_2: list) -> np.ndarray:
+        # lower bound on the entries (k, i) with both k and i unmatched (row k matched with l)
+        num_free = len(free_1)
+        if num_free <= 1:
+            return np.zeros((num_free, num_free))
+        off_diagonal = ~np.eye(num_free, dtype=bool)
+        codes_1 = self.codes_1[np.ix_(free_1, free_1)][off_diagonal].reshape(num_free, -1)
+        codes_2 = self.codes_2[np.ix_(free_2, free_2)][off_diagonal].reshape(num_free, -1)
+        if self.is_absolute:
+            # the cheapest bijection between two sets of numbers matches them in sorted order
+            sorted_1 = np.sort(self.values_1[codes_1], axis=1)
+            sorted_2 = np.sort(self.values_2[codes_2], axis=1)
+            return np.abs(sorted_1[:, None, :] - sorted_2[None, :, :]).sum(axis=2)
+        costs = self.costs[codes_1[:, None, :, None], codes_2[None, :, None, :]]
+        return costs.min(axis=3).sum(axis=2)
+
+    def solve_bb(self, upper_bound: float = None) -> (float, np.ndarray):
+        """
+        Computes the optimal mapping with Branch-and-Bound (Gilmore-Lawler bounds).
+
+        Parameters
+        ----------
+            upper_bound : float
+                Initial upper bound (computed with the FAQ algorithm if None).
+        Returns
+        -------
+            (float, np.ndarray)
+                Objective value, mapping
+        """
+        size = self.size
+        if upper_bound is None:
+            best_objective, best_mapping = self.solve_faq()
+        else:
+            best_objective, best_mapping = upper_bound, None
+
+        # rows of A are matched in a fixed order
+        stack = [([], 0.)]
+        while stack:
+            assigned, assigned_cost = stack.pop()
+            depth = len(assigned)
+            used = set(assigned)
+            free_2 = [l for l in range(size) if l not in used]
+
+            children = []
+            for l in free_2:
+                child = assigned + [l]
+                rows = np.arange(depth)
+                cost = assigned_cost
+                if depth:
+                    cost += self.costs[self.codes_1[depth, rows], self.codes_2[l, assigned]].sum()
+                    cost += self.costs[self.codes_1[rows, depth], self.codes_2[assigned, l]].sum()
+
+                child_free_1 = list(range(depth + 1, size))
+                child_free_2 = [j for j in free_2 if j != l]
+                if child_free_1:
+                    matched_1, matched_2 = list(range(depth + 1)), child
+                    # exact cost of the entries between the matched and unmatched rows
+                    linear = self.costs[
+                        self.codes_1[np.ix_(child_free_1, matched_1)][:, None, :],
+                        self.codes_2[np.ix_(child_free_2, matched_2)][None, :, :]].sum(axis=2)
+                    linear += self.costs[
+                        self.codes_1[np.ix_(matched_1, child_free_1)].T[:, None, :],
+                        self.codes_2[np.ix_(matched_2, child_free_2)].T[None, :, :]].sum(axis=2)
+                    linear += self._free_bound(child_free_1, child_free_2)
+                    row_ind, col_ind = linear_sum_assignment(linear)
+                    bound = cost + linear[row_ind, col_ind].sum()
+                else:
+                    bound = cost
+
+                if bound >= best_objective - EPS:
+                    continue
+                if not child_free_1:
+                    best_objective, best_mapping = bound, np.array(child)
+                    continue
+                children.append((bound, child, cost))
+
+            # the most promising child is explored first
+            children.sort(key=lambda child: child[0], reverse=True)
+            stack.extend((child, cost) for _, child, cost in children)
+
+        return float(best_objective), best_mapping
+
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Process-pool scheduler for computing distances between instances.
+
+The instances are shipped to the workers only once: with the `fork` start
+method they are inherited (copy-on-write) from the parent process, otherwise
+they are pickled once per worker by the pool initializer. The workers then
+pull small chunks of pairs of instance ids and send the results back over
+the pool pipes.
+
+The workers compute on a snapshot of the instances, so the pool is reused by
+the next call only if the caller passes the same version of the instances
+(e.g., hashes of their content); otherwise a fresh pool is started.
+"""
+
+import multiprocessing
+from time import time
+from typing import Callable, Iterator
+
+# State shared with the workers (set before the pool is created)
+_shared_state = {}
+
+
+def _set_shared_state(instances: dict) -> None:
+    _shared_state['instances'] = instances
+
+
+def compute_pairs(instances: dict,
+                  instances_ids: list,
+                  distance_function: Callable = None,
+                  distance_id: str = None) -> list:
+    """
+    Computes distances for a chunk of pairs of instances.
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with instances.
+        instances_ids : list
+            List of pairs of instance ids.
+        distance_function : Callable
+            Function computing the distance between two instances.
+        distance_id : str
+            Name of the distance.
+    Returns
+    -------
+        list
+            List of (instance_id_1, instance_id_2, distance, matching, time) tuples.
+    """
+    results = []
+    for instance_id_1, instance_id_2 in instances_ids:
+        start_time = time()
+        distance = distance_function(instances[instance_id_1],
+                                     instances[instance_id_2],
+                                     distance_id=distance_id)
+        matching = None
+        if type(distance) is tuple:
+            distance, matching = distance
+        results.append((instance_id_1, instance_id_2, distance, matching, time() - start_time))
+    return results
+
+
+def _run_chunk(task) -> list:
+    compute_chunk, instances_ids = task
+    return compute_chunk(_shared_state['instances'], instances_ids)
+
+
+class DistanceScheduler:
+    """ Reusable pool of worker processes computing distances between instances """
+
+    def __init__(self, num_processes: int, chunk_size: int = None):
+        self.num_processes = num_processes
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._instances = None
+        self._instance_ids = None
+        self._version = None
+
+    def _ensure_pool(self, instances: dict, version=None) -> None:
+        """ (Re)starts the pool unless it was started for the same version of the instances """
+        instance_ids = list(instances)
+        if self._pool is not None \
+                and version is not None \
+                and self._version == version \
+                and self._instances is instances \
+                and self._instance_ids == instance_ids:
+            return
+
+        self.close()
+
+        if 'fork' in multiprocessing.get_all_start_methods():
+            _set_shared_state(instances)
+            self._pool = multiprocessing.get_context('fork').Pool(self.num_processes)
+        else:
+            self._pool = multiprocessing.Pool(self.num_processes,
+                                              initializer=_set_shared_state,
+                                              initargs=(instances,))
+        self._instances = instances
+        self._instance_ids = instance_ids
+        self._version = version
+
+    def _get_chunk_size(self, num_pairs: int) -> int:
+        if self.chunk_size is not None:
+            return self.chunk_size
+        return max(1, min(64, num_pairs // (self.num_processes * 16)))
+
+    def map(self,
+            instances: dict,
+            instances_ids: list,
+            compute_chunk: Callable,
+            version=None) -> Iterator[tuple]:
+        """
+        Computes distances for all pairs of instances using the pool.
+
+        Parameters
+        ----------
+            instances : dict
+                Dictionary with instances.
+            instances_ids : list
+                List of pairs of instance ids.
+            compute_chunk : Callable
+                Picklable function (e.g., `functools.partial` of `compute_pairs`)
+                taking the instances and a chunk of pairs.
+            version
+                Version of the content of the instances (e.g., a tuple of their
+                hashes). The pool is reused only for the same (not None) version.
+        Yields
+        ------
+            tuple
+                (instance_id_1, instance_id_2, distance, matching, time) tuples
+                in the order of completion.
+        """
+        self._ensure_pool(instances, version)
+        chunk_size = self._get_chunk_size(len(instances_ids))
+        tasks = ((compute_chunk, instances_ids[start:start + chunk_size])
+                 for start in range(0, len(instances_ids), chunk_size))
+        for results in self._pool.imap_unordered(_run_chunk, tasks):
+            yield from results
+
+    def close(self) -> None:
+        """ Stops the worker processes """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+        self._pool = None
+        self._instances = None
+        self._instance_ids = None
+        self._version = None
+        _shared_state.clear()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -1,4 +1,7 @@
 import os
+import sys
+
+import numpy as np
 
 
 def make_folder_if_do_not_exist(path):
@@ -28,3 +31,20 @@ def get_instance_id(single, family_id, j):
 def rotate(vector, shift):
     shift = shift % len(vector)
     return vector[shift:] + vector[:shift]
+
+
+def get_size_in_bytes(value) -> int:
+    """ Return: (approximate) number of bytes taken by the value and its contents """
+    if value is None:
+        return 0
+    if isinstance(value, np.generic):
+        return sys.getsizeof(value)
+    if hasattr(value, 'nbytes'):
+        # numpy arrays and distance matrices
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(get_size_in_bytes(key) + get_size_in_bytes(item)
+                                          for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(get_size_in_bytes(item) for item in value)
+    return sys.getsizeof(value)
@@ -1,10 +1,10 @@
-from collections import Counter
-
-from .distances_ import get_distance
+from .distances_ import get_distance, enable_distance_cache, disable_distance_cache
+from .distances.milp import set_default_backend as set_milp_backend
 import mapel.core.printing as pr
 from .objects.ApprovalElectionExperiment import ApprovalElectionExperiment
 from .objects.OrdinalElection import OrdinalElection
 from .objects.ApprovalElection import ApprovalElection
+from .objects.Election import aggregate_votes
 from .objects.OrdinalElectionExperiment import OrdinalElectionExperiment
 
 
@@ -41,7 +41,11 @@ def prepare_experiment(experiment_id=None,
                        embedding_id=None,
                        fast_import=False,
                        with_matrix=False,
-                       dim=2):
+                       dim=2,
+                       distances_format='csv',
+                       lazy_import=False,
+                       max_resident_instances=None,
+                       elections_format='preflib'):
     if instance_type == 'ordinal':
         return OrdinalElectionExperiment(experiment_id=experiment_id,
                                          is_shifted=is_shifted,
@@ -56,7 +60,11 @@ def prepare_experiment(experiment_id=None,
                                          fast_import=fast_import,
                                          with_matrix=with_matrix,
                                          instance_type=instance_type,
-                                         dim=dim)
+                                         dim=dim,
+                                         distances_format=distances_format,
+                                         lazy_import=lazy_import,
+                                         max_resident_instances=max_resident_instances,
+                                         elections_format=elections_format)
     elif instance_type in ['approval', 'rule']:
         return ApprovalElectionExperiment(experiment_id=experiment_id,
                                           is_shifted=is_shifted,
@@ -70,7 +78,11 @@ def prepare_experiment(experiment_id=None,
                                           embedding_id=embedding_id,
                                           fast_import=fast_import,
                                           instance_type=instance_type,
-                                          dim=dim)
+                                          dim=dim,
+                                          distances_format=distances_format,
+                                          lazy_import=lazy_import,
+                                          max_resident_instances=max_resident_instances,
+                                          elections_format=elections_format)
 
 
 def print_approvals_histogram(*args):
@@ -118,12 +130,8 @@ def generate_ordinal_election_from_votes(votes=None):
     election.num_voters = len(votes)
     election.votes = votes
     election.is_exported = False
-    c = Counter(map(tuple, votes))
-    counted_votes = [[count, list(row)] for row, count in c.items()]
-    counted_votes = sorted(counted_votes, reverse=True)
-    election.quantites = [a[0] for a in counted_votes]
-    election.distinct_votes = [a[1] for a in counted_votes]
-    election.num_options = len(counted_votes)
+    election.quantites, election.distinct_votes = aggregate_votes(votes)
+    election.num_options = len(election.distinct_votes)
     return election
 
 
@@ -136,12 +144,8 @@ def generate_approval_election_from_votes(votes=None, num_candidates=None):
     election.num_voters = len(votes)
     election.votes = votes
     election.is_exported = False
-    c = Counter(map(tuple, votes))
-    counted_votes = [[count, list(row)] for row, count in c.items()]
-    counted_votes = sorted(counted_votes, reverse=True)
-    election.quantites = [a[0] for a in counted_votes]
-    election.distinct_votes = [a[1] for a in counted_votes]
-    election.num_options = len(counted_votes)
+    election.quantites, election.distinct_votes = aggregate_votes(votes)
+    election.num_options = len(election.distinct_votes)
     return election
 
 
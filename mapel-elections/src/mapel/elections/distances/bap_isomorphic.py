@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+"""
+Solver-free isomorphic swap and Spearman distances.
+
+Both distances are minima over a pair of permutations: a matching of the
+candidates and a matching of the voters. For a fixed matching of the candidates
+the best matching of the voters is a Linear Assignment Problem (LAP), which is
+the formulation used below (Bilinear Assignment Problem, BAP, for Spearman).
+
+  * "aa" -- Alternating Algorithm (arXiv:1707.07057): starting from a
+    candidate matching, alternately solve the LAP for the voters and the LAP for
+    the candidates until the objective stops decreasing (with several restarts).
+    For the swap distance the candidate step is the linearization of the
+    (quadratic) objective around the current matching. The result is refined by
+    exchanging pairs of matched candidates (2-opt). Gives an upper bound.
+  * "bb" -- exact Branch-and-Bound over the candidate matchings. A partial
+    matching is bounded by the LAP for the voters of the exact cost of the
+    matched candidates plus a lower bound on the cost of the unmatched ones.
+"""
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+
+def get_positions(votes) -> np.ndarray:
+    """ Return: positions[v, c] -- position of candidate c in vote v """
+    votes = np.asarray(votes)
+    if (votes < 0).any():
+        # truncated votes are padded with -1, which would wrap to the last candidate
+        raise ValueError("Truncated votes are not supported "
+                         "(use the truncated swap distance instead).")
+    positions = np.empty_like(votes)
+    rows = np.arange(votes.shape[0])[:, None]
+    positions[rows, votes] = np.arange(votes.shape[1])[None, :]
+    return positions
+
+
+def get_precedences(votes) -> np.ndarray:
+    """ Return: precedences[v, a, b] -- 1 if a is ranked above b in vote v """
+    positions = get_positions(votes)
+    # floats, so that the products below go through BLAS (the sums are exact)
+    return (positions[:, :, None] < positions[:, None, :]).astype(float)
+
+
+def _solve_lap(cost_table: np.ndarray) -> (int, np.ndarray):
+    row_ind, col_ind = linear_sum_assignment(cost_table)
+    return int(round(cost_table[row_ind, col_ind].sum())), col_ind
+
+
+# SPEARMAN
+def spearman_voter_costs(positions_1, positions_2, mapping) -> np.ndarray:
+    """ Return: cost[v, u] of matching voter v with voter u (for candidate mapping) """
+    return np.abs(positions_1[:, None, :] - positions_2[None, :, mapping]).sum(axis=2)
+
+
+def spearman_candidate_costs(positions_1, positions_2, voter_mapping) -> np.ndarray:
+    """ Return: cost[c, d] of matching candidate c with candidate d (for voter mapping) """
+    return np.abs(positions_1[:, :, None] - positions_2[voter_mapping, None, :]).sum(axis=0)
+
+
+def _spearman_assigned_costs(positions_1, positions_2, assigned, candidate_1, candidate_2):
+    return np.abs(positions_1[:, candidate_1][:, None] - positions_2[:, candidate_2][None, :])
+
+
+def _spearman_free_bound(positions_1, positions_2, assigned, free_1, free_2):
+    # the cheapest bijection between two sets of positions matches them in sorted order
+    sorted_1 = np.sort(positions_1[:, free_1], axis=1)
+    sorted_2 = np.sort(positions_2[:, free_2], axis=1)
+    return np.abs(sorted_1[:, None, :] - sorted_2[None, :, :]).sum(axis=2)
+
+
+# SWAP
+def swap_voter_costs(precedences_1, precedences_2, mapping) -> np.ndarray:
+    """ Return: cost[v, u] of matching voter v with voter u (for candidate mapping) """
+    num_voters = len(precedences_1)
+    reversed_2 = precedences_2[:, mapping][:, :, mapping].transpose(0, 2, 1)
+    return precedences_1.reshape(num_voters, -1) @ reversed_2.reshape(num_voters, -1).T
+
+
+def swap_candidate_costs(precedences_1, precedences_2, voter_mapping, mapping) -> np.ndarray:
+    """
+    Return: cost[a, c] of matching candidate a with candidate c, when all the other
+    candidates stay matched as in mapping (linearization of the swap distance).
+    """
+    num_candidates = precedences_1.shape[1]
+    mapped_2 = precedences_2[voter_mapping][:, :, mapping]
+    above = precedences_1.transpose(1, 0, 2).reshape(num_candidates, -1)
+    below = precedences_1.transpose(2, 0, 1).reshape(num_candidates, -1)
+    mapped_2 = mapped_2.transpose(1, 0, 2).reshape(num_candidates, -1)
+    return above @ (1 - mapped_2).T + below @ mapped_2.T
+
+
+def _swap_assigned_costs(precedences_1, precedences_2, assigned, candidate_1, candidate_2):
+    if not assigned:
+        num_voters = len(precedences_1)
+        return np.zeros((num_voters, num_voters))
+    assigned_1, assigned_2 = (list(x) for x in zip(*assigned))
+    above_1 = precedences_1[:, assigned_1, candidate_1]
+    above_2 = precedences_2[:, assigned_2, candidate_2]
+    return above_1 @ (1 - above_2).T + (1 - above_1) @ above_2.T
+
+
+def _swap_free_bound(precedences_1, precedences_2, assigned, free_1, free_2):
+    # for every matched candidate, the numbers of unmatched candidates ranked above it
+    # have to differ at least by the number of pairs in a different order
+    if not assigned or not free_1:
+        num_voters = len(precedences_1)
+        return np.zeros((num_voters, num_voters))
+    assigned_1, assigned_2 = (list(x) for x in zip(*assigned))
+    above_1 = precedences_1[:, free_1][:, :, assigned_1].sum(axis=1)
+    above_2 = precedences_2[:, free_2][:, :, assigned_2].sum(axis=1)
+    return np.abs(above_1[:, None, :] - above_2[None, :, :]).sum(axis=2)
+
+
+def _two_opt(voter_costs, data_1, data_2, mapping, objective, max_passes):
+    """ Improves the candidate mapping by exchanging pairs of candidates """
+    num_candidates = len(mapping)
+    improved = True
+    for _ in range(max_passes):
+        if not improved:
+            break
+        improved = False
+        for a in range(num_candidates):
+            for b in range(a + 1, num_candidates):
+                candidate = mapping.copy()
+                candidate[[a, b]] = candidate[[b, a]]
+                value, _ = _solve_lap(voter_costs(data_1, data_2, candidate))
+                if value < objective:
+                    mapping, objective, improved = candidate, value, True
+    return objective, mapping
+
+
+registered_bap_problems = {
+    'spearman': {
+        'data': get_positions,
+        'voter_costs': spearman_voter_costs,
+        'assigned_costs': _spearman_assigned_costs,
+        'free_bound': _spearman_free_bound,
+    },
+    'swap': {
+        'data': get_precedences,
+        'voter_costs': swap_voter_costs,
+        'assigned_costs': _swap_assigned_costs,
+        'free_bound': _swap_free_bound,
+    },
+}
+
+
+def _check_shapes(votes_1, votes_2) -> None:
+    """ Both elections have to be of the same size (as in the C++ extension) """
+    if votes_1.ndim != 2 or votes_2.ndim != 2:
+        raise ValueError("Votes should be a two-dimensional array.")
+    if votes_1.shape != votes_2.shape:
+        raise ValueError(f"The elections should have the same numbers of voters and "
+                         f"candidates (got {votes_1.shape} and {votes_2.shape}).")
+
+
+def _initial_mapping(votes_1, votes_2) -> np.ndarray:
+    """ Candidate mapping minimizing the l1 distance between the positionwise vectors """
+    num_candidates = votes_1.shape[1]
+    vectors_1 = np.zeros((num_candidates, num_candidates), dtype=np.int64)
+    vectors_2 = np.zeros((num_candidates, num_candidates), dtype=np.int64)
+    positions = np.broadcast_to(np.arange(num_candidates), votes_1.shape)
+    np.add.at(vectors_1, (votes_1, positions), 1)
+    np.add.at(vectors_2, (votes_2, positions), 1)
+    cost_table = np.abs(vectors_1[:, None, :] - vectors_2[None, :, :]).sum(axis=2)
+    return _solve_lap(cost_table)[1]
+
+
+def solve_bap_aa(votes_1, votes_2, distance: str,
+                 num_restarts: int = 10,
+                 max_iterations: int = 100,
+                 num_two_opt_passes: int = 2,
+                 seed: int = 0) -> (int, np.ndarray):
+    """
+    Computes an upper bound on the isomorphic distance with the Alternating Algorithm.
+
+    Parameters
+    ----------
+        votes_1
+            Votes of the first election.
+        votes_2
+            Votes of the second election.
+        distance : str
+            Either 'swap' or 'spearman'.
+        num_restarts : int
+            Number of starting candidate mappings (the first one is derived from
+            the positionwise vectors, the other ones are random).
+        max_iterations : int
+            Maximal number of alternating steps per restart.
+        num_two_opt_passes : int
+            Maximal number of passes exchanging pairs of candidates in the best mapping.
+        seed : int
+            Seed of the random starting mappings.
+    Returns
+    -------
+        (int, np.ndarray)
+            Objective value, candidate mapping
+    """
+    votes_1, votes_2 = np.asarray(votes_1), np.asarray(votes_2)
+    _check_shapes(votes_1, votes_2)
+    problem = registered_bap_problems[distance]
+    data_1, data_2 = problem['data'](votes_1), problem['data'](votes_2)
+    num_candidates = votes_1.shape[1]
+    rng = np.random.default_rng(seed)
+
+    best_objective, best_mapping = None, None
+    for restart in range(num_restarts):
+        if restart == 0:
+            mapping = _initial_mapping(votes_1, votes_2)
+        else:
+            mapping = rng.permutation(num_candidates)
+        objective, voter_mapping = _solve_lap(problem['voter_costs'](data_1, data_2, mapping))
+
+        for _ in range(max_iterations):
+            if distance == 'spearman':
+                cost_table = spearman_candidate_costs(data_1, data_2, voter_mapping)
+            else:
+                cost_table = swap_candidate_costs(data_1, data_2, voter_mapping, mapping)
+            new_mapping = _solve_lap(cost_table)[1]
+            value, new_voter_mapping = _solve_lap(
+                problem['voter_costs'](data_1, data_2, new_mapping))
+            if value >= objective:
+                break
+            mapping, objective, voter_mapping = new_mapping, value, new_voter_mapping
+
+        if best_objective is None or objective < best_objective:
+            best_objective, best_mapping = objective, mapping
+
+    return _two_opt(problem['voter_costs'], data_1, data_2, best_mapping, best_objective,
+                    max_passes=num_two_opt_passes)
+
+
+def solve_bap_bb(votes_1, votes_2, distance: str,
+                 upper_bound: int = None) -> (int, np.ndarray):
+    """
+    Computes the isomorphic distance exactly with Branch-and-Bound.
+
+    Parameters
+    ----------
+        votes_1
+            Votes of the first election.
+        votes_2
+            Votes of the second election.
+        distance : str
+            Either 'swap' or 'spearman'.
+        upper_bound : int
+            Initial upper bound (computed with the Alternating Algorithm if None).
+    Returns
+    -------
+        (int, np.ndarray)
+            Objective value, candidate mapping
+    """
+    votes_1, votes_2 = np.asarray(votes_1), np.asarray(votes_2)
+    _check_shapes(votes_1, votes_2)
+    problem = registered_bap_problems[distance]
+    data_1, data_2 = problem['data'](votes_1), problem['data'](votes_2)
+    num_voters, num_candidates = votes_1.shape
+
+    if upper_bound is None:
+        best_objective, best_mapping = solve_bap_aa(votes_1, votes_2, distance)
+    else:
+        best_objective, best_mapping = upper_bound, None
+
+    # candidates of the first election are matched in a fixed order
+    root = ([], np.zeros((num_voters, num_voters)))
+    stack = [root]
+    while stack:
+        assigned, assigned_costs = stack.pop()
+        depth = len(assigned)
+        candidate_1 = depth
+        used = {candidate_2 for _, candidate_2 in assigned}
+        free_1 = list(range(depth + 1, num_candidates))
+
+        children = []
+        for candidate_2 in range(num_candidates):
+            if candidate_2 in used:
+                continue
+            child_assigned = assigned + [(candidate_1, candidate_2)]
+            child_costs = assigned_costs + problem['assigned_costs'](
+                data_1, data_2, assigned, candidate_1, candidate_2)
+            free_2 = [c for c in range(num_candidates) if c not in used and c != candidate_2]
+            bound_table = child_costs + problem['free_bound'](
+                data_1, data_2, child_assigned, free_1, free_2)
+            bound = _solve_lap(bound_table)[0]
+            if bound >= best_objective:
+                continue
+            if depth + 1 == num_candidates:
+                # the bound of a complete mapping is its exact value
+                best_objective = bound
+                best_mapping = np.array([c for _, c in child_assigned])
+                continue
+            children.append((bound, child_assigned, child_costs))
+
+        # the most promising child is explored first
+        children.sort(key=lambda child: child[0], reverse=True)
+        stack.extend((child_assigned, child_costs) for _, child_assigned, child_costs in children)
+
+    return best_objective, best_mapping
@@ -0,0 +1,605 @@
+#!/usr/bin/env python
+"""
+Batched (all-pairs) distance engines.
+
+Instead of building the cost table of every pair of elections separately, the
+engines below stack the derived data of all elections into one array and build
+the cost tables for whole blocks of pairs at once using NumPy broadcasting.
+The isomorphic swap and Spearman distances pass blocks of pairs to the C++
+extension, which computes them in a pool of native threads. Distances which need
+no matching (e.g., bordawise or approvalwise) are distances between one vector
+per election, so all of them are computed at once with `cdist`.
+"""
+
+from time import time
+from typing import Callable, Iterator
+
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from mapel.core.inner_distances import chebyshev, emd, l1, l2
+from mapel.core.matchings import solve_matching_vectors
+from mapel.elections.distances.feature_distance import features_vector_l1, features_vector_l2
+from mapel.elections.distances.main_approval_distances import compute_approvalwise
+from mapel.elections.distances.main_ordinal_distances import compute_positionwise_distance, \
+    compute_swap_distance, compute_spearman_distance, compute_bordawise_distance
+
+try:
+    import mapel.elections.distances.cppdistances as cppd
+except ImportError:
+    cppd = None
+
+# Upper bound on the number of floats in a single (block, m, m, m) tensor
+BLOCK_BUDGET = 2 ** 22
+
+# Number of pairs passed at once to the C++ extension
+NATIVE_BLOCK_SIZE = 256
+
+
+def stack_positionwise_vectors(instances: dict, instance_ids: list) -> np.ndarray:
+    """
+    Stacks positionwise vectors of the given elections into one array.
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with elections.
+        instance_ids : list
+            Ids of the elections to be stacked.
+    Returns
+    -------
+        np.ndarray
+            Array of shape (N, m, m).
+    """
+    return np.stack([np.asarray(instances[instance_id].get_vectors(), dtype=float)
+                     for instance_id in instance_ids])
+
+
+def emd_cost_tables(vectors_1: np.ndarray, vectors_2: np.ndarray) -> np.ndarray:
+    """
+    Computes EMD cost tables for a block of pairs of elections.
+
+    The surplus is carried along the positions exactly as in
+    `mapel.core.inner_distances.emd`, so the values are bit-identical
+    to the ones computed pair by pair.
+
+    Parameters
+    ----------
+        vectors_1 : np.ndarray
+            Positionwise vectors of the first elections, shape (B, m, m).
+        vectors_2 : np.ndarray
+            Positionwise vectors of the second elections, shape (B, m, m).
+    Returns
+    -------
+        np.ndarray
+            Cost tables of shape (B, m, m), where [b, j, i] is the cost of
+            matching candidate i of the first election with candidate j of
+            the second one.
+    """
+    v_1 = vectors_1[:, None, :, :]
+    v_2 = vectors_2[:, :, None, :]
+    num_positions = vectors_1.shape[2]
+    shape = (vectors_1.shape[0], vectors_2.shape[1], vectors_1.shape[1])
+    surplus = np.zeros(shape)
+    dirt = np.zeros(shape)
+    for pos in range(num_positions - 1):
+        surplus = (v_1[..., pos] + surplus) - v_2[..., pos]
+        dirt += np.abs(surplus)
+    return dirt
+
+
+def l1_cost_tables(vectors_1: np.ndarray, vectors_2: np.ndarray) -> np.ndarray:
+    """
+    Computes L1 cost tables for a block of pairs of elections.
+
+    Parameters
+    ----------
+        vectors_1 : np.ndarray
+            Positionwise vectors of the first elections, shape (B, m, m).
+        vectors_2 : np.ndarray
+            Positionwise vectors of the second elections, shape (B, m, m).
+    Returns
+    -------
+        np.ndarray
+            Cost tables of shape (B, m, m), where [b, j, i] is the cost of
+            matching candidate i of the first election with candidate j of
+            the second one.
+    """
+    return np.add.reduce(np.abs(vectors_1[:, None, :, :] - vectors_2[:, :, None, :]), axis=-1)
+
+
+registered_positionwise_kernels = {
+    emd: emd_cost_tables,
+    l1: l1_cost_tables,
+}
+
+
+# main distance -> (name of the batched entry point, function computing a single pair)
+registered_native_distances = {
+    'swap': ('swapd_pairs', compute_swap_distance),
+    'spearman': ('speard_pairs', compute_spearman_distance),
+}
+
+
+def is_native(main_distance: str) -> bool:
+    """ Checks if the C++ extension has a batched entry point for a given distance """
+    return main_distance in registered_native_distances \
+        and hasattr(cppd, registered_native_distances[main_distance][0])
+
+
+def get_bordawise_vector(election) -> np.ndarray:
+    return np.asarray(election.votes_to_bordawise_vector(), dtype=float)
+
+
+def get_approvalwise_vector(election) -> np.ndarray:
+    election.votes_to_approvalwise_vector()
+    return np.asarray(election.approvalwise_vector, dtype=float)
+
+
+def get_features_vector(election) -> np.ndarray:
+    return np.asarray(election.election_features.features_vector, dtype=float)
+
+
+# main distance -> (function returning the vector of an election, function computing a single pair)
+registered_vector_distances = {
+    'bordawise': (get_bordawise_vector, compute_bordawise_distance),
+    'approvalwise': (get_approvalwise_vector, compute_approvalwise),
+    'feature_l1': (get_features_vector, features_vector_l1),
+    'feature_l2': (get_features_vector, features_vector_l2),
+}
+
+# main distances computed always with the same inner distance
+fixed_inner_distances = {
+    'feature_l1': l1,
+    'feature_l2': l2,
+}
+
+
+def _emd_transform(vectors: np.ndarray) -> np.ndarray:
+    # emd between two vectors is the l1 distance between their cumulative sums
+    return np.cumsum(vectors, axis=1)[:, :-1]
+
+
+# inner distance -> (transformation of the vectors, cdist metric)
+registered_vector_kernels = {
+    l1: (None, 'cityblock'),
+    l2: (None, 'euclidean'),
+    chebyshev: (None, 'chebyshev'),
+    emd: (_emd_transform, 'cityblock'),
+}
+
+# the same metrics for pairs of rows
+_paired_metrics = {
+    'cityblock': lambda x, y: np.abs(x - y).sum(axis=1),
+    'euclidean': lambda x, y: np.sqrt(((x - y) ** 2).sum(axis=1)),
+    'chebyshev': lambda x, y: np.abs(x - y).max(axis=1),
+}
+
+
+def is_embedding_free(main_distance: str, inner_distance: Callable) -> bool:
+    """ Checks if a given distance is a distance between single vectors (needs no matching) """
+    if main_distance not in registered_vector_distances:
+        return False
+    inner_distance = fixed_inner_distances.get(main_distance, inner_distance)
+    return inner_distance in registered_vector_kernels
+
+
+def is_batchable(main_distance: str, inner_distance: Callable) -> bool:
+    """ Checks if there is a batched engine for a given distance """
+    if main_distance == 'positionwise':
+        return inner_distance in registered_positionwise_kernels
+    return is_native(main_distance) or is_embedding_free(main_distance, inner_distance)
+
+
+def compute_distances(instances: dict,
+                      instances_ids: list,
+                      main_distance: str,
+                      inner_distance: Callable = None,
+                      num_threads: int = 1) -> Iterator[tuple]:
+    """
+    Computes distances for many pairs of elections with a batched engine.
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with elections.
+        instances_ids : list
+            List of pairs of election ids.
+        main_distance : str
+            Name of the main distance.
+        inner_distance : Callable
+            Inner distance (if applicable).
+        num_threads : int
+            Number of threads used by the C++ extension.
+    Yields
+    ------
+        (float, list, float)
+            Distance, optimal matching (or None) and time of computation for each pair
+            (in the order of instances_ids).
+    """
+    if main_distance == 'positionwise':
+        return compute_positionwise_distances(instances, instances_ids, inner_distance)
+    if is_embedding_free(main_distance, inner_distance):
+        return compute_vector_distances(instances, instances_ids, main_distance, inner_distance)
+    return compute_native_distances(instances, instances_ids, main_distance,
+                                    num_threads=num_threads)
+
+
+def compute_positionwise_distances(instances: dict,
+                                   instances_ids: list,
+                                   inner_distance: Callable,
+                                   block_size: int = None) -> Iterator[tuple]:
+    """
+    Computes Positionwise distances for many pairs of ordinal elections.
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with elections.
+        instances_ids : list
+            List of pairs of election ids.
+        inner_distance : Callable
+            Inner distance, either `emd` or `l1`.
+        block_size : int
+            Number of pairs processed at once (derived from BLOCK_BUDGET if None).
+    Yields
+    ------
+        (float, list, float)
+            Distance, optimal matching and time of computation for each pair
+            (in the order of instances_ids).
+    """
+    for results in compute_multiple_positionwise_distances(instances, instances_ids,
+                                                           [inner_distance],
+                                                           block_size=block_size):
+        yield results[0]
+
+
+def compute_multiple_positionwise_distances(instances: dict,
+                                            instances_ids: list,
+                                            inner_distances: list,
+                                            block_size: int = None) -> Iterator[list]:
+    """
+    Computes Positionwise distances with several inner distances in a single pass
+    (the positionwise vectors are stacked and gathered only once).
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with elections.
+        instances_ids : list
+            List of pairs of election ids.
+        inner_distances : list
+            Inner distances, each either `emd` or `l1`.
+        block_size : int
+            Number of pairs processed at once (derived from BLOCK_BUDGET if None).
+    Yields
+    ------
+        list
+            For each pair (in the order of instances_ids), a list of
+            (distance, optimal matching, time of computation), one per inner distance.
+    """
+    kernels = [registered_positionwise_kernels[inner_distance]
+               for inner_distance in inner_distances]
+
+    unique_ids = list(dict.fromkeys(i for pair in instances_ids for i in pair))
+    if not unique_ids:
+        return
+
+    if len({np.shape(instances[instance_id].get_vectors()) for instance_id in unique_ids}) > 1:
+        # elections of different sizes cannot be stacked
+        for instance_id_1, instance_id_2 in instances_ids:
+            results = []
+            for inner_distance in inner_distances:
+                start_time = time()
+                distance, matching = compute_positionwise_distance(instances[instance_id_1],
+                                                                   instances[instance_id_2],
+                                                                   inner_distance)
+                results.append((distance, matching, time() - start_time))
+            yield results
+        return
+
+    index = {instance_id: i for i, instance_id in enumerate(unique_ids)}
+    stacked = stack_positionwise_vectors(instances, unique_ids)
+
+    num_candidates = stacked.shape[1]
+    if block_size is None:
+        block_size = max(1, BLOCK_BUDGET // max(1, num_candidates ** 3))
+
+    for start in range(0, len(instances_ids), block_size):
+        block = instances_ids[start:start + block_size]
+        idx_1 = np.array([index[instance_id_1] for instance_id_1, _ in block])
+        idx_2 = np.array([index[instance_id_2] for _, instance_id_2 in block])
+        vectors_1, vectors_2 = stacked[idx_1], stacked[idx_2]
+        block_results = []
+        for kernel in kernels:
+            start_time = time()
+            cost_tables = kernel(vectors_1, vectors_2)
+            results = [solve_matching_vectors(cost_table) for cost_table in cost_tables]
+            elapsed = (time() - start_time) / len(block)
+            block_results.append([(distance, matching, elapsed)
+                                  for distance, matching in results])
+        yield from (list(pair_results) for pair_results in zip(*block_results))
+
+
+def stack_votes(instances: dict, instance_ids: list) -> np.ndarray:
+    """
+    Stacks votes of the given elections into one array.
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with elections.
+        instance_ids : list
+            Ids of the elections to be stacked.
+    Returns
+    -------
+        np.ndarray
+            Array of shape (N, n, m) of the (compact) dtype of the votes.
+    """
+    return np.stack([np.asarray(instances[instance_id].votes)
+                     for instance_id in instance_ids])
+
+
+def _is_stackable(instances: dict, instance_ids: list) -> bool:
+    """ Checks if the votes are complete rankings of the same size """
+    shapes = set()
+    for instance_id in instance_ids:
+        votes = np.asarray(instances[instance_id].votes)
+        if votes.ndim != 2 or votes.shape[1] != instances[instance_id].num_candidates \
+                or (votes < 0).any():
+            return False
+        shapes.add(votes.shape)
+    return len(shapes) == 1
+
+
+def compute_native_distances(instances: dict,
+                             instances_ids: list,
+                             main_distance: str,
+                             num_threads: int = 1,
+                             block_size: int = NATIVE_BLOCK_SIZE) -> Iterator[tuple]:
+    """
+    Computes isomorphic swap or Spearman distances for many pairs of ordinal
+    elections using the batched entry points of the C++ extension.
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with elections.
+        instances_ids : list
+            List of pairs of election ids.
+        main_distance : str
+            Either 'swap' or 'spearman'.
+        num_threads : int
+            Number of threads used by the C++ extension.
+        block_size : int
+            Number of pairs passed at once to the C++ extension.
+    Yields
+    ------
+        (int, None, float)
+            Distance, None (no matching) and time of computation for each pair
+            (in the order of instances_ids).
+    """
+    entry_point, compute_single = registered_native_distances[main_distance]
+
+    unique_ids = list(dict.fromkeys(i for pair in instances_ids for i in pair))
+    if not unique_ids:
+        return
+
+    if not _is_stackable(instances, unique_ids):
+        # elections of different sizes (or with truncated votes) cannot be stacked
+        for instance_id_1, instance_id_2 in instances_ids:
+            start_time = time()
+            distance, matching = compute_single(instances[instance_id_1],
+                                                instances[instance_id_2])
+            yield distance, matching, time() - start_time
+        return
+
+    index = {instance_id: i for i, instance_id in enumerate(unique_ids)}
+    stacked = stack_votes(instances, unique_ids)
+    compute_pairs = getattr(cppd, entry_point)
+
+    for start in range(0, len(instances_ids), block_size):
+        start_time = time()
+        block = instances_ids[start:start + block_size]
+        pairs = np.array([[index[instance_id_1], index[instance_id_2]]
+                          for instance_id_1, instance_id_2 in block], dtype=np.int64)
+        results = compute_pairs(stacked, pairs, num_threads)
+        elapsed = (time() - start_time) / len(block)
+        for distance in results:
+            yield int(distance), None, elapsed
+
+
+def stack_vectors(instances: dict, instance_ids: list, main_distance: str) -> np.ndarray or None:
+    """
+    Stacks the vectors (e.g., bordawise vectors) of the given elections into one array.
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with elections.
+        instance_ids : list
+            Ids of the elections to be stacked.
+        main_distance : str
+            Name of the main distance (key of registered_vector_distances).
+    Returns
+    -------
+        np.ndarray
+            Array of shape (N, d), or None if the vectors are of different lengths.
+    """
+    get_vector, _ = registered_vector_distances[main_distance]
+    vectors = [get_vector(instances[instance_id]) for instance_id in instance_ids]
+    if len({vector.shape for vector in vectors}) > 1:
+        return None
+    return np.stack(vectors)
+
+
+def _get_kernel(main_distance: str, inner_distance: Callable) -> (Callable, str):
+    inner_distance = fixed_inner_distances.get(main_distance, inner_distance)
+    return registered_vector_kernels[inner_distance]
+
+
+def nearest_vector_neighbors(instances: dict,
+                             instance_ids: list,
+                             main_distance: str,
+                             inner_distance: Callable = None,
+                             num_neighbors: int = 10) -> np.ndarray or None:
+    """
+    Finds the nearest elections with respect to a distance which needs no matching
+    (without storing the full matrix of distances).
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with elections.
+        instance_ids : list
+            Ids of the elections.
+        main_distance : str
+            Name of the main distance.
+        inner_distance : Callable
+            Inner distance (if applicable).
+        num_neighbors : int
+            Number of neighbors of each election.
+    Returns
+    -------
+        np.ndarray
+            Indices (in instance_ids) of the neighbors, shape (N, num_neighbors),
+            or None if the vectors cannot be stacked.
+    """
+    vectors = stack_vectors(instances, instance_ids, main_distance)
+    if vectors is None:
+        return None
+    transform, metric = _get_kernel(main_distance, inner_distance)
+    if transform is not None:
+        vectors = transform(vectors)
+
+    num_instances = len(vectors)
+    num_neighbors = min(num_neighbors, num_instances - 1)
+    neighbors = np.empty((num_instances, max(0, num_neighbors)), dtype=np.int64)
+    if num_neighbors <= 0:
+        return neighbors
+    block_size = max(1, BLOCK_BUDGET // num_instances)
+    for start in range(0, num_instances, block_size):
+        stop = min(start + block_size, num_instances)
+        distances = cdist(vectors[start:stop], vectors, metric=metric)
+        distances[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        neighbors[start:stop] = np.argpartition(distances, num_neighbors - 1,
+                                                axis=1)[:, :num_neighbors]
+    return neighbors
+
+
+def vector_distance_matrix(vectors_1: np.ndarray,
+                           vectors_2: np.ndarray,
+                           main_distance: str,
+                           inner_distance: Callable = None) -> np.ndarray:
+    """
+    Computes distances between all pairs of vectors.
+
+    Parameters
+    ----------
+        vectors_1 : np.ndarray
+            Vectors of the first elections, shape (N1, d).
+        vectors_2 : np.ndarray
+            Vectors of the second elections, shape (N2, d).
+        main_distance : str
+            Name of the main distance.
+        inner_distance : Callable
+            Inner distance (if applicable).
+    Returns
+    -------
+        np.ndarray
+            Distances of shape (N1, N2).
+    """
+    transform, metric = _get_kernel(main_distance, inner_distance)
+    if transform is not None:
+        vectors_1, vectors_2 = transform(vectors_1), transform(vectors_2)
+    return cdist(vectors_1, vectors_2, metric=metric)
+
+
+def compute_vector_distance_matrix(instances: dict,
+                                   instance_ids: list,
+                                   main_distance: str,
+                                   inner_distance: Callable = None) -> np.ndarray or None:
+    """
+    Computes the full matrix of distances which need no matching.
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with elections.
+        instance_ids : list
+            Ids of the elections (order of the rows and columns).
+        main_distance : str
+            Name of the main distance.
+        inner_distance : Callable
+            Inner distance (if applicable).
+    Returns
+    -------
+        np.ndarray
+            Distances of shape (N, N), or None if the vectors cannot be stacked.
+    """
+    vectors = stack_vectors(instances, instance_ids, main_distance)
+    if vectors is None:
+        return None
+    return vector_distance_matrix(vectors, vectors, main_distance, inner_distance)
+
+
+def compute_vector_distances(instances: dict,
+                             instances_ids: list,
+                             main_distance: str,
+                             inner_distance: Callable = None,
+                             block_size: int = None) -> Iterator[tuple]:
+    """
+    Computes distances which need no matching for many pairs of elections.
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with elections.
+        instances_ids : list
+            List of pairs of election ids.
+        main_distance : str
+            Name of the main distance.
+        inner_distance : Callable
+            Inner distance (if applicable).
+        block_size : int
+            Number of pairs processed at once (derived from BLOCK_BUDGET if None).
+    Yields
+    ------
+        (float, None, float)
+            Distance, None (no matching) and time of computation for each pair
+            (in the order of instances_ids).
+    """
+    unique_ids = list(dict.fromkeys(i for pair in instances_ids for i in pair))
+    if not unique_ids:
+        return
+
+    vectors = stack_vectors(instances, unique_ids, main_distance)
+    if vectors is None:
+        # vectors of different lengths cannot be stacked
+        _, compute_single = registered_vector_distances[main_distance]
+        for instance_id_1, instance_id_2 in instances_ids:
+            start_time = time()
+            if main_distance in fixed_inner_distances:
+                distance = compute_single(instances[instance_id_1], instances[instance_id_2])
+            else:
+                distance, _ = compute_single(instances[instance_id_1], instances[instance_id_2],
+                                             inner_distance)
+            yield distance, None, time() - start_time
+        return
+
+    transform, metric = _get_kernel(main_distance, inner_distance)
+    if transform is not None:
+        vectors = transform(vectors)
+    index = {instance_id: i for i, instance_id in enumerate(unique_ids)}
+    if block_size is None:
+        block_size = max(1, BLOCK_BUDGET // max(1, vectors.shape[1]))
+
+    for start in range(0, len(instances_ids), block_size):
+        start_time = time()
+        block = instances_ids[start:start + block_size]
+        idx_1 = np.array([index[instance_id_1] for instance_id_1, _ in block])
+        idx_2 = np.array([index[instance_id_2] for _, instance_id_2 in block])
+        results = _paired_metrics[metric](vectors[idx_1], vectors[idx_2])
+        elapsed = (time() - start_time) / len(block)
+        for distance in results:
+            yield float(distance), None, elapsed
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Canonical forms of ordinal elections (up to renaming candidates and reordering voters).
+
+Renaming the candidates so that a given vote becomes (0, 1, ..., m-1) fixes the
+renaming completely. Every isomorphism maps the votes of one election to the
+votes of the other, so the lexicographically smallest (sorted) multiset of votes
+over all such renamings is the same for isomorphic elections, and only for them.
+Only the votes occurring the maximal number of times are tried as anchors.
+
+Computing the canonical form costs one sort per anchor, so it is computed only
+for elections whose (cheap) isomorphism invariant collides with another one.
+"""
+
+import hashlib
+from collections import defaultdict
+
+import numpy as np
+
+
+def _get_votes(election) -> np.ndarray or None:
+    if election.fake or election.votes is None:
+        return None
+    try:
+        votes = np.asarray(election.votes, dtype=np.int64)
+    except ValueError:
+        return None
+    if votes.ndim != 2 or votes.shape[1] != election.num_candidates:
+        return None
+    return votes
+
+
+def get_invariant(votes: np.ndarray) -> bytes:
+    """ Return: isomorphism invariant (sorted multisets of positionwise vectors and of counts) """
+    num_voters, num_candidates = votes.shape
+    # the padding (-1) of truncated votes is counted separately (it is never renamed)
+    frequencies = np.zeros((num_candidates + 1, num_candidates), dtype=np.int64)
+    np.add.at(frequencies, (votes + 1, np.broadcast_to(np.arange(num_candidates), votes.shape)), 1)
+    candidates = frequencies[1:]
+    frequencies[1:] = candidates[np.lexsort(candidates.T[::-1])]
+    _, counts = np.unique(votes, axis=0, return_counts=True)
+    return b';'.join([np.array(votes.shape, dtype=np.int64).tobytes(),
+                      frequencies.tobytes(),
+                      np.sort(counts).tobytes()])
+
+
+def get_canonical_form(votes: np.ndarray) -> (str, np.ndarray):
+    """
+    Computes the canonical form of an ordinal election.
+
+    Parameters
+    ----------
+        votes : np.ndarray
+            Votes of the election, shape (num_voters, num_candidates).
+    Returns
+    -------
+        (str, np.ndarray)
+            Hash of the canonical form, relabelling (relabelling[c] is the
+            canonical name of candidate c). Both are None if the election
+            has no complete vote (truncated votes are padded with -1).
+    """
+    num_voters, num_candidates = votes.shape
+    distinct, counts = np.unique(votes, axis=0, return_counts=True)
+    is_complete = np.all(distinct >= 0, axis=1)
+    if not np.any(is_complete):
+        return None, None
+
+    best_form, best_relabelling = None, None
+    for anchor in distinct[is_complete & (counts == counts[is_complete].max())]:
+        relabelling = np.full(num_candidates, -1, dtype=np.int64)
+        relabelling[anchor] = np.arange(num_candidates)
+        # the padding (the last entry of the lookup) keeps its label
+        relabeled = np.append(relabelling, -1)[distinct]
+        order = np.lexsort(relabeled.T[::-1])
+        form = np.concatenate([relabeled[order], counts[order, None]], axis=1).tobytes()
+        if best_form is None or form < best_form:
+            best_form, best_relabelling = form, relabelling
+
+    digest = hashlib.sha256()
+    digest.update(f'{num_voters};{num_candidates};'.encode())
+    digest.update(best_form)
+    return digest.hexdigest(), best_relabelling
+
+
+def group_isomorphic_elections(instances: dict, instance_ids: list) -> dict:
+    """
+    Groups isomorphic ordinal elections into equivalence classes.
+
+    Parameters
+    ----------
+        instances : dict
+            Dictionary with elections.
+        instance_ids : list
+            Ids of the elections to be grouped.
+    Returns
+    -------
+        dict
+            For every election in a class of at least two elections:
+            instance_id -> (representative id, candidate_map), where
+            candidate_map[c] is the candidate of the representative
+            corresponding to candidate c of the election.
+    """
+    candidates = defaultdict(list)
+    for instance_id in dict.fromkeys(instance_ids):
+        votes = _get_votes(instances[instance_id])
+        if votes is not None:
+            candidates[get_invariant(votes)].append((instance_id, votes))
+
+    classes = {}
+    for group in candidates.values():
+        if len(group) < 2:
+            continue
+        representatives = {}
+        for instance_id, votes in group:
+            key, relabelling = get_canonical_form(votes)
+            if key is None:
+                continue
+            if key not in representatives:
+                representatives[key] = (instance_id, relabelling)
+                continue
+            representative_id, representative_relabelling = representatives[key]
+            candidate_map = np.argsort(representative_relabelling)[relabelling]
+            classes.setdefault(representative_id, (representative_id,
+                                                   np.arange(len(relabelling))))
+            classes[instance_id] = (representative_id, candidate_map)
+    return classes
@@ -10,7 +10,16 @@
 #include <utility>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
+#include <pybind11/numpy.h>
 #include <iostream>
+#include <atomic>
+#include <cmath>
+#include <map>
+#include <mutex>
+#include <stdexcept>
+#include <thread>
+
+namespace py = pybind11;
 
 using namespace std;
 
@@ -29,6 +38,15 @@ typedef int cost;
 #endif
 typedef int boolean;
 
+/*Read-only view of the votes of an election stored row-major (one vote per row);
+  the votes are stored as int8, int16 or int, depending on the number of candidates*/
+template <typename Vote>
+struct VotesView {
+    const Vote* data;
+    int stride;
+    const Vote* operator[](int t) const { return data + (size_t) t * stride; }
+};
+
 /*This function is the jv shortest augmenting path algorithm to solve the assignment problem*/
 cost lap(int dim,
         cost **assigncost,
@@ -334,8 +352,8 @@ int getInvCount(int arr[], int arr2[], int n, bool swap)
 
 
 
-int spearDistance_election(int n,int m, const std::vector<std::vector<int>> &
-el1, const std::vector<std::vector<int>> & el2){
+template <typename Vote>
+int spearDistance_election(int n,int m, const VotesView<Vote> &el1, const VotesView<Vote> &el2){
     int min_dist=2*m*m*n;
     int* mapping = new int [m];
     col *rowsol;
@@ -417,8 +435,9 @@ uint8_t getIvCountTrunc(int* arr, int n)
     return inv_count;
 }
 
-int swapDistance_election(int n,int m, const std::vector<std::vector<int>> &el1,
-const std::vector<std::vector<int>> &el2, uint8_t* lookup){
+template <typename Vote>
+int swapDistance_election(int n,int m, const VotesView<Vote> &el1, const VotesView<Vote> &el2,
+const uint8_t* lookup){
     int min_dist=2*m*m*n;
     int* mapping = new int [m];
     col *rowsol;
@@ -496,8 +515,9 @@ const std::vector<std::vector<int>> &el2, uint8_t* lookup){
     return min_dist;
 }
 
-int tswapDistance_election(int n, int m, const std::vector<std::vector<int>> &el1,
-    const std::vector<std::vector<int>> &el2, uint8_t* lookup, uint8_t* lookup_trunc){
+template <typename Vote>
+int tswapDistance_election(int n, int m, const VotesView<Vote> &el1, const VotesView<Vote> &el2,
+    const uint8_t* lookup, const uint8_t* lookup_trunc){
     // e1 should be smaller, e2 should be larger
     int min_dist=2*m*m*n;
     int* mapping = new int [m];
@@ -615,7 +635,7 @@ uint8_t* prec_map(int m){
        swap_lookup[id]=getIvCount(mapping, m);
     } while ( std::next_permutation(mapping,mapping+m) );
 
-    delete mapping;
+    delete[] mapping;
     return swap_lookup;
 }
 
@@ -631,48 +651,173 @@ uint8_t* prec_map_trunc(int m){
         }
        swap_lookup[id]=getIvCountTrunc(mapping, m);
     } while ( std::next_permutation(mapping,mapping+m) );
-    delete mapping;
+    delete[] mapping;
 
     return swap_lookup;
 }
 
-int compute_swap(const std::vector<std::vector<int>>  & elc1, const
-std::vector<std::vector<int>> & elc2){
+/*The lookup tables are computed once per number of candidates and shared (read-only) by all calls*/
+const uint8_t* get_lookup(int m, bool truncated){
+  static std::map<std::pair<int, bool>, uint8_t*> lookups;
+  static std::mutex lookups_mutex;
+  std::lock_guard<std::mutex> lock(lookups_mutex);
+  std::pair<int, bool> key(m, truncated);
+  if (lookups.find(key) == lookups.end()) {
+    lookups[key] = truncated ? prec_map_trunc(m) : prec_map(m);
+  }
+  return lookups[key];
+}
+
+template <typename Vote>
+using votes_array = py::array_t<Vote, py::array::c_style | py::array::forcecast>;
+typedef py::array_t<long long, py::array::c_style | py::array::forcecast> pairs_array;
+
+template <typename Vote>
+VotesView<Vote> get_votes_view(const votes_array<Vote> &votes){
+  if (votes.ndim() != 2) {
+    throw std::invalid_argument("Votes should be a two-dimensional array.");
+  }
+  return VotesView<Vote>{votes.data(), (int) votes.shape(1)};
+}
+
+void check_num_candidates(int m){
+  if (m < 3 || m > 10) {
+    throw std::invalid_argument("The swap distance is supported for 3 to 10 candidates.");
+  }
+}
+
+template <typename Vote>
+int compute_swap(const votes_array<Vote> &elc1, const votes_array<Vote> &elc2){
+  VotesView<Vote> el1 = get_votes_view(elc1);
+  VotesView<Vote> el2 = get_votes_view(elc2);
+  int mm = (int) elc2.shape(1);
+  int nn = (int) elc1.shape(0);
+  check_num_candidates(mm);
+  py::gil_scoped_release release;
+  return swapDistance_election(nn, mm, el1, el2, get_lookup(mm, false));
+}
+
+template <typename Vote>
+int compute_tswap(const votes_array<Vote> &elc1, const votes_array<Vote> &elc2){
+  VotesView<Vote> el1 = get_votes_view(elc1);
+  VotesView<Vote> el2 = get_votes_view(elc2);
+  int mm = (int) elc2.shape(1);
+  int nn = (int) elc1.shape(0);
+  py::gil_scoped_release release;
+  return tswapDistance_election(nn, mm, el1, el2, get_lookup(8, false), get_lookup(8, true));
+}
+
+template <typename Vote>
+int compute_spear(const votes_array<Vote> &elc1, const votes_array<Vote> &elc2){
+  VotesView<Vote> el1 = get_votes_view(elc1);
+  VotesView<Vote> el2 = get_votes_view(elc2);
+  int mm = (int) elc1.shape(1);
+  int nn = (int) elc1.shape(0);
+  py::gil_scoped_release release;
+  return spearDistance_election(nn, mm, el1, el2);
+}
+
+/*Computes the distances for many pairs of elections (of the same size) using a pool of threads*/
+template <typename Vote, typename Distance>
+py::array_t<long long> compute_pairs(const votes_array<Vote> &elections, const pairs_array &pairs,
+                                     int num_threads, Distance distance){
+  if (elections.ndim() != 3) {
+    throw std::invalid_argument("Elections should be a three-dimensional array.");
+  }
+  if (pairs.ndim() != 2 || pairs.shape(1) != 2) {
+    throw std::invalid_argument("Pairs should be an array of shape (num_pairs, 2).");
+  }
+  long long num_elections = elections.shape(0);
+  int n = (int) elections.shape(1);
+  int m = (int) elections.shape(2);
+  long long num_pairs = pairs.shape(0);
+  const Vote* data = elections.data();
+  const long long* pairs_data = pairs.data();
+  for (long long k = 0; k < 2 * num_pairs; k++) {
+    if (pairs_data[k] < 0 || pairs_data[k] >= num_elections) {
+      throw std::out_of_range("Index of an election out of range.");
+    }
+  }
+
+  py::array_t<long long> result(num_pairs);
+  long long* result_data = result.mutable_data();
+
+  if (num_threads <= 0) {
+    num_threads = std::max(1u, std::thread::hardware_concurrency());
+  }
+  num_threads = (int) std::min<long long>(num_threads, std::max(1LL, num_pairs));
+
+  {
+    py::gil_scoped_release release;
+    std::atomic<long long> next_pair(0);
+    auto worker = [&]() {
+      long long k;
+      while ((k = next_pair++) < num_pairs) {
+        VotesView<Vote> el1{data + pairs_data[2 * k] * n * m, m};
+        VotesView<Vote> el2{data + pairs_data[2 * k + 1] * n * m, m};
+        result_data[k] = distance(n, m, el1, el2);
+      }
+    };
+    std::vector<std::thread> threads;
+    for (int t = 1; t < num_threads; t++) {
+      threads.emplace_back(worker);
+    }
+    worker();
+    for (auto &thread : threads) {
+      thread.join();
+    }
+  }
+  return result;
+}
 
-  int mm = elc2[0].size();
-  int nn = elc1.size();
-  uint8_t* sswap_look=prec_map(mm);
-  int ddistance;
-  ddistance=swapDistance_election(nn, mm, elc1, elc2, sswap_look);
-  delete sswap_look;
-  return ddistance;
+template <typename Vote>
+py::array_t<long long> compute_swap_pairs(const votes_array<Vote> &elections,
+                                          const pairs_array &pairs, int num_threads){
+  int m = elections.ndim() == 3 ? (int) elections.shape(2) : 0;
+  check_num_candidates(m);
+  const uint8_t* lookup = get_lookup(m, false);
+  return compute_pairs(elections, pairs, num_threads,
+                       [lookup](int n, int m, const VotesView<Vote> &el1,
+                                const VotesView<Vote> &el2) {
+                         return swapDistance_election(n, m, el1, el2, lookup);
+                       });
 }
 
-int compute_tswap(const std::vector<std::vector<int>>  & elc1, const
-std::vector<std::vector<int>> & elc2){
-
-  int mm = elc2[0].size();
-  int nn = elc1.size();
-  uint8_t* sswap_look=prec_map(8);
-  uint8_t* sswap_look_trunc=prec_map_trunc(8);
-  int ddistance;
-  ddistance=tswapDistance_election(nn, mm, elc1, elc2, sswap_look, sswap_look_trunc);
-  delete sswap_look;
-  return ddistance;
+template <typename Vote>
+py::array_t<long long> compute_spear_pairs(const votes_array<Vote> &elections,
+                                           const pairs_array &pairs, int num_threads){
+  return compute_pairs(elections, pairs, num_threads,
+                       [](int n, int m, const VotesView<Vote> &el1, const VotesView<Vote> &el2) {
+                         return spearDistance_election(n, m, el1, el2);
+                       });
 }
 
-int compute_spear(const std::vector<std::vector<int>>  & elc1, const
-std::vector<std::vector<int>> & elc2){
-  int mm = elc1[0].size();
-  int nn = elc1.size();
-  int ddistance;
-  ddistance=spearDistance_election(nn, mm,elc1, elc2);
-  return ddistance;
+/*Binds the overloads for int8, int16 and int votes. pybind11 first tries all of them
+  without any conversion, so (contiguous) votes of these types are never copied;
+  the compact overloads never convert, so votes of any other type are cast to int*/
+template <typename Vote>
+void bind_distances(py::module_ &m, bool convert){
+    auto votes = [convert](const char* name) {
+        return convert ? py::arg(name) : py::arg(name).noconvert();
+    };
+    m.def("swapd", &compute_swap<Vote>, "Computes the swap distance between two elections.",
+          votes("elc1"), votes("elc2"));
+    m.def("tswapd", &compute_tswap<Vote>,
+          "Computes the truncated swap distance between two elections.",
+          votes("elc1"), votes("elc2"));
+    m.def("speard", &compute_spear<Vote>, "Computes the Spearman distance between two elections.",
+          votes("elc1"), votes("elc2"));
+    m.def("swapd_pairs", &compute_swap_pairs<Vote>,
+          "Computes the swap distances between many pairs of elections (using threads).",
+          votes("elections"), py::arg("pairs"), py::arg("num_threads") = 0);
+    m.def("speard_pairs", &compute_spear_pairs<Vote>,
+          "Computes the Spearman distances between many pairs of elections (using threads).",
+          votes("elections"), py::arg("pairs"), py::arg("num_threads") = 0);
 }
 
 PYBIND11_MODULE(cppdistances, m) {
     m.doc() = "C++ extension computing the swap and the Spearman distances";
-    m.def("swapd", &compute_swap, "Computes the swap distance between two elections.");
-    m.def("tswapd", &compute_tswap, "Computes the truncated swap distance between two elections.");
-    m.def("speard", &compute_spear, "Computes the Spearman distance between two elections.");
+    bind_distances<int8_t>(m, false);
+    bind_distances<int16_t>(m, false);
+    bind_distances<int>(m, true);
 }
@@ -1,151 +1,74 @@
 #!/usr/bin/env python
+"""
+Integer linear programs for the isomorphic Spearman and swap distances.
 
-import os
-from contextlib import suppress
-import scipy.special
+Variables: N[k, l] -- voter k is matched with voter l, M[i, j] -- candidate i is
+matched with candidate j, P[k, l, i, j] -- both of them hold.
 
-try:
-    import cplex
-except ImportError:
-    cplex = None
+The models are dense: n^2 m^2 variables P (and n^2 m^2 (m - 1)^2 / 2 more for swap),
+which is beyond HiGHS already for about 10 voters and 5 candidates. Hence the
+ilp_spearman and ilp_swap distances use these models only when a commercial
+backend (CPLEX or Gurobi) is the default one, and the exact Branch-and-Bound
+of bap_isomorphic otherwise.
+"""
 
+import logging
 
-# SPEARMAN
-def generate_ilp_spearman_distance(lp_file_name, votes_1, votes_2, params):
-    lp_file = open(lp_file_name, 'w')
-    lp_file.write("Minimize\n")
-
-    first = True
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-
-            vote_1 = votes_1[k]
-            vote_2 = votes_2[l]
-
-            pote_1 = [0] * params['candidates']
-            pote_2 = [0] * params['candidates']
-
-            for i in range(params['candidates']):
-                pote_1[vote_1[i]] = i
-                pote_2[vote_2[i]] = i
-
-            for i in range(params['candidates']):
-                for j in range(params['candidates']):
-                    if not first:
-                        lp_file.write(" + ")
-                    first = False
-
-                    weight = abs(pote_1[i] - pote_2[j])
-
-                    lp_file.write(
-                        str(weight) + " P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(
-                            j))
-    lp_file.write("\n")
-
-    lp_file.write("Subject To\n")
-
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i in range(params['candidates']):
-                for j in range(params['candidates']):
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-                    lp_file.write(" - " + "M" + "i" + str(i) + "j" + str(j) + " <= 0" + "\n")
-
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-                    lp_file.write(" - " + "N" + "k" + str(k) + "l" + str(l) + " <= 0" + "\n")
-
-    for k in range(params['voters']):
-        first = True
-        for l in range(params['voters']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("N" + "k" + str(k) + "l" + str(l))
-        lp_file.write(" = 1" + "\n")
-
-    for l in range(params['voters']):
-        first = True
-        for k in range(params['voters']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("N" + "k" + str(k) + "l" + str(l))
-        lp_file.write(" = 1" + "\n")
+import numpy as np
 
-    for i in range(params['candidates']):
-        first = True
-        for j in range(params['candidates']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("M" + "i" + str(i) + "j" + str(j))
-        lp_file.write(" = 1" + "\n")
-
-    for j in range(params['candidates']):
-        first = True
-        for i in range(params['candidates']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("M" + "i" + str(i) + "j" + str(j))
-        lp_file.write(" = 1" + "\n")
-
-    for k in range(params['voters']):
-        for i in range(params['candidates']):
-            first = True
-            for l in range(params['voters']):
-                for j in range(params['candidates']):
-                    if not first:
-                        lp_file.write(" + ")
-                    first = False
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-            lp_file.write(" = 1" + "\n")
-
-    for l in range(params['voters']):
-        for j in range(params['candidates']):
-            first = True
-            for k in range(params['voters']):
-                for i in range(params['candidates']):
-                    if not first:
-                        lp_file.write(" + ")
-                    first = False
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-            lp_file.write(" = 1" + "\n")
-
-    lp_file.write("Binary\n")
-
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i in range(params['candidates']):
-                for j in range(params['candidates']):
-                    lp_file.write(
-                        "P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j) + "\n")
-
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            lp_file.write("N" + "k" + str(k) + "l" + str(l) + "\n")
+from mapel.elections.distances import milp
+from mapel.elections.distances.bap_isomorphic import get_positions
 
-    for i in range(params['candidates']):
-        for j in range(params['candidates']):
-            lp_file.write("M" + "i" + str(i) + "j" + str(j) + "\n")
 
-    lp_file.write("End\n")
+def is_ilp_backend_configured() -> bool:
+    """ Return: True if the default backend can solve the (dense) models in practice """
+    return milp.default_backend != 'highs'
 
 
-def solve_ilp_distance(path):
-    cp_lp = cplex.Cplex(path)
-    cp_lp.set_results_stream(None)
+def _add_matching_variables(model: milp.Model, num_voters: int, num_candidates: int,
+                            obj=0.) -> (np.ndarray, np.ndarray, np.ndarray):
+    """ Adds the N, M and P variables (and constraints linking them) to the model """
+    n, m = num_voters, num_candidates
+    P = model.add_variables((n, n, m, m), obj=obj, vtype=milp.BINARY)
+    N = model.add_variables((n, n), vtype=milp.BINARY)
+    M = model.add_variables((m, m), vtype=milp.BINARY)
 
-    cp_lp.parameters.threads.set(1)
+    # N and M are permutation matrices
+    for X in (N, M):
+        model.add_constraints(X, lb=1, ub=1)
+        model.add_constraints(X.T, lb=1, ub=1)
 
-    try:
-        cp_lp.solve()
+    # P = N * M, linearized with equalities (implying P <= N, P <= M and
+    # that every pair (voter, candidate) is matched exactly once)
+    _add_sum_equals(model, P.transpose(0, 1, 2, 3), N[:, :, None])
+    _add_sum_equals(model, P.transpose(0, 1, 3, 2), N[:, :, None])
+    _add_sum_equals(model, P.transpose(0, 2, 3, 1), M[None, :, :])
+    _add_sum_equals(model, P.transpose(1, 2, 3, 0), M[None, :, :])
+    return N, M, P
 
-    except cplex.CplexSolverError:
-        print("Exception raised during solve")
-        return
 
-    return cp_lp.solution.get_objective_value()
+def _add_sum_equals(model: milp.Model, X: np.ndarray, Y: np.ndarray) -> None:
+    """ Adds the constraints sum of X over its last axis == Y """
+    Y = np.broadcast_to(Y, X.shape[:-1])[..., None]
+    variables = np.concatenate([X, Y], axis=-1).reshape(-1, X.shape[-1] + 1)
+    coefficients = np.append(np.ones(X.shape[-1]), -1.)
+    model.add_constraints(variables, coefficients, lb=0, ub=0)
+
+
+# SPEARMAN
+def solve_ilp_spearman_distance(votes_1, votes_2, params, backend: str = None) -> float:
+    """ Return: Spearman distance between the elections (None if the ILP was not solved) """
+    positions_1, positions_2 = get_positions(votes_1), get_positions(votes_2)
+    weights = np.abs(positions_1[:, None, :, None] - positions_2[None, :, None, :])
+
+    model = milp.Model(sense='min')
+    _add_matching_variables(model, params['voters'], params['candidates'], obj=weights)
+
+    solution = model.solve(backend=backend)
+    if not solution.is_optimal:
+        logging.warning("The ILP was not solved")
+        return
+    return solution.objective
 
 
 def spearman_cost(single_votes_1, single_votes_2, params, perm):
@@ -183,450 +106,35 @@ def spearman_cost_per_cand(single_votes_1, single_votes_2, params, perm):
     return cand_diff
 
 
-def remove_lp_file(path):
-    """ Safely remove lp file """
-    with suppress(OSError):
-        os.remove(path)
-
-
 # SWAP
-def generate_ilp_swap_distance(lp_file_name, votes_1, votes_2, params):
-
-    all = int(params['voters'] * scipy.special.binom(params['candidates'], 2))
-
-    lp_file = open(lp_file_name, 'w')
-    lp_file.write("Minimize\n")
-
-    first = True
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-
-            # pote_1 = [0] * params['candidates']
-            # pote_2 = [0] * params['candidates']
-            #
-            # for i in range(params['candidates']):
-            #     pote_1[votes_1[k][i]] = i
-            #     pote_2[votes_2[l][i]] = i
-
-            vote_1 = votes_1[k]
-            vote_2 = votes_2[l]
-
-            pote_1 = [list(vote_1).index(i) for i, _ in enumerate(vote_1)]
-            pote_2 = [list(vote_2).index(i) for i, _ in enumerate(vote_2)]
-
-            # pote_1 = [0] * params['candidates']
-            # pote_2 = [0] * params['candidates']
-
-            # for i in range(params['candidates']):
-            #     pote_1[vote_1[i]] = i
-            #     pote_2[vote_2[i]] = i
-
-            for i1 in range(params['candidates']):
-                for j1 in range(params['candidates']):
-                    for i2 in range(i1+1, params['candidates']):
-                    # for i2 in range(params['candidates']):
-                        for j2 in range(params['candidates']):
-
-                            if i1 == i2 or j1 == j2:
-                                continue
-
-                            # if k==1 and l==0 and i1==0 and j1==2 and i2==1 and j2==1:
-                            #     print(pote_1[i1], pote_2[j1], pote_1[i2], pote_2[j2])
-
-                            # if (pote_1[i1] > pote_2[j1] and pote_1[i2] < pote_2[j2]) or \
-                            #         (pote_1[i1] < pote_2[j1] and pote_1[i2] > pote_2[j2]):
-                            if (pote_1[i1] > pote_1[i2] and pote_2[j1] < pote_2[j2]) or \
-                                    (pote_1[i1] < pote_1[i2] and pote_2[j1] > pote_2[j2]) :
-
-                                if not first:
-                                    lp_file.write(" + ")
-                                first = False
-                                lp_file.write(" R" + "k" + str(k) + "l" + str(l) + "i" + str(i1) + "j" + str(
-                                    j1) + "i" + str(i2) + "j" + str(j2))
-    lp_file.write("\n")
-
-    lp_file.write("Subject To\n")
-
-    # N=1
-    for k in range(params['voters']):
-        first = True
-        for l in range(params['voters']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("N" + "k" + str(k) + "l" + str(l))
-        lp_file.write(" = 1" + "\n")
-
-    # N=1
-    for l in range(params['voters']):
-        first = True
-        for k in range(params['voters']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("N" + "k" + str(k) + "l" + str(l))
-        lp_file.write(" = 1" + "\n")
-
-    # M=1
-    for i in range(params['candidates']):
-        first = True
-        for j in range(params['candidates']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("M" + "i" + str(i) + "j" + str(j))
-        lp_file.write(" = 1" + "\n")
-
-    # M=1
-    for j in range(params['candidates']):
-        first = True
-        for i in range(params['candidates']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("M" + "i" + str(i) + "j" + str(j))
-        lp_file.write(" = 1" + "\n")
-
-    # P=1
-    for k in range(params['voters']):
-        for i in range(params['candidates']):
-            first = True
-            for l in range(params['voters']):
-                for j in range(params['candidates']):
-                    if not first:
-                        lp_file.write(" + ")
-                    first = False
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-            lp_file.write(" = 1" + "\n")
-
-    # P=1
-    for l in range(params['voters']):
-        for j in range(params['candidates']):
-            first = True
-            for k in range(params['voters']):
-                for i in range(params['candidates']):
-                    if not first:
-                        lp_file.write(" + ")
-                    first = False
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-            lp_file.write(" = 1" + "\n")
-
-    # P<N, P<M
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i in range(params['candidates']):
-                for j in range(params['candidates']):
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-                    lp_file.write(" - " + "N" + "k" + str(k) + "l" + str(l) + " <= 0" + "\n")
-
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-                    lp_file.write(" - " + "M" + "i" + str(i) + "j" + str(j) + " <= 0" + "\n")
-
-    # All
-    first = True
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i1 in range(params['candidates']):
-                for j1 in range(params['candidates']):
-                    for i2 in range(i1+1, params['candidates']):
-                    # for i2 in range(params['candidates']):
-                        for j2 in range(params['candidates']):
-
-                            if i1 == i2 or j1 == j2:
-                                continue
-
-                            if not first:
-                                lp_file.write(" + ")
-                            first = False
-                            lp_file.write("R" + "k" + str(k) + "l" + str(l) + "i" + str(i1) + "j" + str(j1) + "i" + str(
-                                i2) + "j" + str(j2))
-    lp_file.write(" = " + str(all) + "\n")
-
-    # R<P, R<P
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i1 in range(params['candidates']):
-                for j1 in range(params['candidates']):
-                    for i2 in range(i1+1, params['candidates']):
-                    # for i2 in range(params['candidates']):
-                        for j2 in range(params['candidates']):
-
-                            if i1 == i2 or j1 == j2:
-                                continue
-
-                            lp_file.write("R" + "k" + str(k) + "l" + str(l) + "i" + str(i1) + "j" + str(j1) + "i" + str(
-                                i2) + "j" + str(j2))
-                            lp_file.write(" - " + "P" + "k" + str(k) + "l" + str(l) + "i" + str(i1) + "j" + str(
-                                j1) + " <= 0" + "\n")
-
-                            lp_file.write("R" + "k" + str(k) + "l" + str(l) + "i" + str(i1) + "j" + str(j1) + "i" + str(
-                                i2) + "j" + str(j2))
-                            lp_file.write(" - " + "P" + "k" + str(k) + "l" + str(l) + "i" + str(i2) + "j" + str(
-                                j2) + " <= 0" + "\n")
-
-    lp_file.write("Binary\n")
-
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i1 in range(params['candidates']):
-                for j1 in range(params['candidates']):
-                    for i2 in range(i1+1, params['candidates']):
-                    # for i2 in range(params['candidates']):
-                        for j2 in range(params['candidates']):
-
-                            if i1 == i2 or j1 == j2:
-                                continue
-
-                            lp_file.write("R" + "k" + str(k) + "l" + str(l) + "i" + str(i1) + "j" + str(j1) + "i" + str(
-                                i2) + "j" + str(j2) + "\n")
-
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i in range(params['candidates']):
-                for j in range(params['candidates']):
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j) + "\n")
-
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            lp_file.write("N" + "k" + str(k) + "l" + str(l) + "\n")
-
-    for i in range(params['candidates']):
-        for j in range(params['candidates']):
-            lp_file.write("M" + "i" + str(i) + "j" + str(j) + "\n")
-
-    lp_file.write("End\n")
-
-
-def generate_ilp_distance_swap_short(lp_file_name, votes_1, votes_2, params):
-    lp_file = open(lp_file_name, 'w')
-    lp_file.write("Minimize\n")  # obj: ")
-
-    first = True
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-
-            pote_1 = [0] * params['candidates']
-            pote_2 = [0] * params['candidates']
-
-            for i in range(params['candidates']):
-                pote_1[votes_1[k][i]] = i
-                pote_2[votes_2[l][i]] = i
-
-            for i1 in range(params['candidates']):
-                for j1 in range(params['candidates']):
-                    for i2 in range(params['candidates']):
-                        for j2 in range(params['candidates']):
-
-
-
-                            if not first:
-                                lp_file.write(" + ")
-                            first = False
-
-                            if pote_1[i1] > pote_2[i2] and pote_1[j1] < pote_2[j2]:
-                                weight = 1
-                            elif pote_1[i1] < pote_2[i2] and pote_1[j1] > pote_2[j2]:
-                                weight = 1
-                            else:
-                                weight = 0
-
-                            lp_file.write(str(weight) + " R" + str(k) + str(l) + str(i1) + str(j1) + str(i2) + str(j2))
-    lp_file.write("\n")
-
-    lp_file.write("Subject To\n")
-
-    # N=1
-    for k in range(params['voters']):
-        first = True
-        for l in range(params['voters']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("N" + "k" + str(k) + "l" + str(l))
-        lp_file.write(" = 1" + "\n")
-
-    # N=1
-    for l in range(params['voters']):
-        first = True
-        for k in range(params['voters']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("N" + "k" + str(k) + "l" + str(l))
-        lp_file.write(" = 1" + "\n")
-
-    # M=1
-    for i in range(params['candidates']):
-        first = True
-        for j in range(params['candidates']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("M" + "i" + str(i) + "j" + str(j))
-        lp_file.write(" = 1" + "\n")
-
-    # M=1
-    for j in range(params['candidates']):
-        first = True
-        for i in range(params['candidates']):
-            if not first:
-                lp_file.write(" + ")
-            first = False
-            lp_file.write("M" + "i" + str(i) + "j" + str(j))
-        lp_file.write(" = 1" + "\n")
-
-    # P=1
-    for k in range(params['voters']):
-        for i in range(params['candidates']):
-            first = True
-            for l in range(params['voters']):
-                for j in range(params['candidates']):
-                    if not first:
-                        lp_file.write(" + ")
-                    first = False
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-            lp_file.write(" = 1" + "\n")
-
-    # P=1
-    for l in range(params['voters']):
-        for j in range(params['candidates']):
-            first = True
-            for k in range(params['voters']):
-                for i in range(params['candidates']):
-                    if not first:
-                        lp_file.write(" + ")
-                    first = False
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-            lp_file.write(" = 1" + "\n")
-
-    # P<N, P<M
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i in range(params['candidates']):
-                for j in range(params['candidates']):
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-                    lp_file.write(" - " + "N" + "k" + str(k) + "l" + str(l) + " <= 0" + "\n")
-
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j))
-                    lp_file.write(" - " + "M" + "i" + str(i) + "j" + str(j) + " <= 0" + "\n")
-
-    # R=M
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i1 in range(params['candidates']):
-                for j1 in range(params['candidates']):
-                    first = True
-                    for i2 in range(params['candidates']):
-                        for j2 in range(params['candidates']):
-                            if not first:
-                                lp_file.write(" + ")
-                            first = False
-                            lp_file.write("R" + "k" + str(k) + "l" + str(l) + str(i1) + str(j1) + str(i2) + str(j2))
-                    lp_file.write(" = " + str(params['candidates']) + "\n")
-
-    # R=M
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i2 in range(params['candidates']):
-                for j2 in range(params['candidates']):
-                    first = True
-                    for i1 in range(params['candidates']):
-                        for j1 in range(params['candidates']):
-                            if not first:
-                                lp_file.write(" + ")
-                            first = False
-                            lp_file.write("R" + str(k) + str(l) + str(i1) + str(j1) + str(i2) + str(j2))
-                    lp_file.write(" = " + str(params['candidates']) + "\n")
-
-    # R<P, R<P
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i1 in range(params['candidates']):
-                for j1 in range(params['candidates']):
-                    for i2 in range(params['candidates']):
-                        for j2 in range(params['candidates']):
-
-                            lp_file.write("R" + str(k) + str(l) + str(i1) + str(j1) + str(i2) + str(j2))
-                            lp_file.write(" - " + "P" + "k" + str(k) + "l" + str(l) + "i" + str(i1) + "j" + str(
-                                j1) + " <= 0" + "\n")
-
-
-                            lp_file.write("R" + str(k) + str(l) + str(i1) + str(j1) + str(i2) + str(j2))
-                            lp_file.write(" - " + "P" + "k" + str(k) + "l" + str(l) + "i" + str(i2) + "j" + str(
-                                j2) + " <= 0" + "\n")
-
-    lp_file.write("Binary\n")
-
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i1 in range(params['candidates']):
-                for j1 in range(params['candidates']):
-                    for i2 in range(params['candidates']):
-                        for j2 in range(params['candidates']):
-                            lp_file.write("R" + str(k) + str(l) + str(i1) + str(j1) + str(i2) + str(j2) + "\n")
-
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            for i in range(params['candidates']):
-                for j in range(params['candidates']):
-                    lp_file.write("P" + "k" + str(k) + "l" + str(l) + "i" + str(i) + "j" + str(j) + "\n")
-
-    for k in range(params['voters']):
-        for l in range(params['voters']):
-            lp_file.write("N" + "k" + str(k) + "l" + str(l) + "\n")
-
-    for i in range(params['candidates']):
-        for j in range(params['candidates']):
-            lp_file.write("M" + "i" + str(i) + "j" + str(j) + "\n")
-
-    lp_file.write("End\n")
-
-
-def solve_ilp_distance_swap(path, votes_1, votes_2, params):
-
-    cp_lp = cplex.Cplex(path)
-    cp_lp.set_results_stream(None)
-
-    cp_lp.parameters.threads.set(1)
-
-    try:
-        cp_lp.solve()
-
-    except:
-        print("Exception raised during solve")
+def solve_ilp_swap_distance(votes_1, votes_2, params, backend: str = None) -> float:
+    """ Return: swap distance between the elections (None if the ILP was not solved) """
+    n, m = params['voters'], params['candidates']
+    positions_1, positions_2 = get_positions(votes_1), get_positions(votes_2)
+
+    model = milp.Model(sense='min')
+    N, M, P = _add_matching_variables(model, n, m)
+
+    # R[k, l, (i1, i2), (j1, j2)] -- i1 < i2 are matched with j1 != j2 (and k with l)
+    i1, i2 = np.triu_indices(m, k=1)
+    j1, j2 = np.nonzero(~np.eye(m, dtype=bool))
+    above_1 = positions_1[:, i1] > positions_1[:, i2]
+    above_2 = positions_2[:, j1] > positions_2[:, j2]
+    discordant = above_1[:, None, :, None] != above_2[None, :, None, :]
+    R = model.add_variables(discordant.shape, obj=discordant, vtype=milp.BINARY)
+
+    # every pair of voters and pair of candidates is matched exactly once:
+    # sum over j2 of R[k, l, (i1, i2), (j1, j2)] == P[k, l, i1, j1] (and symmetrically)
+    num_pairs = len(i1)
+    R_by_j1 = R.reshape(n, n, num_pairs, m, m - 1)
+    _add_sum_equals(model, R_by_j1, P[:, :, i1, :])
+    R_by_j2 = np.empty((n, n, num_pairs, m, m - 1), dtype=R.dtype)
+    for j in range(m):
+        R_by_j2[:, :, :, j, :] = R[:, :, :, j2 == j]
+    _add_sum_equals(model, R_by_j2, P[:, :, i2, :])
+
+    solution = model.solve(backend=backend)
+    if not solution.is_optimal:
+        logging.warning("The ILP was not solved")
         return
-
-    # total = 0
-    # for k in range(params['voters']):
-    #     for l in range(params['voters']):
-    #
-    #         pote_1 = [0] * params['candidates']
-    #         pote_2 = [0] * params['candidates']
-    #
-    #         for i in range(params['candidates']):
-    #             pote_1[votes_1[k][i]] = i
-    #             pote_2[votes_2[l][i]] = i
-    #
-    #         for i1 in range(params['candidates']):
-    #             for j1 in range(params['candidates']):
-    #                 for i2 in range(i1+1, params['candidates']):
-    #                     for j2 in range(params['candidates']):
-    #
-    #                         if i1 == i2 or j1 == j2:
-    #                             continue
-    #
-    #                         if pote_1[i1] > pote_2[j1] and pote_1[i2] < pote_2[j2]:
-    #                             weight = 1
-    #                         elif pote_1[i1] < pote_2[j1] and pote_1[i2] > pote_2[j2]:
-    #                             weight = 1
-    #                         else:
-    #                             weight = 0
-    #
-    #                         A = "R" + "k" + str(k) + "l" + str(l) + "i" + str(i1) + "j" + str(j1) + "i" + str(i2) + "j" + str(j2)
-    #                         # print(weight, int(cp_lp.solution.get_values(A)))
-    #                         if int(cp_lp.solution.get_values(A)) == 1:
-    #                             print(A, weight)
-    #                         total += weight * int(cp_lp.solution.get_values(A))
-    # print(f'total {total}')
-
-    return cp_lp.solution.get_objective_value()
\ No newline at end of file
+    return solution.objective
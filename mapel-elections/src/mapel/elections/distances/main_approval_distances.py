@@ -2,9 +2,8 @@
 
 from typing import Callable
 
-import os
-
 from mapel.core.matchings import *
+from mapel.elections.distances import lp
 from mapel.elections.objects.ApprovalElection import ApprovalElection
 
 
@@ -18,18 +17,13 @@ def compute_approvalwise(election_1: ApprovalElection, election_2: ApprovalElect
     return inner_distance(election_1.approvalwise_vector, election_2.approvalwise_vector), None
 
 
-def compute_hamming(election_1: ApprovalElection, election_2: ApprovalElection) -> float:
+def compute_hamming(election_1: ApprovalElection, election_2: ApprovalElection) -> (float, list):
     """ Return: Hamming distance """
     votes_1 = election_1.votes
     votes_2 = election_2.votes
     params = {'voters': election_1.num_voters, 'candidates': election_2.num_candidates}
-    file_name = f'{np.random.random()}.lp'
-    path = os.path.join(os.getcwd(), "trash", file_name)
-    lp.generate_ilp_distance(path, votes_1, votes_2, params, 'hamming')
-    objective_value = lp.solve_ilp_distance(path, votes_1, votes_2, params, 'hamming')
-    objective_value /= election_1.num_candidates  # ANALYZE THIS LINE
-    lp.remove_lp_file(path)
-    return objective_value
+    objective_value = lp.solve_ilp_hamming_distance(votes_1, votes_2, params)
+    return objective_value, None
 
 
 # # # # # # # # # # # # # # # #
@@ -1,5 +1,4 @@
 import logging
-import os
 from typing import Callable, List, Union
 from itertools import combinations, permutations
 
@@ -8,6 +7,7 @@ from mapel.elections.objects.OrdinalElection import OrdinalElection
 import mapel.core.utils as utils
 from mapel.core.inner_distances import swap_distance
 import mapel.elections.distances.ilp_isomorphic as ilp_iso
+import mapel.elections.distances.bap_isomorphic as bap_iso
 
 import mapel.elections.distances.lp as lp
 
@@ -55,11 +55,20 @@ def compute_pairwise_distance(election_1: OrdinalElection, election_2: OrdinalEl
                               inner_distance: Callable) -> (float, list):
     """ Compute Pairwise distance between ordinal elections """
     length = election_1.num_candidates
-    matrix_1 = election_1.votes_to_pairwise_matrix()
-    matrix_2 = election_2.votes_to_pairwise_matrix()
+    matrix_1 = election_1.get_pairwise_matrix()
+    matrix_2 = election_2.get_pairwise_matrix()
     return solve_matching_matrices(matrix_1, matrix_2, length, inner_distance), None
 
 
+def compute_pairwise_distance_approx(election_1: OrdinalElection, election_2: OrdinalElection,
+                                     inner_distance: Callable) -> (float, list):
+    """ Compute upper bound on Pairwise distance between ordinal elections """
+    length = election_1.num_candidates
+    matrix_1 = election_1.get_pairwise_matrix()
+    matrix_2 = election_2.get_pairwise_matrix()
+    return solve_matching_matrices_approx(matrix_1, matrix_2, length, inner_distance)
+
+
 def compute_voterlikeness_distance(election_1: OrdinalElection, election_2: OrdinalElection,
                                    inner_distance: Callable) -> (float, list):
     """ Compute Voterlikeness distance between elections """
@@ -69,6 +78,16 @@ def compute_voterlikeness_distance(election_1: OrdinalElection, election_2: Ordi
     return solve_matching_matrices(matrix_1, matrix_2, length, inner_distance), None
 
 
+def compute_voterlikeness_distance_approx(election_1: OrdinalElection,
+                                          election_2: OrdinalElection,
+                                          inner_distance: Callable) -> (float, list):
+    """ Compute upper bound on Voterlikeness distance between elections """
+    length = election_1.num_voters
+    matrix_1 = election_1.votes_to_voterlikeness_matrix()
+    matrix_2 = election_2.votes_to_voterlikeness_matrix()
+    return solve_matching_matrices_approx(matrix_1, matrix_2, length, inner_distance)
+
+
 # DEPRECATED
 def compute_swap_distance_bf(election_1: OrdinalElection,
                              election_2: OrdinalElection) -> (int, list):
@@ -84,18 +103,14 @@ def compute_swap_distance(election_1: OrdinalElection,
                           election_2: OrdinalElection) -> (int, list):
     """ Compute swap distance between elections (using the C++ extension) """
     if not utils.is_module_loaded("mapel.elections.distances.cppdistances"):
-        print("Using ILP instead of C++ BF")
-        return compute_swap_distance_ilp_py(election_1, election_2), None
+        return compute_swap_distance_bb(election_1, election_2)
 
     if election_1.num_candidates < election_2.num_candidates:
-        swapd = cppd.tswapd(election_1.votes.tolist(),
-                           election_2.votes.tolist())
+        swapd = cppd.tswapd(election_1.votes, election_2.votes)
     elif election_1.num_candidates > election_2.num_candidates:
-        swapd = cppd.tswapd(election_2.votes.tolist(),
-                           election_1.votes.tolist())
+        swapd = cppd.tswapd(election_2.votes, election_1.votes)
     else:
-        swapd = cppd.swapd(election_1.votes.tolist(),
-                           election_2.votes.tolist())
+        swapd = cppd.swapd(election_1.votes, election_2.votes)
 
     return swapd, None
 
@@ -114,9 +129,8 @@ def compute_spearman_distance(election_1: OrdinalElection,
                               election_2: OrdinalElection) -> (int, list):
     """ Compute Spearman distance between elections (using the C++ extension) """
     if not utils.is_module_loaded("mapel.elections.distances.cppdistances"):
-        return compute_spearman_distance_ilp_py(election_1, election_2), None
-    speard = cppd.speard(election_1.votes.tolist(),
-                         election_2.votes.tolist())
+        return compute_spearman_distance_bb(election_1, election_2)
+    speard = cppd.speard(election_1.votes, election_2.votes)
     return speard, None
 
 
@@ -175,36 +189,60 @@ def compute_spearman_distance_fastmap(
     return d, None
 
 
+def compute_swap_distance_bb(election_1: OrdinalElection,
+                             election_2: OrdinalElection) -> (int, list):
+    """ Compute swap distance between elections (using Branch-and-Bound) """
+    objective_value, _ = bap_iso.solve_bap_bb(election_1.votes, election_2.votes, 'swap')
+    return objective_value, None
+
+
+def compute_swap_distance_aa(election_1: OrdinalElection,
+                             election_2: OrdinalElection) -> (int, list):
+    """ Compute upper bound on swap distance between elections (using Alternating Algorithm) """
+    objective_value, _ = bap_iso.solve_bap_aa(election_1.votes, election_2.votes, 'swap')
+    return objective_value, None
+
+
+def compute_spearman_distance_bb(election_1: OrdinalElection,
+                                 election_2: OrdinalElection) -> (int, list):
+    """ Compute Spearman distance between elections (using Branch-and-Bound) """
+    objective_value, _ = bap_iso.solve_bap_bb(election_1.votes, election_2.votes, 'spearman')
+    return objective_value, None
+
+
+def compute_spearman_distance_aa(election_1: OrdinalElection,
+                                 election_2: OrdinalElection) -> (int, list):
+    """ Compute upper bound on Spearman distance between elections (using Alternating Algorithm) """
+    objective_value, _ = bap_iso.solve_bap_aa(election_1.votes, election_2.votes, 'spearman')
+    return objective_value, None
+
+
 def compute_spearman_distance_ilp_py(election_1: OrdinalElection,
                                      election_2: OrdinalElection) -> (int, list):
     """ Compute Spearman distance between elections """
+    if not ilp_iso.is_ilp_backend_configured():
+        return compute_spearman_distance_bb(election_1, election_2)
     votes_1 = election_1.votes
     votes_2 = election_2.votes
     params = {'voters': election_1.num_voters,
               'candidates': election_1.num_candidates}
 
-    file_name = f'{np.random.random()}.lp'
-    path = os.path.join(os.getcwd(), "trash", file_name)
-    ilp_iso.generate_ilp_spearman_distance(path, votes_1, votes_2, params)
-    objective_value = ilp_iso.solve_ilp_distance(path)
-    ilp_iso.remove_lp_file(path)
+    objective_value = ilp_iso.solve_ilp_spearman_distance(votes_1, votes_2, params)
     objective_value = int(round(objective_value, 0))
     return objective_value, None
 
 
 def compute_swap_distance_ilp_py(election_1: OrdinalElection,
                                  election_2: OrdinalElection) -> (int, list):
-    """ Compute Spearman distance between elections """
+    """ Compute swap distance between elections """
+    if not ilp_iso.is_ilp_backend_configured():
+        return compute_swap_distance_bb(election_1, election_2)
     votes_1 = election_1.votes
     votes_2 = election_2.votes
     params = {'voters': election_1.num_voters,
               'candidates': election_1.num_candidates}
 
-    file_name = f'{np.random.random()}.lp'
-    path = os.path.join(os.getcwd(), 'trash', file_name)
-    ilp_iso.generate_ilp_swap_distance(path, votes_1, votes_2, params)
-    objective_value = ilp_iso.solve_ilp_distance_swap(path, votes_1, votes_2, params)
-    ilp_iso.remove_lp_file(path)
+    objective_value = ilp_iso.solve_ilp_swap_distance(votes_1, votes_2, params)
     objective_value = int(round(objective_value, 0))
     return objective_value, None
 
@@ -223,22 +261,18 @@ def compute_voter_subelection(election_1: OrdinalElection, election_2: OrdinalEl
 
 def compute_candidate_subelection(election_1: OrdinalElection, election_2: OrdinalElection) -> int:
     """ Compute Candidate-Subelection """
-    file_name = f'{np.random.random()}.lp'
-    path = os.path.join(os.getcwd(), 'trash', file_name)
-    objective_value = lp.solve_lp_candidate_subelections(path, election_1, election_2)
-    lp.remove_lp_file(path)
-    return objective_value
+    return lp.solve_lp_candidate_subelections(election_1, election_2)
 
 
 # HELPER FUNCTIONS #
 def get_matching_cost_pos_swap(election_1: OrdinalElection, election_2: OrdinalElection,
                                matching) -> List[list]:
     """ Return: Cost table """
-    votes_1 = election_1.votes
-    votes_2 = election_2.votes
-    size = election_1.num_voters
-    return [[swap_distance(votes_1[i], votes_2[j], matching=matching) for i in range(size)]
-            for j in range(size)]
+    votes_1, _ = election_1.get_distinct_votes()
+    votes_2, _ = election_2.get_distinct_votes()
+    cost_table = np.array([[swap_distance(list(vote_1), list(vote_2), matching=matching)
+                            for vote_1 in votes_1] for vote_2 in votes_2])
+    return _expand_cost_table(cost_table, election_2, election_1)
 
 
 def get_matching_cost_positionwise(election_1: OrdinalElection, election_2: OrdinalElection,
@@ -251,47 +285,37 @@ def get_matching_cost_positionwise(election_1: OrdinalElection, election_2: Ordi
     return [[inner_distance(vectors_1[i], vectors_2[j]) for i in range(size)] for j in range(size)]
 
 
+def _expand_cost_table(cost_table, election_1: OrdinalElection,
+                       election_2: OrdinalElection) -> np.ndarray:
+    """ Return: Cost table between the voters (from the one between the distinct votes) """
+    return cost_table[np.ix_(election_1.get_vote_indices(), election_2.get_vote_indices())]
+
+
 def get_matching_cost_swap_bf(election_1: OrdinalElection, election_2: OrdinalElection,
                               mapping):
-    """ Return: Cost table """
-    cost_table = np.zeros([election_1.num_voters, election_1.num_voters])
+    """ Return: Cost table (computed for the distinct votes only) """
+    potes_1 = election_1.get_distinct_potes()
+    potes_2 = election_2.get_distinct_potes()
+    cost_table = np.zeros([len(potes_1), len(potes_2)])
 
-    election_1.get_potes()
-    election_2.get_potes()
-
-    for v1 in range(election_1.num_voters):
-        for v2 in range(election_2.num_voters):
+    for v1 in range(len(potes_1)):
+        for v2 in range(len(potes_2)):
             swap_distance = 0
-            for i, j in combinations(election_1.potes[0], 2):
-                if (election_1.potes[v1][i] > election_1.potes[v1][j] and
-                    election_2.potes[v2][mapping[i]] < election_2.potes[v2][mapping[j]]) or \
-                        (election_1.potes[v1][i] < election_1.potes[v1][j] and
-                         election_2.potes[v2][mapping[i]] > election_2.potes[v2][mapping[j]]):
+            for i, j in combinations(range(election_1.num_candidates), 2):
+                if (potes_1[v1][i] > potes_1[v1][j] and
+                    potes_2[v2][mapping[i]] < potes_2[v2][mapping[j]]) or \
+                        (potes_1[v1][i] < potes_1[v1][j] and
+                         potes_2[v2][mapping[i]] > potes_2[v2][mapping[j]]):
                     swap_distance += 1
             cost_table[v1][v2] = swap_distance
-    return cost_table
+    return _expand_cost_table(cost_table, election_1, election_2)
 
 
 def get_matching_cost_truncated_swap_bf(election_1: OrdinalElection,
                                         election_2: OrdinalElection,
                                         mapping):
     """ Return: Cost table """
-    cost_table = np.zeros([election_1.num_voters, election_1.num_voters])
-
-    election_1.get_potes()
-    election_2.get_potes()
-
-    for v1 in range(election_1.num_voters):
-        for v2 in range(election_2.num_voters):
-            swap_distance = 0
-            for i, j in combinations(election_1.potes[0], 2):
-                if (election_1.potes[v1][i] > election_1.potes[v1][j] and
-                    election_2.potes[v2][mapping[i]] < election_2.potes[v2][mapping[j]]) or \
-                        (election_1.potes[v1][i] < election_1.potes[v1][j] and
-                         election_2.potes[v2][mapping[i]] > election_2.potes[v2][mapping[j]]):
-                    swap_distance += 1
-            cost_table[v1][v2] = swap_distance
-    return cost_table
+    return get_matching_cost_swap_bf(election_1, election_2, mapping)
 
 
 def compute_blank_distance(election_1: OrdinalElection,
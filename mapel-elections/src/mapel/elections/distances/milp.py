@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+"""
+In-memory (mixed integer) linear programs solved by pluggable backends.
+
+The models are built from NumPy index arrays into one sparse constraint matrix,
+so nothing is written to disk and no variable names are generated. They are
+solved with HiGHS (through `scipy.optimize.milp`) by default; CPLEX and Gurobi
+are optional backends, used only when their Python packages are installed.
+
+Example
+-------
+    model = Model(sense='min')
+    x = model.add_variables((n, n), obj=cost_table, vtype=BINARY)
+    model.add_constraints(x, lb=1, ub=1)      # rows of x sum up to one
+    model.add_constraints(x.T, lb=1, ub=1)    # columns of x sum up to one
+    solution = model.solve()
+    solution.objective, solution[x]
+"""
+
+import logging
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import milp, Bounds, LinearConstraint
+
+try:
+    import cplex
+except ImportError:
+    cplex = None
+
+try:
+    import gurobipy as gp
+except ImportError:
+    gp = None
+
+CONTINUOUS = 'continuous'
+INTEGER = 'integer'
+BINARY = 'binary'
+
+OPTIMAL = 'optimal'
+INFEASIBLE = 'infeasible'
+FAILED = 'failed'
+
+
+class Solution:
+    """ Result of solving a model """
+
+    def __init__(self, status: str, objective: float = None, values: np.ndarray = None):
+        self.status = status
+        self.objective = objective
+        self.values = values
+
+    @property
+    def is_optimal(self) -> bool:
+        return self.status == OPTIMAL
+
+    def __getitem__(self, variables) -> np.ndarray:
+        """ Return: values of the given variables (array of indices) """
+        return self.values[np.asarray(variables)]
+
+
+class Model:
+    """ Linear program with (optionally) integer variables """
+
+    def __init__(self, sense: str = 'min'):
+        if sense not in ('min', 'max'):
+            raise ValueError(f'Unknown sense: {sense}')
+        self.sense = sense
+        self.num_variables = 0
+        self.num_constraints = 0
+        self._obj, self._lb, self._ub, self._vtypes = [], [], [], []
+        self._rows, self._cols, self._vals = [], [], []
+        self._row_lb, self._row_ub = [], []
+
+    def add_variables(self, shape, obj=0., lb=0., ub=np.inf, vtype: str = CONTINUOUS) -> np.ndarray:
+        """
+        Adds an array of variables.
+
+        Parameters
+        ----------
+            shape
+                Shape of the array of variables.
+            obj
+                Objective coefficients (scalar or array broadcastable to shape).
+            lb
+                Lower bounds (scalar or array broadcastable to shape).
+            ub
+                Upper bounds (scalar or array broadcastable to shape).
+            vtype : str
+                CONTINUOUS, INTEGER or BINARY.
+        Returns
+        -------
+            np.ndarray
+                Indices of the new variables, of the given shape.
+        """
+        size = int(np.prod(shape))
+        if vtype == BINARY:
+            lb, ub = np.maximum(lb, 0.), np.minimum(ub, 1.)
+        elif vtype not in (CONTINUOUS, INTEGER):
+            raise ValueError(f'Unknown variable type: {vtype}')
+        self._obj.append(np.broadcast_to(np.asarray(obj, dtype=float), shape).ravel())
+        self._lb.append(np.broadcast_to(np.asarray(lb, dtype=float), shape).ravel())
+        self._ub.append(np.broadcast_to(np.asarray(ub, dtype=float), shape).ravel())
+        self._vtypes.append(np.full(size, vtype != CONTINUOUS))
+        variables = np.arange(self.num_variables, self.num_variables + size).reshape(shape)
+        self.num_variables += size
+        return variables
+
+    def add_constraints(self, variables, coefficients=1., lb=-np.inf, ub=np.inf) -> None:
+        """
+        Adds the constraints lb[r] <= sum_k coefficients[r, k] * x[variables[r, k]] <= ub[r].
+
+        Parameters
+        ----------
+            variables
+                Indices of the variables, array of shape (R, K) -- one row per constraint
+                (rows of different lengths can be padded with zero coefficients).
+            coefficients
+                Coefficients, array broadcastable to the shape of variables.
+            lb
+                Lower bounds (scalar or array of length R).
+            ub
+                Upper bounds (scalar or array of length R).
+        """
+        variables = np.asarray(variables)
+        if variables.ndim == 1:
+            variables = variables[None, :]
+        variables = variables.reshape(variables.shape[0], -1)
+        num_rows = variables.shape[0]
+        coefficients = np.broadcast_to(np.asarray(coefficients, dtype=float),
+                                       variables.shape)
+        rows = np.broadcast_to(np.arange(self.num_constraints,
+                                         self.num_constraints + num_rows)[:, None],
+                               variables.shape)
+        self._rows.append(rows.ravel())
+        self._cols.append(variables.ravel())
+        self._vals.append(coefficients.ravel())
+        self._row_lb.append(np.broadcast_to(np.asarray(lb, dtype=float), num_rows).ravel())
+        self._row_ub.append(np.broadcast_to(np.asarray(ub, dtype=float), num_rows).ravel())
+        self.num_constraints += num_rows
+
+    def add_constraint(self, variables, coefficients=1., lb=-np.inf, ub=np.inf) -> None:
+        """ Adds a single constraint lb <= sum_k coefficients[k] * x[variables[k]] <= ub """
+        coefficients = np.broadcast_to(np.asarray(coefficients, dtype=float), np.shape(variables))
+        self.add_constraints(np.ravel(variables)[None, :], np.ravel(coefficients)[None, :], lb, ub)
+
+    # ARRAYS PASSED TO THE BACKENDS
+    def objective(self) -> np.ndarray:
+        return _concatenate(self._obj, float)
+
+    def bounds(self) -> (np.ndarray, np.ndarray):
+        return _concatenate(self._lb, float), _concatenate(self._ub, float)
+
+    def integrality(self) -> np.ndarray:
+        return _concatenate(self._vtypes, bool)
+
+    def matrix(self) -> sparse.csr_matrix:
+        """ Return: constraint matrix of shape (num_constraints, num_variables) """
+        matrix = sparse.coo_matrix((_concatenate(self._vals, float),
+                                    (_concatenate(self._rows, np.int64),
+                                     _concatenate(self._cols, np.int64))),
+                                   shape=(self.num_constraints, self.num_variables)).tocsr()
+        matrix.eliminate_zeros()
+        return matrix
+
+    def row_bounds(self) -> (np.ndarray, np.ndarray):
+        return _concatenate(self._row_lb, float), _concatenate(self._row_ub, float)
+
+    def solve(self, backend: str = None, **options) -> Solution:
+        """
+        Solves the model.
+
+        Parameters
+        ----------
+            backend : str
+                Name of a registered backend (default_backend if None).
+            options
+                Backend options: threads (default 1), time_limit (in seconds).
+        Returns
+        -------
+            Solution
+                Status, objective value and values of all the variables.
+        """
+        if backend is None:
+            backend = default_backend
+        if backend not in registered_backends:
+            raise ValueError(f'Unknown MILP backend: {backend}')
+        return registered_backends[backend](self, **options)
+
+
+def _concatenate(arrays: list, dtype) -> np.ndarray:
+    if not arrays:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(arrays).astype(dtype, copy=False)
+
+
+# BACKENDS
+def solve_highs(model: Model, threads: int = 1, time_limit: float = None) -> Solution:
+    """ Solves the model with HiGHS (through scipy.optimize.milp) """
+    c = model.objective()
+    if model.sense == 'max':
+        c = -c
+    constraints = ()
+    if model.num_constraints:
+        constraints = LinearConstraint(model.matrix(), *model.row_bounds())
+    options = {'disp': False}
+    if time_limit is not None:
+        options['time_limit'] = time_limit
+    result = milp(c, integrality=model.integrality().astype(np.uint8),
+                  bounds=Bounds(*model.bounds()), constraints=constraints, options=options)
+    if result.status == 0:
+        objective = -result.fun if model.sense == 'max' else result.fun
+        return Solution(OPTIMAL, float(objective), result.x)
+    if result.status == 2:
+        return Solution(INFEASIBLE)
+    logging.warning(f'HiGHS failed: {result.message}')
+    return Solution(FAILED)
+
+
+def solve_cplex(model: Model, threads: int = 1, time_limit: float = None) -> Solution:
+    """ Solves the model with CPLEX """
+    if cplex is None:
+        raise ImportError('The cplex package is not installed')
+    cp = cplex.Cplex()
+    cp.set_results_stream(None)
+    cp.set_log_stream(None)
+    cp.parameters.threads.set(threads)
+    if time_limit is not None:
+        cp.parameters.timelimit.set(time_limit)
+    if model.sense == 'max':
+        cp.objective.set_sense(cp.objective.sense.maximize)
+
+    lb, ub = model.bounds()
+    integrality = model.integrality()
+    types = np.where(integrality, cp.variables.type.integer, cp.variables.type.continuous)
+    cp.variables.add(obj=model.objective().tolist(),
+                     lb=np.maximum(lb, -cplex.infinity).tolist(),
+                     ub=np.minimum(ub, cplex.infinity).tolist(),
+                     types=''.join(types) if integrality.any() else '')
+
+    matrix = model.matrix()
+    row_lb, row_ub = model.row_bounds()
+    senses, rhs, range_values = [], [], []
+    for low, high in zip(row_lb, row_ub):
+        if low == high:
+            senses.append('E'), rhs.append(low), range_values.append(0.)
+        elif np.isinf(low):
+            senses.append('L'), rhs.append(high), range_values.append(0.)
+        elif np.isinf(high):
+            senses.append('G'), rhs.append(low), range_values.append(0.)
+        else:
+            senses.append('R'), rhs.append(low), range_values.append(high - low)
+    lin_expr = [cplex.SparsePair(ind=matrix.indices[start:end].tolist(),
+                                 val=matrix.data[start:end].tolist())
+                for start, end in zip(matrix.indptr[:-1], matrix.indptr[1:])]
+    cp.linear_constraints.add(lin_expr=lin_expr, senses=senses, rhs=rhs,
+                              range_values=range_values)
+
+    try:
+        cp.solve()
+    except cplex.CplexSolverError as error:
+        logging.warning(f'CPLEX failed: {error}')
+        return Solution(FAILED)
+    if not cp.solution.is_primal_feasible():
+        return Solution(INFEASIBLE)
+    return Solution(OPTIMAL, cp.solution.get_objective_value(),
+                    np.array(cp.solution.get_values()))
+
+
+def solve_gurobi(model: Model, threads: int = 1, time_limit: float = None) -> Solution:
+    """ Solves the model with Gurobi """
+    if gp is None:
+        raise ImportError('The gurobipy package is not installed')
+    env = gp.Env(empty=True)
+    env.setParam('OutputFlag', 0)
+    env.start()
+    gm = gp.Model(env=env)
+    gm.Params.Threads = threads
+    if time_limit is not None:
+        gm.Params.TimeLimit = time_limit
+
+    lb, ub = model.bounds()
+    vtypes = np.where(model.integrality(), gp.GRB.INTEGER, gp.GRB.CONTINUOUS)
+    x = gm.addMVar(model.num_variables, lb=lb, ub=ub, obj=model.objective(), vtype=vtypes)
+    gm.ModelSense = gp.GRB.MAXIMIZE if model.sense == 'max' else gp.GRB.MINIMIZE
+
+    matrix = model.matrix()
+    row_lb, row_ub = model.row_bounds()
+    equal = row_lb == row_ub
+    upper = ~equal & np.isfinite(row_ub)
+    lower = ~equal & np.isfinite(row_lb)
+    for rows, sense, rhs in ((equal, '=', row_lb), (upper, '<', row_ub), (lower, '>', row_lb)):
+        if rows.any():
+            gm.addMConstr(matrix[rows], x, sense, rhs[rows])
+
+    try:
+        gm.optimize()
+    except gp.GurobiError as error:
+        logging.warning(f'Gurobi failed: {error}')
+        return Solution(FAILED)
+    if gm.Status == gp.GRB.INFEASIBLE:
+        return Solution(INFEASIBLE)
+    if gm.SolCount == 0:
+        return Solution(FAILED)
+    return Solution(OPTIMAL, gm.ObjVal, x.X)
+
+
+registered_backends = {
+    'highs': solve_highs,
+    'cplex': solve_cplex,
+    'gurobi': solve_gurobi,
+}
+
+default_backend = 'highs'
+
+
+def set_default_backend(backend: str) -> None:
+    """
+    Sets the backend used to solve all the linear programs.
+
+    :param backend: name of a registered backend ('highs', 'cplex' or 'gurobi').
+    :return: None.
+    """
+    global default_backend
+    if backend not in registered_backends:
+        raise ValueError(f'Unknown MILP backend: {backend}')
+    if (backend == 'cplex' and cplex is None) or (backend == 'gurobi' and gp is None):
+        raise ImportError(f'The {backend} backend is not installed')
+    default_backend = backend
+
+
+def add_backend(name: str, function) -> None:
+    """
+    Adds a new backend to the list of backends.
+
+    :param name: name of the backend.
+    :param function: function that takes a Model (and options) and returns a Solution.
+    :return: None.
+    """
+    registered_backends[name] = function
@@ -10,6 +10,7 @@ from mapel.elections.objects import Election
 from mapel.core.inner_distances import emd
 import numpy as np
 from mapel.core.matchings import solve_matching_vectors
+from mapel.elections.distances import milp
 
 """
 Wasserstein distance calculation
@@ -40,85 +41,63 @@ def emd_infty(xx, yy):
 
 
 """
-Stretch the frequency matrix by the required factor.
-"""
-
-
-def stretch_matrix(matrix, matrix_size, factor):
-    stretched = np.zeros([matrix_size * factor, matrix_size * factor])
-    column_to_fill = 0
-    for col_idx in range(0, matrix_size):
-        row_to_fill = 0
-        for row_idx in range(0, matrix_size):
-            for i in range(0, factor):
-                stretched[row_to_fill][column_to_fill] = matrix[row_idx][col_idx] / factor
-                row_to_fill += 1
-        column_to_fill += 1
-        # copy filled col
-        for i in range(0, factor - 1):
-            for j in range(0, matrix_size * factor):
-                stretched[j][column_to_fill] = stretched[j][column_to_fill - 1]
-            column_to_fill += 1
-    return stretched
-
-
-"""
-Create memoization table of all the distances that need to be computed and compute them.
-"""
-
-
-def memoization(e1_stretched, e1_original_columns, e2_stretched, e2_original_columns):
-    pairs = set()
-    mem_table = dict()
-    for el1 in e1_original_columns:
-        for el2 in e2_original_columns:
-            pairs.add((el1, el2))
-    for pair in pairs:
-        mem_table[pair] = emd_infty(e1_stretched[:, pair[0]], e2_stretched[:, pair[1]])
-    return mem_table
-
+Cost table of emd_infty between all the columns of two position matrices.
 
+Stretching a column to lcm(m1, m2) positions spreads the mass of every position
+evenly over its copies, so the cumulative sums are piecewise linear with breaks
+only at multiples of the stretch factors, and emd_infty of the stretched columns
+is computed exactly on those (at most m1 + m2) segments.
 """
-Calculate indeces of copies.
-"""
-
 
-def find_copies(matrix_size, factor):
-    table = dict()
-    for i in range(0, matrix_size):
-        table[i * factor] = [i for i in range(i * factor + 1, (i + 1) * factor)]
-    return table
 
+def _stretched_cumsums(matrix, factor, breakpoints):
+    # cumulative sums of the stretched columns at the given (integer) breakpoints
+    cumsums = np.vstack([np.zeros(matrix.shape[1]), np.cumsum(matrix, axis=0)])
+    low = np.minimum(breakpoints // factor, len(matrix) - 1)
+    fraction = ((breakpoints - low * factor) / factor)[:, None]
+    return (cumsums[low] + fraction * (cumsums[low + 1] - cumsums[low])).T
 
-"""
-Map copy votes to their original votes.
-"""
 
+def emd_infty_cost_table(matrix_1, matrix_2):
+    """ Return: cost[a, b] -- emd_infty between stretched column a of matrix_1 and b of matrix_2 """
+    matrix_1 = np.asarray(matrix_1, dtype=float)
+    matrix_2 = np.asarray(matrix_2, dtype=float)
+    size = lcm(len(matrix_1), len(matrix_2))
+    factor_1, factor_2 = size // len(matrix_1), size // len(matrix_2)
+    breakpoints = np.union1d(np.arange(0, size + 1, factor_1), np.arange(0, size + 1, factor_2))
+    widths = np.diff(breakpoints)
 
-def copy_to_original_mapping(original_to_copies: dict):
-    copy_to_original = dict()
-    for key, val in original_to_copies.items():
-        for v in val:
-            copy_to_original[v] = key
-        copy_to_original[key] = key
-    return copy_to_original
+    cumsums_1 = _stretched_cumsums(matrix_1, factor_1, breakpoints)
+    cumsums_2 = _stretched_cumsums(matrix_2, factor_2, breakpoints)
+    cost_table = np.zeros((matrix_1.shape[1], matrix_2.shape[1]))
+    for a in range(matrix_1.shape[1]):
+        diff = cumsums_1[a][None, :] - cumsums_2
+        d_1, d_2 = diff[:, :-1], diff[:, 1:]
+        abs_1, abs_2 = np.abs(d_1), np.abs(d_2)
+        same_sign = d_1 * d_2 >= 0
+        # trapezoid case, two triangles case
+        area = np.where(same_sign,
+                        (abs_1 + abs_2) / 2,
+                        (d_1 * d_1 + d_2 * d_2) / np.where(same_sign, 1., abs_1 + abs_2) / 2)
+        cost_table[a] = (area * widths).sum(axis=1) / size
+    return cost_table
 
 
 """
-Convert the memoization table to cost table.
+Expand the transportation plan between the columns to a matching of their copies.
 """
 
 
-def memoization_to_cost_table(mem_table, num_cols, e1_copies_to_original, e2_copies_to_original):
-    cost_table = list()
-    for i in range(0, num_cols):
-        cost_table.append([])
-    for e1_column_idx in range(0, num_cols):  # cols in e1
-        for e2_column_idx in range(0, num_cols):  # cols in e2
-            key = (e1_copies_to_original[e1_column_idx], e2_copies_to_original[e2_column_idx])
-            value = mem_table[key]
-            cost_table[e1_column_idx].append(value)
-    return cost_table
+def plan_to_mapping(plan, factor_2):
+    rows, cols = np.nonzero(plan)
+    # column of e2 matched with every copy of the columns of e1 (copies of a column are consecutive)
+    matched_columns = np.repeat(cols, plan[rows, cols])
+    used_copies = np.zeros(plan.shape[1], dtype=int)
+    mapping = []
+    for col in matched_columns:
+        mapping.append(col * factor_2 + used_copies[col])
+        used_copies[col] += 1
+    return mapping
 
 
 """
@@ -132,35 +111,29 @@ def lcm(a, b):
 
 """
 Main function of the positionwise infinity distance, pointer to this function is added to the experiment when I wish to compute the positionwise infinity distance for an experiment. 
+The matching of the lcm copies of the columns is solved as a transportation problem between
+the m1 columns of e1 (lcm / m1 copies each) and the m2 columns of e2 (lcm / m2 copies each).
 """
 
 
 def positionwise_size_independent(e1: Election, e2: Election):
-    # print(e1.election_id, e2.election_id)
-    # print(e1.election_id, "and", e2.election_id)
-    # print("e1 num candidates", e1.num_candidates, "e1 num voters", e1.num_voters)
-    # print("e2 num candidates", e2.num_candidates, "e2 num voters", e2.num_voters)2
-    # if e1.num_candidates is None:
-    #     e1.num_candidates = len(e1.votes[0])
-    # if e1.num_candidates is None:
-    #     e2.num_candidates = len(e2.votes[0])
     election_lcm = lcm(e1.num_candidates, e2.num_candidates)
-    e1_stretched = stretch_matrix(e1.get_matrix(), e1.num_candidates, int(election_lcm / e1.num_candidates))
-    e2_stretched = stretch_matrix(e2.get_matrix(), e2.num_candidates, int(election_lcm / e2.num_candidates))
-    e1_original_to_copies = find_copies(matrix_size=e1.num_candidates, factor=int(election_lcm / e1.num_candidates))
-    e2_original_to_copies = find_copies(matrix_size=e2.num_candidates, factor=int(election_lcm / e2.num_candidates))
-    e1_copies_to_original = copy_to_original_mapping(e1_original_to_copies)
-    e2_copies_to_original = copy_to_original_mapping(e2_original_to_copies)
-    e1_original_columns = e1_original_to_copies.keys()
-    e2_original_columns = e2_original_to_copies.keys()
-
-    memoization_table = memoization(e1_stretched, e1_original_columns, e2_stretched, e2_original_columns)
-    cost_table = memoization_to_cost_table(memoization_table, election_lcm, e1_copies_to_original,
-                                           e2_copies_to_original)
-    distance, mapping = solve_matching_vectors(cost_table)
-    normalized_distance = distance / (e1.num_candidates * int(election_lcm / e1.num_candidates))
-    # print("computed", e1.election_id, e2.election_id)
-    return normalized_distance, mapping
+    factor_1 = election_lcm // e1.num_candidates
+    factor_2 = election_lcm // e2.num_candidates
+    cost_table = emd_infty_cost_table(e1.get_matrix(), e2.get_matrix())
+
+    if e1.num_candidates == e2.num_candidates:
+        distance, mapping = solve_matching_vectors(cost_table)
+        return distance / election_lcm, mapping
+
+    model = milp.Model(sense='min')
+    plan = model.add_variables(cost_table.shape, obj=cost_table)
+    model.add_constraints(plan, lb=factor_1, ub=factor_1)
+    model.add_constraints(plan.T, lb=factor_2, ub=factor_2)
+    solution = model.solve()
+    # the transportation polytope has integral vertices
+    plan = np.rint(solution[plan]).astype(int)
+    return solution.objective / election_lcm, plan_to_mapping(plan, factor_2)
 
 """
 Space for testing purposes.
@@ -1,26 +1,35 @@
 #!/usr/bin/env python
 import copy
+import hashlib
+import json
 import logging
+import os
+from functools import partial
 from time import time
 from typing import Callable
 
 import numpy as np
 from tqdm import tqdm
 
-import mapel.core.persistence.experiment_exports as exports
 from mapel.core.inner_distances import map_str_to_func
+from mapel.core.objects.DistanceMatrix import CrossDistanceMatrix, DistanceMatrix
 from mapel.core.objects.Experiment import Experiment
+from mapel.core.objects.LazyInstances import LazyInstances
+from mapel.core.persistence.distance_cache import DistanceCache, DEFAULT_MAX_ENTRIES
+from mapel.core.scheduler import compute_pairs
 from mapel.elections.distances import main_approval_distances as mad
 from mapel.elections.distances import main_ordinal_distances as mod
 from mapel.elections.distances import positionwise_infty
 from mapel.elections.distances import feature_distance
+from mapel.elections.distances import batched_distances
+from mapel.elections.distances import canonical_form
 from mapel.elections.objects.ApprovalElection import ApprovalElection
 from mapel.elections.objects.OrdinalElection import OrdinalElection
 
 registered_approval_distances = {
     'approvalwise': mad.compute_approvalwise,
 
-    'hamming': mad.compute_hamming,  # unsupported distance
+    'hamming': mad.compute_hamming,
 }
 
 registered_ordinal_distances = {
@@ -30,22 +39,54 @@ registered_ordinal_distances = {
     'positionwise': mod.compute_positionwise_distance,
     'bordawise': mod.compute_bordawise_distance,
     'pairwise': mod.compute_pairwise_distance,
+    'approx_pairwise': mod.compute_pairwise_distance_approx,  # upper bound
     'discrete': mod.compute_discrete_distance,
 
     'swap': mod.compute_swap_distance,
     'spearman': mod.compute_spearman_distance,
+    'bb_swap': mod.compute_swap_distance_bb,
+    'bb_spearman': mod.compute_spearman_distance_bb,
+    'aa_swap': mod.compute_swap_distance_aa,  # upper bound
+    'aa_spearman': mod.compute_spearman_distance_aa,  # upper bound
 
     'blank': mod.compute_blank_distance,
 
-    'ilp_spearman': mod.compute_spearman_distance_ilp_py,  # unsupported distance
-    'ilp_swap': mod.compute_swap_distance_ilp_py,  # unsupported distance
+    'ilp_spearman': mod.compute_spearman_distance_ilp_py,
+    'ilp_swap': mod.compute_swap_distance_ilp_py,
     'voterlikeness': mod.compute_voterlikeness_distance,  # unsupported distance
+    'approx_voterlikeness': mod.compute_voterlikeness_distance_approx,  # upper bound
     'agg_voterlikeness': mod.compute_agg_voterlikeness_distance,  # unsupported distance
     'pos_swap': mod.compute_pos_swap_distance,  # unsupported distance
     'voter_subelection': mod.compute_voter_subelection,  # unsupported distance
     'candidate_subelection': mod.compute_candidate_subelection,  # unsupported distance
 }
 
+# Distances invariant under renaming candidates and reordering voters (equal to zero
+# for isomorphic elections), so they are computed once per class of isomorphic elections
+isomorphic_distances = {
+    'positionwise': mod.compute_positionwise_distance,
+    'bordawise': mod.compute_bordawise_distance,
+    'pairwise': mod.compute_pairwise_distance,
+    'voterlikeness': mod.compute_voterlikeness_distance,
+    'discrete': mod.compute_discrete_distance,
+    'swap': mod.compute_swap_distance,
+    'spearman': mod.compute_spearman_distance,
+    'bb_swap': mod.compute_swap_distance_bb,
+    'bb_spearman': mod.compute_spearman_distance_bb,
+    'ilp_swap': mod.compute_swap_distance_ilp_py,
+    'ilp_spearman': mod.compute_spearman_distance_ilp_py,
+}
+
+# Isomorphic distances whose matchings are matchings of candidates
+# (matching[c] is the candidate of the first election matched with candidate c of the second)
+candidate_matching_distances = {'positionwise'}
+
+# Distances whose matchings are matchings of voters (not kept in the distance cache)
+voter_matching_distances = {'approx_voterlikeness'}
+
+# On-disk cache of distances (disabled by default, see enable_distance_cache)
+distance_cache = None
+
 
 def add_approval_distance(name, function):
     """
@@ -69,21 +110,178 @@ def add_ordinal_distance(name, function):
     registered_ordinal_distances[name] = function
 
 
+def enable_distance_cache(path: str = None,
+                          max_entries: int = DEFAULT_MAX_ENTRIES) -> DistanceCache:
+    """
+    Enables the on-disk cache of distances (shared between experiments).
+
+    :param path: path to the SQLite file (experiments/distances_cache.sqlite by default).
+    :param max_entries: maximal number of cached distances.
+    :return: the cache.
+    """
+    global distance_cache
+    if path is None:
+        path = os.path.join(os.getcwd(), 'experiments', 'distances_cache.sqlite')
+    if distance_cache is not None:
+        distance_cache.close()
+    distance_cache = DistanceCache(path, max_entries=max_entries)
+    return distance_cache
+
+
+def disable_distance_cache() -> None:
+    """ Disables the on-disk cache of distances """
+    global distance_cache
+    if distance_cache is not None:
+        distance_cache.close()
+    distance_cache = None
+
+
+def get_election_hash(election) -> str or None:
+    """
+    Computes a hash of the content (votes) of an election. The hash does not
+    depend on the order of the voters: it is computed from the sorted distinct
+    votes and their quantities.
+
+    :param election: election.
+    :return: hex digest, or None if the election has no votes.
+    """
+    if election.fake or election.votes is None:
+        return None
+    digest = hashlib.sha256()
+    digest.update(f'{type(election).__name__};{election.num_candidates};'
+                  f'{election.num_voters};'.encode())
+    if type(election) is ApprovalElection:
+        votes = sorted(','.join(str(c) for c in sorted(vote)) for vote in election.votes)
+        digest.update(';'.join(votes).encode())
+        return digest.hexdigest()
+    try:
+        votes = np.asarray(election.votes, dtype=np.int64)
+    except ValueError:
+        votes = None
+    if votes is None or votes.ndim != 2:
+        votes = sorted(','.join(str(c) for c in vote) for vote in election.votes)
+        digest.update(';'.join(votes).encode())
+        return digest.hexdigest()
+    distinct_votes, quantities = np.unique(votes, axis=0, return_counts=True)
+    digest.update(f'{distinct_votes.dtype};{distinct_votes.shape};'.encode())
+    digest.update(np.ascontiguousarray(distinct_votes).tobytes())
+    digest.update(quantities.astype(np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def get_instances_version(instances: dict) -> tuple or None:
+    """
+    Computes the version of the content of the elections (for reusing the pool of
+    processes, whose workers compute on a snapshot of the elections).
+
+    :param instances: dictionary with elections.
+    :return: tuple of hashes, or None if the content cannot be hashed
+        (fake elections, or elections that are not resident in memory).
+    """
+    if isinstance(instances, LazyInstances):
+        return None
+    version = tuple(get_election_hash(election) for election in instances.values())
+    if None in version:
+        return None
+    return version
+
+
+def get_cache_key(hash_1: str, hash_2: str, distance_id: str,
+                  params: dict = None) -> (str, bool):
+    """ Return: key of a pair of elections, flag if the elections were swapped """
+    if params:
+        distance_id = f'{distance_id};{json.dumps(params, sort_keys=True, default=str)}'
+    if hash_1 <= hash_2:
+        return f'{distance_id};{hash_1};{hash_2}', False
+    return f'{distance_id};{hash_2};{hash_1}', True
+
+
+def _orient_matching(matching, swapped: bool, distance_id: str = None):
+    """ Maps a stored matching to the requested order of elections (and back) """
+    if matching is None or np.ndim(matching) != 1:
+        return None
+    if distance_id is not None and \
+            _extract_distance_id(distance_id)[1] in voter_matching_distances:
+        # matchings of voters depend on the order of the voters (not in the key)
+        return None
+    matching = np.asarray(matching)
+    return np.argsort(matching) if swapped else matching
+
+
 def get_distance(election_1,
                  election_2,
-                 distance_id: str = None) -> float or (float, list):
+                 distance_id: str = None,
+                 **kwargs) -> float or (float, list):
     """
     Computes distance between elections, (if applicable) optimal matching.
+    Uses the distance cache, if enabled.
+
+    :param election_1: first election.
+    :param election_2: second election.
+    :param distance_id: name of the distance.
+    :param kwargs: additional arguments (part of the cache key).
+    :return: distances, matching (if applicable).
+    """
+    cache = distance_cache
+    if cache is None:
+        return compute_distance(election_1, election_2, distance_id=distance_id, **kwargs)
+
+    hash_1 = get_election_hash(election_1)
+    hash_2 = get_election_hash(election_2)
+    if hash_1 is None or hash_2 is None:
+        return compute_distance(election_1, election_2, distance_id=distance_id, **kwargs)
+
+    key, swapped = get_cache_key(hash_1, hash_2, distance_id, params=kwargs)
+    cached = cache.get(key)
+    if cached is not None:
+        distance, _, matching = cached
+        matching = _orient_matching(matching, swapped, distance_id)
+        return distance if matching is None else (distance, matching)
+
+    start_time = time()
+    result = compute_distance(election_1, election_2, distance_id=distance_id, **kwargs)
+    if result is None:
+        return result
+    distance, matching = result if type(result) is tuple else (result, None)
+    cache.put(key, distance, time() - start_time,
+              _orient_matching(matching, swapped, distance_id))
+    return result
+
+
+def get_distance_value(election_1,
+                       election_2,
+                       distance_id: str = None) -> float:
+    """
+    Computes distance between elections (without the matching), using the
+    distance cache if it is enabled.
 
     :param election_1: first election.
     :param election_2: second election.
     :param distance_id: name of the distance.
+    :return: distance.
+    """
+    result = get_distance(election_1, election_2, distance_id=distance_id)
+    return result[0] if type(result) is tuple else result
+
+
+def compute_distance(election_1,
+                     election_2,
+                     distance_id: str = None,
+                     **kwargs) -> float or (float, list):
+    """
+    Computes distance between elections, (if applicable) optimal matching
+    (without using the distance cache).
+
+    :param election_1: first election.
+    :param election_2: second election.
+    :param distance_id: name of the distance.
+    :param kwargs: additional arguments.
     :return: distances, matching (if applicable).
     """
     if type(election_1) is ApprovalElection and type(election_2) is ApprovalElection:
-        return get_approval_distance(election_1, election_2, distance_id=distance_id)
+        return get_approval_distance(election_1, election_2, distance_id=distance_id, **kwargs)
     elif type(election_1) is OrdinalElection and type(election_2) is OrdinalElection:
-        return get_ordinal_distance(election_1, election_2, distance_id=distance_id)
+        return get_ordinal_distance(election_1, election_2, distance_id=distance_id, **kwargs)
     else:
         logging.warning('No such instance!')
 
@@ -162,19 +360,27 @@ def run_single_process(exp: Experiment,
                        distances: dict,
                        times: dict,
                        matchings: dict,
-                       safe_mode=False) -> None:
+                       safe_mode=False,
+                       journal=None) -> None:
     """ Single process for computing distances """
 
-    for instance_id_1, instance_id_2 in tqdm(instances_ids, desc='Computing distances'):
+    pairs = instances_ids
+    if isinstance(exp.instances, LazyInstances):
+        # the elections of the next pairs are imported ahead (within the memory limit)
+        pairs = exp.instances.iterate_pairs(instances_ids)
+
+    for instance_id_1, instance_id_2 in tqdm(pairs, total=len(instances_ids),
+                                             desc='Computing distances'):
         start_time = time()
         if safe_mode:
-            distance = get_distance(copy.deepcopy(exp.instances[instance_id_1]),
-                                    copy.deepcopy(exp.instances[instance_id_2]),
-                                    distance_id=copy.deepcopy(exp.distance_id))
+            distance = compute_distance(copy.deepcopy(exp.instances[instance_id_1]),
+                                        copy.deepcopy(exp.instances[instance_id_2]),
+                                        distance_id=copy.deepcopy(exp.distance_id))
         else:
-            distance = get_distance(exp.instances[instance_id_1],
-                                    exp.instances[instance_id_2],
-                                    distance_id=exp.distance_id)
+            distance = compute_distance(exp.instances[instance_id_1],
+                                        exp.instances[instance_id_2],
+                                        distance_id=exp.distance_id)
+        matching = None
         if type(distance) is tuple:
             distance, matching = distance
             matching = np.array(matching)
@@ -184,6 +390,300 @@ def run_single_process(exp: Experiment,
         distances[instance_id_2][instance_id_1] = distances[instance_id_1][instance_id_2]
         times[instance_id_1][instance_id_2] = time() - start_time
         times[instance_id_2][instance_id_1] = times[instance_id_1][instance_id_2]
+        if journal is not None:
+            journal.append(instance_id_1, instance_id_2, distance,
+                           times[instance_id_1][instance_id_2], matching)
+
+
+def _get_registered_distances(exp: Experiment) -> dict or None:
+    if exp.instance_type == 'ordinal':
+        return registered_ordinal_distances
+    if exp.instance_type == 'approval':
+        return registered_approval_distances
+    return None
+
+
+def is_batchable(exp: Experiment, distance_id: str) -> bool:
+    """ Checks if the distance can be computed with a batched (all-pairs) engine """
+    registered_distances = _get_registered_distances(exp)
+    if registered_distances is None:
+        return False
+    inner_distance, main_distance = _extract_distance_id(distance_id)
+    if main_distance in batched_distances.registered_native_distances:
+        # the distance may have been re-registered by the user
+        _, function = batched_distances.registered_native_distances[main_distance]
+    elif main_distance in batched_distances.registered_vector_distances:
+        _, function = batched_distances.registered_vector_distances[main_distance]
+    elif exp.instance_type == 'ordinal':
+        return batched_distances.is_batchable(main_distance, inner_distance)
+    else:
+        return False
+    if registered_distances.get(main_distance) is not function:
+        return False
+    return batched_distances.is_batchable(main_distance, inner_distance)
+
+
+def is_embedding_free(exp: Experiment, distance_id: str) -> bool:
+    """ Checks if the distance is a distance between single vectors (needs no matching) """
+    inner_distance, main_distance = _extract_distance_id(distance_id)
+    return is_batchable(exp, distance_id) and \
+        batched_distances.is_embedding_free(main_distance, inner_distance)
+
+
+def is_natively_threaded(exp: Experiment, distance_id: str) -> bool:
+    """ Checks if the batched engine runs its own (native) threads """
+    _, main_distance = _extract_distance_id(distance_id)
+    return is_batchable(exp, distance_id) and batched_distances.is_native(main_distance)
+
+
+def run_batched_process(exp: Experiment,
+                        instances_ids: list,
+                        distances: dict,
+                        times: dict,
+                        matchings: dict,
+                        journal=None,
+                        num_threads: int = 1) -> None:
+    """ Single process for computing distances (with a batched engine) """
+
+    inner_distance, main_distance = _extract_distance_id(exp.distance_id)
+    results = batched_distances.compute_distances(exp.instances,
+                                                  instances_ids,
+                                                  main_distance,
+                                                  inner_distance,
+                                                  num_threads=num_threads)
+
+    for (instance_id_1, instance_id_2), (distance, matching, time_) in \
+            tqdm(zip(instances_ids, results), total=len(instances_ids),
+                 desc='Computing distances'):
+        if matching is not None:
+            matching = np.array(matching)
+            matchings[instance_id_1][instance_id_2] = matching
+            matchings[instance_id_2][instance_id_1] = np.argsort(matching)
+        distances[instance_id_1][instance_id_2] = distance
+        distances[instance_id_2][instance_id_1] = distances[instance_id_1][instance_id_2]
+        times[instance_id_1][instance_id_2] = time_
+        times[instance_id_2][instance_id_1] = times[instance_id_1][instance_id_2]
+        if journal is not None:
+            journal.append(instance_id_1, instance_id_2, distance, time_, matching)
+
+
+def is_isomorphic(exp: Experiment, distance_id: str) -> bool:
+    """ Checks if the distance is invariant under renaming candidates and reordering voters """
+    if exp.instance_type != 'ordinal':
+        return False
+    _, main_distance = _extract_distance_id(distance_id)
+    function = isomorphic_distances.get(main_distance)
+    # the distance may have been re-registered by the user
+    return function is not None and registered_ordinal_distances.get(main_distance) is function
+
+
+def deduplicate_pairs(exp: Experiment,
+                      instances_ids: list,
+                      distances) -> (list, dict):
+    """
+    Replaces the pairs of elections by the pairs of representatives of their classes
+    of isomorphic elections (see canonical_form.group_isomorphic_elections).
+
+    :param exp: experiment.
+    :param instances_ids: pairs of elections to be computed.
+    :param distances: already known distances.
+    :return: pairs of representatives to be computed, classes of isomorphic elections.
+    """
+    classes = canonical_form.group_isomorphic_elections(
+        exp.instances, [instance_id for pair in instances_ids for instance_id in pair])
+    if not classes:
+        return instances_ids, classes
+
+    representative_ids = {}
+    for instance_id_1, instance_id_2 in instances_ids:
+        representative_id_1 = classes.get(instance_id_1, (instance_id_1,))[0]
+        representative_id_2 = classes.get(instance_id_2, (instance_id_2,))[0]
+        if representative_id_1 == representative_id_2 \
+                or representative_id_2 in distances[representative_id_1] \
+                or (representative_id_2, representative_id_1) in representative_ids:
+            continue
+        representative_ids[(representative_id_1, representative_id_2)] = None
+    return list(representative_ids), classes
+
+
+def broadcast_distances(exp: Experiment,
+                        instances_ids: list,
+                        classes: dict,
+                        distances,
+                        times,
+                        matchings: dict) -> None:
+    """
+    Fills in the distances between elections from the distances between
+    the representatives of their classes of isomorphic elections.
+
+    :param exp: experiment.
+    :param instances_ids: pairs of elections.
+    :param classes: classes of isomorphic elections (see deduplicate_pairs).
+    :param distances: distances (with the distances between the representatives).
+    :param times: times of computation.
+    :param matchings: matchings.
+    """
+    _, main_distance = _extract_distance_id(exp.distance_id)
+    for instance_id_1, instance_id_2 in instances_ids:
+        if instance_id_1 not in classes and instance_id_2 not in classes:
+            continue
+        representative_id_1, map_1 = classes.get(instance_id_1, (instance_id_1, None))
+        representative_id_2, map_2 = classes.get(instance_id_2, (instance_id_2, None))
+
+        if representative_id_1 == representative_id_2:
+            distance, time_ = 0, 0.
+            matching = None
+            if main_distance in candidate_matching_distances:
+                matching = np.arange(len(map_1))
+        else:
+            distance = distances[representative_id_1][representative_id_2]
+            time_ = times[representative_id_1][representative_id_2]
+            matching = matchings.get(representative_id_1, {}).get(representative_id_2)
+
+        if matching is not None and main_distance in candidate_matching_distances:
+            # the candidates of the elections are mapped to the ones of their representatives
+            matching = np.asarray(matching)
+            if map_2 is not None:
+                matching = matching[map_2]
+            if map_1 is not None:
+                matching = np.argsort(map_1)[matching]
+            matchings[instance_id_1][instance_id_2] = matching
+            matchings[instance_id_2][instance_id_1] = np.argsort(matching)
+        distances[instance_id_1][instance_id_2] = distance
+        distances[instance_id_2][instance_id_1] = distance
+        times[instance_id_1][instance_id_2] = time_
+        times[instance_id_2][instance_id_1] = time_
+
+
+def get_knn_pairs(exp: Experiment,
+                  k: int = 10,
+                  proxy_id: str = None,
+                  num_proxy_neighbors: int = None) -> list or None:
+    """
+    Selects the pairs of elections for the approximate k-nearest-neighbors mode,
+    i.e., the pairs of elections which are close with respect to a cheap proxy
+    distance (e.g., l1-bordawise).
+
+    :param exp: experiment.
+    :param k: number of nearest neighbors of each election.
+    :param proxy_id: name of the proxy distance (has to need no matching).
+    :param num_proxy_neighbors: number of candidates for the neighbors of each
+        election (2 * k by default).
+    :return: pairs of elections, or None if the proxy distance cannot be used.
+    """
+    if proxy_id is None:
+        proxy_id = 'l1-approvalwise' if exp.instance_type == 'approval' else 'l1-bordawise'
+    if num_proxy_neighbors is None:
+        num_proxy_neighbors = 2 * k
+    inner_distance, main_distance = _extract_distance_id(proxy_id)
+    if not batched_distances.is_embedding_free(main_distance, inner_distance):
+        logging.warning(f'{proxy_id} cannot be used as a proxy distance!')
+        return None
+
+    instance_ids = list(exp.instances)
+    neighbors = batched_distances.nearest_vector_neighbors(exp.instances,
+                                                           instance_ids,
+                                                           main_distance,
+                                                           inner_distance,
+                                                           num_neighbors=num_proxy_neighbors)
+    if neighbors is None:
+        logging.warning(f'{proxy_id} cannot be used as a proxy distance!')
+        return None
+
+    rows = np.repeat(np.arange(len(instance_ids)), neighbors.shape[1])
+    columns = neighbors.ravel()
+    pairs = np.unique(np.stack([np.minimum(rows, columns), np.maximum(rows, columns)], axis=1),
+                      axis=0)
+    return [(instance_ids[i], instance_ids[j]) for i, j in pairs]
+
+
+def run_vector_process(exp: Experiment,
+                       distances,
+                       times,
+                       self_distances: bool = False) -> bool:
+    """
+    Computes all the distances at once (for distances which need no matching).
+
+    :param exp: experiment.
+    :param distances: DistanceMatrix (over all the instances) to be filled in.
+    :param times: DistanceMatrix (over all the instances) with times of computation.
+    :param self_distances: whether to compute the distances of elections to themselves.
+    :return: False if the vectors of the elections cannot be stacked, True otherwise.
+    """
+    inner_distance, main_distance = _extract_distance_id(exp.distance_id)
+    start_time = time()
+    matrix = batched_distances.compute_vector_distance_matrix(exp.instances,
+                                                              distances.ids,
+                                                              main_distance,
+                                                              inner_distance)
+    if matrix is None:
+        return False
+    if not self_distances:
+        np.fill_diagonal(matrix, np.nan)
+    distances.matrix[:] = matrix
+    num_pairs = max(1, len(distances.ids) * (len(distances.ids) - 1) // 2)
+    times.matrix[:] = np.where(np.isnan(matrix), np.nan, (time() - start_time) / num_pairs)
+    return True
+
+
+def get_shared_positionwise_ids(exp: Experiment, distance_ids: list) -> list:
+    """ Return: distances (out of distance_ids) computed together by the batched positionwise engine """
+    shared_ids = []
+    for distance_id in dict.fromkeys(distance_ids):
+        inner_distance, main_distance = _extract_distance_id(distance_id)
+        if main_distance == 'positionwise' and is_batchable(exp, distance_id):
+            shared_ids.append(distance_id)
+    return shared_ids
+
+
+def run_shared_positionwise_process(exp: Experiment,
+                                    distance_ids: list,
+                                    instances_ids: list) -> dict:
+    """
+    Single process for computing several Positionwise distances (with different
+    inner distances) in one pass over the pairs of elections.
+
+    :param exp: experiment.
+    :param distance_ids: names of the distances.
+    :param instances_ids: pairs of elections.
+    :return: distance_id -> (distances, times, matchings).
+    """
+    results = {distance_id: (DistanceMatrix(exp.instances),
+                             DistanceMatrix(exp.instances),
+                             {instance_id: {} for instance_id in exp.instances})
+               for distance_id in distance_ids}
+    inner_distances = [_extract_distance_id(distance_id)[0] for distance_id in distance_ids]
+    computed = batched_distances.compute_multiple_positionwise_distances(exp.instances,
+                                                                         instances_ids,
+                                                                         inner_distances)
+
+    for (instance_id_1, instance_id_2), pair_results in \
+            tqdm(zip(instances_ids, computed), total=len(instances_ids),
+                 desc='Computing distances'):
+        for distance_id, (distance, matching, time_) in zip(distance_ids, pair_results):
+            distances, times, matchings = results[distance_id]
+            matching = np.array(matching)
+            matchings[instance_id_1][instance_id_2] = matching
+            matchings[instance_id_2][instance_id_1] = np.argsort(matching)
+            distances[instance_id_1][instance_id_2] = distance
+            distances[instance_id_2][instance_id_1] = distance
+            times[instance_id_1][instance_id_2] = time_
+            times[instance_id_2][instance_id_1] = time_
+    return results
+
+
+def compute_batched_pairs(instances: dict,
+                          instances_ids: list,
+                          distance_id: str = None) -> list:
+    """ Computes distances for a chunk of pairs of elections (with a batched engine) """
+    inner_distance, main_distance = _extract_distance_id(distance_id)
+    results = batched_distances.compute_distances(instances,
+                                                  instances_ids,
+                                                  main_distance,
+                                                  inner_distance)
+    return [(instance_id_1, instance_id_2, distance, matching, time_)
+            for (instance_id_1, instance_id_2), (distance, matching, time_)
+            in zip(instances_ids, results)]
 
 
 def run_multiple_processes(experiment: Experiment,
@@ -191,28 +691,171 @@ def run_multiple_processes(experiment: Experiment,
                            distances: dict,
                            times: dict,
                            matchings: dict,
-                           process_id) -> None:
-    """ Single process for computing distances """
+                           num_processes: int,
+                           journal=None) -> None:
+    """ Multiple processes (sharing a pool of workers) for computing distances """
+
+    if is_natively_threaded(experiment, experiment.distance_id):
+        # the C++ extension runs its own threads, so no worker processes are needed
+        run_batched_process(experiment, instances_ids, distances, times, matchings,
+                            journal=journal, num_threads=num_processes)
+        return
+
+    if is_batchable(experiment, experiment.distance_id):
+        compute_chunk = partial(compute_batched_pairs, distance_id=experiment.distance_id)
+    else:
+        compute_chunk = partial(compute_pairs,
+                                distance_function=compute_distance,
+                                distance_id=experiment.distance_id)
 
-    for instance_id_1, instance_id_2 in tqdm(instances_ids,
-                                             desc=f'Computing distances of thread {process_id}'):
-        start_time = time()
-        distance = get_distance(copy.deepcopy(experiment.instances[instance_id_1]),
-                                copy.deepcopy(experiment.instances[instance_id_2]),
-                                distance_id=copy.deepcopy(experiment.distance_id))
-        if type(distance) is tuple:
-            distance, matching = distance
+    scheduler = experiment.get_scheduler(num_processes)
+    results = scheduler.map(experiment.instances, instances_ids, compute_chunk,
+                            version=get_instances_version(experiment.instances))
+
+    for instance_id_1, instance_id_2, distance, matching, time_ in \
+            tqdm(results, total=len(instances_ids), desc='Computing distances'):
+        if matching is not None:
             matching = np.array(matching)
             matchings[instance_id_1][instance_id_2] = matching
             matchings[instance_id_2][instance_id_1] = np.argsort(matching)
         distances[instance_id_1][instance_id_2] = distance
         distances[instance_id_2][instance_id_1] = distances[instance_id_1][instance_id_2]
-        times[instance_id_1][instance_id_2] = time() - start_time
+        times[instance_id_1][instance_id_2] = time_
         times[instance_id_2][instance_id_1] = times[instance_id_1][instance_id_2]
+        if journal is not None:
+            journal.append(instance_id_1, instance_id_2, distance, time_, matching)
+
 
-    if experiment.is_exported:
-        exports.export_distances_multiple_processes(experiment,
-                                                    instances_ids,
-                                                    distances,
-                                                    times,
-                                                    process_id)
+def compute_cross_distances(exp: Experiment,
+                            other: Experiment,
+                            distance_id: str,
+                            num_processes: int = 1) -> (CrossDistanceMatrix, CrossDistanceMatrix):
+    """
+    Computes distances between each election of one experiment and each election
+    of another one (without the distances within the experiments).
+
+    :param exp: experiment (rows).
+    :param other: other experiment (columns).
+    :param distance_id: name of the distance.
+    :param num_processes: number of processes (or native threads).
+    :return: distances, times of computation.
+    """
+    row_ids, column_ids = list(exp.instances), list(other.instances)
+    distances = CrossDistanceMatrix(row_ids, column_ids)
+    times = CrossDistanceMatrix(row_ids, column_ids)
+    inner_distance, main_distance = _extract_distance_id(distance_id)
+
+    if is_embedding_free(exp, distance_id):
+        start_time = time()
+        vectors_1 = batched_distances.stack_vectors(exp.instances, row_ids, main_distance)
+        vectors_2 = batched_distances.stack_vectors(other.instances, column_ids, main_distance)
+        if vectors_1 is not None and vectors_2 is not None \
+                and vectors_1.shape[1:] == vectors_2.shape[1:]:
+            distances.matrix[:] = batched_distances.vector_distance_matrix(
+                vectors_1, vectors_2, main_distance, inner_distance)
+            times.matrix[:] = (time() - start_time) / max(1, distances.matrix.size)
+            return distances, times
+
+    # the elections of the two experiments may have the same ids
+    instances = {(0, instance_id): exp.instances[instance_id] for instance_id in row_ids}
+    instances.update({(1, instance_id): other.instances[instance_id]
+                      for instance_id in column_ids})
+    instances_ids = [((0, row_id), (1, column_id))
+                     for row_id in row_ids for column_id in column_ids]
+
+    if is_natively_threaded(exp, distance_id) \
+            or (num_processes == 1 and is_batchable(exp, distance_id)):
+        num_threads = num_processes if is_natively_threaded(exp, distance_id) else 1
+        computed = batched_distances.compute_distances(instances,
+                                                       instances_ids,
+                                                       main_distance,
+                                                       inner_distance,
+                                                       num_threads=num_threads)
+        results = ((instance_id_1, instance_id_2, distance, matching, time_)
+                   for (instance_id_1, instance_id_2), (distance, matching, time_)
+                   in zip(instances_ids, computed))
+    elif num_processes == 1:
+        results = (compute_pairs(instances, [pair],
+                                 distance_function=compute_distance,
+                                 distance_id=distance_id)[0]
+                   for pair in instances_ids)
+    else:
+        if is_batchable(exp, distance_id):
+            compute_chunk = partial(compute_batched_pairs, distance_id=distance_id)
+        else:
+            compute_chunk = partial(compute_pairs,
+                                    distance_function=compute_distance,
+                                    distance_id=distance_id)
+        results = exp.get_scheduler(num_processes).map(instances, instances_ids, compute_chunk)
+
+    for (_, row_id), (_, column_id), distance, _, time_ in \
+            tqdm(results, total=len(instances_ids), desc='Computing distances'):
+        i, j = distances.row_index[row_id], distances.column_index[column_id]
+        distances.matrix[i, j] = distance
+        times.matrix[i, j] = time_
+    return distances, times
+
+
+def add_cached_distances(exp: Experiment,
+                         instances_ids: list,
+                         distances: dict,
+                         times: dict,
+                         matchings: dict,
+                         params: dict = None) -> list:
+    """
+    Fills in the distances found in the distance cache.
+
+    :param params: additional arguments of the distance (part of the cache key).
+    :return: pairs of elections which are not in the cache.
+    """
+    hashes = {instance_id: get_election_hash(exp.instances[instance_id])
+              for pair in instances_ids for instance_id in pair}
+    keys = {}
+    for instance_id_1, instance_id_2 in instances_ids:
+        if hashes[instance_id_1] is not None and hashes[instance_id_2] is not None:
+            keys[(instance_id_1, instance_id_2)] = \
+                get_cache_key(hashes[instance_id_1], hashes[instance_id_2], exp.distance_id,
+                              params=params)
+
+    cached = distance_cache.get_many(list(dict.fromkeys(key for key, _ in keys.values())))
+
+    remaining_ids = []
+    for instance_id_1, instance_id_2 in instances_ids:
+        key, swapped = keys.get((instance_id_1, instance_id_2), (None, False))
+        if key not in cached:
+            remaining_ids.append((instance_id_1, instance_id_2))
+            continue
+        distance, time_, matching = cached[key]
+        matching = _orient_matching(matching, swapped, exp.distance_id)
+        if matching is not None:
+            matchings[instance_id_1][instance_id_2] = matching
+            matchings[instance_id_2][instance_id_1] = np.argsort(matching)
+        distances[instance_id_1][instance_id_2] = distance
+        distances[instance_id_2][instance_id_1] = distance
+        times[instance_id_1][instance_id_2] = time_
+        times[instance_id_2][instance_id_1] = time_
+    return remaining_ids
+
+
+def store_cached_distances(exp: Experiment,
+                           instances_ids: list,
+                           distances: dict,
+                           times: dict,
+                           matchings: dict,
+                           params: dict = None) -> None:
+    """ Stores the computed distances in the distance cache """
+    hashes = {instance_id: get_election_hash(exp.instances[instance_id])
+              for pair in instances_ids for instance_id in pair}
+    entries = []
+    for instance_id_1, instance_id_2 in instances_ids:
+        if hashes[instance_id_1] is None or hashes[instance_id_2] is None \
+                or instance_id_2 not in distances[instance_id_1]:
+            continue
+        key, swapped = get_cache_key(hashes[instance_id_1], hashes[instance_id_2],
+                                     exp.distance_id, params=params)
+        matching = matchings.get(instance_id_1, {}).get(instance_id_2)
+        entries.append((key,
+                        distances[instance_id_1][instance_id_2],
+                        times[instance_id_1][instance_id_2],
+                        _orient_matching(matching, swapped, exp.distance_id)))
+    distance_cache.put_many(entries)
@@ -1,6 +1,8 @@
 
 import numpy as np
 
+from mapel.core.objects.DistanceMatrix import as_distance_matrix
+
 
 def clustering_v1(experiment, num_clusters=20):
     from scipy.cluster.hierarchy import dendrogram, linkage, fcluster
@@ -20,11 +22,8 @@ def clustering_v1(experiment, num_clusters=20):
             new_names.append(a)
     print(len(new_names))
 
-    distMatrix = np.zeros([len(new_names), len(new_names)])
-    for i, a in enumerate(new_names):
-        for j, b in enumerate(new_names):
-            if a != b:
-                distMatrix[i][j] = experiment.distances[a][b]
+    distMatrix = np.array(as_distance_matrix(experiment.distances).submatrix(new_names))
+    np.fill_diagonal(distMatrix, 0)
 
     # Zd = linkage(ssd.squareform(distMatrix), method="complete")
     # cld = fcluster(Zd, 500, criterion='distance').reshape(len(new_names), 1)
@@ -59,9 +59,10 @@ def remove_diag(mtrx):
 def calculate_borda_scores(election):
     m = election.num_candidates
     borda = np.zeros(m, int)
-    for v in election.votes:
+    distinct_votes, quantites = election.get_distinct_votes()
+    for v, quantity in zip(distinct_votes, quantites):
         for i, c in enumerate(v):
-            borda[c] = borda[c] + m - i - 1
+            borda[c] = borda[c] + (m - i - 1) * quantity
     return borda
 
 
@@ -73,25 +74,25 @@ def calculate_cand_dom_dist(election):
 
 
 def calculate_cand_pos_dist(election):
-    election.compute_potes()
+    _, quantites = election.get_weighted_votes()
+    potes = election.get_distinct_potes()
     distances = np.zeros([election.num_candidates, election.num_candidates])
     for c1 in range(election.num_candidates):
         for c2 in range(election.num_candidates):
-            dist = 0
-            for pote in election.potes:
-                dist += abs(pote[c1] - pote[c2])
-            distances[c1][c2] = dist
+            distances[c1][c2] = np.dot(quantites, np.abs(potes[:, c1] - potes[:, c2]))
     return distances
 
 
 def calculate_vote_swap_dist(election):
-    election.compute_potes()
-    distances = np.zeros([election.num_voters, election.num_voters])
-    for v1 in range(election.num_voters):
-        for v2 in range(election.num_voters):
-            distances[v1][v2] = swap_distance_between_potes(
-                election.potes[v1], election.potes[v2])
-    return distances
+    potes = election.get_distinct_potes()
+    distances = np.zeros([len(potes), len(potes)])
+    for v1 in range(len(potes)):
+        for v2 in range(v1 + 1, len(potes)):
+            distances[v1][v2] = distances[v2][v1] = swap_distance_between_potes(
+                potes[v1], potes[v2])
+    # distances between the voters are those between their distinct votes
+    indices = election.get_vote_indices()
+    return distances[np.ix_(indices, indices)]
 
 
 # DIVERSITY INDICES
@@ -57,11 +57,8 @@ def get_effective_num_candidates(election, mode='Borda') -> float:
 
 
 def max_approval_score(election):
-    score = np.zeros([election.num_candidates])
-    for vote in election.votes:
-        for c in vote:
-            score[c] += 1
-    return max(score)
+    score = election.get_approval_matrix().sum(axis=0)
+    return float(max(score))
 
 
 def is_condorcet(election):
@@ -1,12 +1,12 @@
 #!/usr/bin/env python
 import logging
 from abc import ABC
-from collections import Counter
 
 from matplotlib import pyplot as plt
 from mapel.elections.cultures_ import generate_approval_votes
-from mapel.elections.objects.Election import Election
-from mapel.core.inner_distances import hamming
+from mapel.elections.objects.Election import Election, aggregate_votes
+from mapel.elections.other.approval_bits import votes_to_bits, unpack_bits, transpose_bits, \
+    set_distances
 from mapel.core.utils import *
 import mapel.elections.persistence.election_imports as imports
 import mapel.elections.persistence.election_exports as exports
@@ -33,6 +33,7 @@ class ApprovalElection(Election, ABC):
 
         self.approvalwise_vector = []
         self.reverse_approvals = []
+        self.approval_bits = None
 
         self.import_approval_election()
 
@@ -63,18 +64,37 @@ class ApprovalElection(Election, ABC):
                                                                        self.culture_id,
                                                                        self.num_candidates)
 
+    @Election.votes.setter
+    def votes(self, votes):
+        Election.votes.fset(self, votes)
+        self.approval_bits = None
+
+    def get_approval_bits(self) -> np.ndarray:
+        """ Return: packed bit-matrix of the votes (one row per voter) """
+        if self.approval_bits is None:
+            self.approval_bits = votes_to_bits(self.votes, self.num_candidates)
+        return self.approval_bits
+
+    def memory_report(self) -> dict:
+        report = super().memory_report()
+        report['approvalwise_vector'] = get_size_in_bytes(self.approvalwise_vector)
+        report['reverse_approvals'] = get_size_in_bytes(self.reverse_approvals)
+        report['approval_bits'] = get_size_in_bytes(self.approval_bits)
+        return report
+
+    def get_approval_matrix(self) -> np.ndarray:
+        """ Return: boolean matrix of the votes (one row per voter) """
+        return unpack_bits(self.get_approval_bits(), self.num_candidates)
+
     def votes_to_approvalwise_vector(self) -> None:
         """ Convert votes to approvalwise vectors """
-        approvalwise_vector = np.zeros([self.num_candidates])
-        for vote in self.votes:
-            for c in vote:
-                approvalwise_vector[c] += 1
+        approvalwise_vector = self.get_approval_matrix().sum(axis=0)
         approvalwise_vector = approvalwise_vector / self.num_voters
         self.approvalwise_vector = np.sort(approvalwise_vector)
 
     def compute_reverse_approvals(self):
-        self.reverse_approvals = [set(i for i, vote in enumerate(self.votes) if c in vote)
-                                  for c in range(self.num_candidates)]
+        self.reverse_approvals = [set(np.flatnonzero(approvals).tolist())
+                                  for approvals in self.get_approval_matrix().T]
 
     def prepare_instance(self, is_exported=None, is_aggregated=True):
         self.votes = generate_approval_votes(culture_id=self.culture_id,
@@ -82,12 +102,8 @@ class ApprovalElection(Election, ABC):
                                              num_voters=self.num_voters,
                                              params=self.params)
         if not self.fake:
-            c = Counter(map(tuple, self.votes))
-            counted_votes = [[count, list(row)] for row, count in c.items()]
-            counted_votes = sorted(counted_votes, reverse=True)
-            self.quantites = [a[0] for a in counted_votes]
-            self.distinct_votes = [a[1] for a in counted_votes]
-            self.num_options = len(counted_votes)
+            self.quantites, self.distinct_votes = aggregate_votes(self.votes)
+            self.num_options = len(self.distinct_votes)
         else:
             self.quantites = [self.num_voters]
             self.num_options = 1
@@ -96,18 +112,8 @@ class ApprovalElection(Election, ABC):
             exports.export_approval_election(self, is_aggregated=is_aggregated)
 
     def _compute_distances_between_votes(self, distance_id='hamming'):
-        distances = np.zeros([self.num_voters, self.num_voters])
-        for v1 in range(self.num_voters):
-            for v2 in range(self.num_voters):
-                if distance_id == 'hamming':
-                    distances[v1][v2] = hamming(self.votes[v1], self.votes[v2])
-                elif distance_id == 'jaccard':
-                    if len(self.votes[v1].union(self.votes[v2])) == 0:
-                        distances[v1][v2] = 1
-                    else:
-                        distances[v1][v2] = 1 - len(
-                            self.votes[v1].intersection(self.votes[v2])) / len(
-                            self.votes[v1].union(self.votes[v2]))
+        distances = set_distances(self.get_approval_bits(), distance_id=distance_id,
+                                  length=self.num_candidates)
 
         self.distances['vote'] = distances
 
@@ -117,21 +123,9 @@ class ApprovalElection(Election, ABC):
         return distances
 
     def _compute_distances_between_candidates(self, distance_id='hamming'):
-        self.compute_reverse_approvals()
-        distances = np.zeros([self.num_candidates, self.num_candidates])
-        for c1 in range(self.num_candidates):
-            for c2 in range(self.num_candidates):
-                if distance_id == 'hamming':
-                    distances[c1][c2] = hamming(self.reverse_approvals[c1],
-                                                self.reverse_approvals[c2])
-                elif distance_id == 'jaccard':
-                    if len(self.reverse_approvals[c1].union(self.reverse_approvals[c2])) == 0:
-                        distances[c1][c2] = 1
-                    else:
-                        distances[c1][c2] = 1 - len(
-                            self.reverse_approvals[c1].intersection(self.reverse_approvals[c2])) \
-                                            / len(
-                            self.reverse_approvals[c1].union(self.reverse_approvals[c2]))
+        # the approvals of the candidates are the columns of the bit-matrix
+        bits = transpose_bits(self.get_approval_bits(), self.num_candidates)
+        distances = set_distances(bits, distance_id=distance_id, length=self.num_voters)
 
         self.distances['candidate'] = distances
 
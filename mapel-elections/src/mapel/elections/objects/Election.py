@@ -7,6 +7,7 @@ import logging
 import math
 import os
 from abc import abstractmethod
+from collections import Counter
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -19,6 +20,7 @@ import mapel.elections.persistence.election_imports as imports
 from mapel.core.glossary import *
 from mapel.core.inner_distances import l2
 from mapel.core.objects.Instance import Instance
+from mapel.core.utils import get_size_in_bytes
 from mapel.elections.features_ import get_local_feature
 from mapel.elections.other.winners import compute_sntv_winners, compute_borda_winners, \
     compute_stv_winners
@@ -126,15 +128,34 @@ class Election(Instance):
                     matrix[i][j] = row[candidate_id]
         return matrix
 
+    @property
+    def votes(self):
+        # imported (ordinal) elections are stored as distinct votes with their quantities,
+        # and the votes are expanded only when they are needed
+        if self._votes is None and self.distinct_votes is not None:
+            self._votes = np.repeat(np.asarray(self.distinct_votes), self.quantites, axis=0)
+        return self._votes
+
+    @votes.setter
+    def votes(self, votes):
+        self._votes = votes
+        self.distinct_votes = None
+        self.quantites = None
+
+    def get_distinct_votes(self):
+        """ Return: distinct votes and their quantities (aggregated from the votes if needed) """
+        if self.distinct_votes is None and self.votes is not None and not self.fake:
+            self.quantites, self.distinct_votes = aggregate_votes(self.votes)
+            self.num_options = len(self.distinct_votes)
+        return self.distinct_votes, self.quantites
+
     def compute_potes(self, mapping=None):
         """ Convert votes to positional votes (called potes) """
         if not self.fake:
-            if mapping is None:
-                self.potes = np.array([[list(vote).index(i) for i, _ in enumerate(vote)]
-                                       for vote in self.votes])
-            else:
-                self.potes = np.array([[list(vote).index(mapping[i]) for i, _ in enumerate(vote)]
-                                       for vote in self.votes])
+            self.potes = compact_votes(convert_votes_to_potes(self.votes, self.num_candidates),
+                                       self.num_candidates)
+            if mapping is not None:
+                self.potes = self.potes[:, mapping]
             return self.potes
 
     def vector_to_interval(self, vector, precision=None) -> list:
@@ -333,6 +354,16 @@ class Election(Instance):
         feature = get_local_feature(feature_id)
         self.features[feature_long_id] = feature(self, **kwargs)
 
+    def memory_report(self) -> dict:
+        """ Return: number of bytes taken by the votes and by every derived structure """
+        # the votes are read without expanding the distinct votes
+        return {'votes': get_size_in_bytes(self._votes),
+                'distinct_votes': get_size_in_bytes(self.distinct_votes),
+                'quantities': get_size_in_bytes(self.quantites),
+                'potes': get_size_in_bytes(self.potes),
+                'distances': get_size_in_bytes(self.distances),
+                'coordinates': get_size_in_bytes(self.coordinates)}
+
     def get_feature(self,
                     feature_id,
                     feature_long_id=None,
@@ -345,6 +376,64 @@ class Election(Instance):
         return self.features[feature_long_id]
 
 
+def aggregate_votes(votes) -> (list, list):
+    """ Return: quantities and distinct votes (the most frequent ones first) """
+    c = Counter(map(tuple, votes))
+    counted_votes = [[count, list(row)] for row, count in c.items()]
+    counted_votes = sorted(counted_votes, reverse=True)
+    return [a[0] for a in counted_votes], [a[1] for a in counted_votes]
+
+
+def get_compact_dtype(num_candidates: int) -> np.dtype:
+    """ Return: narrowest signed integer type holding the candidates (and -1 as padding) """
+    for dtype in [np.int8, np.int16, np.int32]:
+        if num_candidates - 1 <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def compact_votes(votes, num_candidates: int = None):
+    """
+    Convert votes (or potes) to an array of the narrowest integer type.
+
+    This is the single place where the type of the stored votes is chosen. Anything
+    that is not a rectangular integer matrix (e.g., the votes of the fake cultures,
+    or ragged votes) is returned unchanged. Arithmetic that may exceed the range of
+    the candidates (e.g., scores weighted by the quantities) has to be done on int64.
+    """
+    if votes is None or isinstance(votes, str):
+        return votes
+    try:
+        array = np.asarray(votes)
+    except ValueError:
+        return votes
+    if array.ndim != 2 or array.dtype.kind not in 'iu':
+        return votes
+    # the largest entry is checked as well, so that a wrong number of candidates
+    # can never wrap the votes around
+    num_candidates = max(num_candidates or 0, int(array.max(initial=0)) + 1)
+    return array.astype(get_compact_dtype(num_candidates), copy=False)
+
+
+def convert_votes_to_potes(votes, num_candidates: int = None) -> np.ndarray:
+    """
+    Convert votes to positional votes (called potes).
+
+    Every vote is inverted at once by scattering the positions into the candidates.
+    The candidates missing from a truncated vote (padded with -1) share
+    the first position after the ranked ones.
+    """
+    votes = np.asarray(votes, dtype=np.int64)
+    if num_candidates is None:
+        num_candidates = votes.shape[1]
+    ranked = votes >= 0
+    positions = np.cumsum(ranked, axis=1) - 1
+    potes = np.repeat(ranked.sum(axis=1, keepdims=True), num_candidates, axis=1)
+    voters = np.broadcast_to(np.arange(len(votes))[:, None], votes.shape)
+    potes[voters[ranked], votes[ranked]] = positions[ranked]
+    return potes
+
+
 def map_the_votes(election, party_id, party_size) -> Election:
     new_votes = [[] for _ in range(election.num_voters)]
     for i in range(election.num_voters):
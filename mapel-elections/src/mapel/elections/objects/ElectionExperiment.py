@@ -1,27 +1,38 @@
 #!/usr/bin/env python
 import csv
+import hashlib
 import logging
 import warnings
 from abc import ABCMeta, abstractmethod
-from multiprocessing import Process
-from time import sleep
 import ast
 import time
 from tqdm import tqdm
 
+import numpy as np
+
 from mapel.elections.objects.ElectionFeatures import ST_KEY, AN_KEY, ID_KEY, UN_KEY
 from mapel.elections.objects.ElectionFamily import ElectionFamily
 from mapel.elections.objects.OrdinalElection import OrdinalElection
 from mapel.elections.objects.ApprovalElection import ApprovalElection
+from mapel.elections.objects.Election import compact_votes
+from mapel.elections.persistence.election_archive import ElectionArchive, get_archive_path
+import mapel.elections.persistence.election_exports as election_exports
 import mapel.elections.distances_ as metr
 import mapel.elections.other.rules as rules
 import mapel.elections.features_ as features
+from mapel.core.metric_index import VPTree
+from mapel.core.objects.DistanceMatrix import DistanceMatrix, CrossDistanceMatrix, \
+    as_distance_matrix
+from mapel.core.persistence.distances_journal import DistancesJournal, get_journal_path, \
+    read_journal
 from mapel.core.objects.Experiment import Experiment
+from mapel.core.objects.LazyInstances import LazyInstances
 import mapel.core.printing as pr
 from mapel.core.utils import *
 from mapel.core.glossary import *
 
 import mapel.core.persistence.experiment_exports as exports
+import mapel.core.persistence.experiment_imports as imports
 
 try:
     from sklearn.manifold import MDS
@@ -62,13 +73,24 @@ class ElectionExperiment(Experiment):
     def add_culture(self, name, function):
         pass
 
-    def __init__(self, is_shifted=False, **kwargs):
+    def __init__(self, is_shifted=False, elections_format='preflib', **kwargs):
         self.is_shifted = is_shifted
+        self.elections_format = elections_format
+        self.election_archive = None
         self.default_num_candidates = 10
         self.default_num_voters = 100
         self.default_committee_size = 1
         self.all_winning_committees = {}
+        self.indexes = {}
+        self.distances_by_id = {}
+        self.times_by_id = {}
+        self.matchings_by_id = {}
+        self.cross_distances = {}
+        self.cross_times = {}
         super().__init__(**kwargs)
+        if self.is_imported and self.experiment_id is not None:
+            self.cross_distances, self.cross_times = \
+                imports.add_cross_distances_to_experiment(self)
 
     def __getattr__(self, attr):
         if attr == 'elections':
@@ -106,33 +128,116 @@ class ElectionExperiment(Experiment):
                     writer.writerow(row)
 
     def add_instances_to_experiment(self):
-        instances = {}
+        """
+        Import the elections of all the families.
+
+        With lazy_import, the elections are imported only when they are accessed
+        (and at most max_resident_instances of them are kept in memory).
+        """
+        self.instance_families = {}
 
         for family_id in self.families:
             single = self.families[family_id].single
             ids = []
             for j in range(self.families[family_id].size):
                 instance_id = get_instance_id(single, family_id, j)
-                if self.instance_type == 'ordinal':
-                    instance = OrdinalElection(self.experiment_id, instance_id,
-                                               is_imported=True,
-                                               fast_import=self.fast_import,
-                                               with_matrix=self.with_matrix,
-                                               label=self.families[family_id].label)
-                elif self.instance_type == 'approval':
-                    instance = ApprovalElection(self.experiment_id, instance_id,
-                                                is_imported=True,
-                                                fast_import=self.fast_import,
-                                                label=self.families[family_id].label)
-                else:
-                    instance = None
-
-                instances[instance_id] = instance
+                self.instance_families[instance_id] = family_id
                 ids.append(str(instance_id))
 
             self.families[family_id].election_ids = ids
 
-        return instances
+        if self.lazy_import:
+            return LazyInstances(self.instance_families, self.import_instance,
+                                 max_resident=self.max_resident_instances)
+        return {instance_id: self.import_instance(instance_id)
+                for instance_id in self.instance_families}
+
+    def import_instance(self, instance_id):
+        """ Import a single election (of one of the families) """
+        label = self.families[self.instance_families[instance_id]].label
+        # the elections missing from the archive are imported (or, if there are no
+        # files either, marked as not correct) as in the preflib format
+        if self.elections_format == 'archive' and instance_id in self.get_election_archive():
+            return self._import_instance_from_archive(instance_id, label)
+        if self.instance_type == 'ordinal':
+            return OrdinalElection(self.experiment_id, instance_id,
+                                   is_imported=True,
+                                   fast_import=self.fast_import,
+                                   with_matrix=self.with_matrix,
+                                   label=label)
+        elif self.instance_type == 'approval':
+            return ApprovalElection(self.experiment_id, instance_id,
+                                    is_imported=True,
+                                    fast_import=self.fast_import,
+                                    label=label)
+        return None
+
+    def _import_instance_from_archive(self, instance_id, label):
+        """ Import a single election from the archive of the experiment """
+        data = self.get_election_archive().read(instance_id)
+        params = data['params'] if data['params'] else {}
+        if self.instance_type == 'ordinal':
+            election = OrdinalElection(self.experiment_id, instance_id,
+                                       culture_id=data['culture_id'],
+                                       num_voters=data['num_voters'],
+                                       num_candidates=data['num_candidates'],
+                                       label=label,
+                                       fast_import=self.fast_import,
+                                       **params)
+            if data['alliances'] is not None:
+                election.alliances = data['alliances']
+            if not election.fake:
+                election.quantites = data['quantities']
+                election.distinct_votes = compact_votes(data['distinct_votes'],
+                                                        election.num_candidates)
+                election.num_options = len(election.quantites)
+                if not self.fast_import:
+                    election.votes_to_positionwise_vectors()
+        elif self.instance_type == 'approval':
+            election = ApprovalElection(self.experiment_id, instance_id,
+                                        culture_id=data['culture_id'],
+                                        num_voters=data['num_voters'],
+                                        num_candidates=data['num_candidates'],
+                                        label=label,
+                                        fast_import=self.fast_import,
+                                        **params)
+            if not election.fake:
+                distinct_votes = [set(np.asarray(vote).tolist())
+                                  for vote in data['distinct_votes']]
+                election.votes = [vote for vote, quantity in zip(distinct_votes,
+                                                                 data['quantities'])
+                                  for _ in range(quantity)]
+                election.quantites = data['quantities']
+                election.distinct_votes = [sorted(vote) for vote in distinct_votes]
+                election.num_options = len(election.quantites)
+        else:
+            return None
+        election.is_imported = True
+        return election
+
+    def get_election_archive(self) -> ElectionArchive:
+        """ Return: archive with the votes of all the elections (see elections_format) """
+        if self.election_archive is None:
+            self.election_archive = ElectionArchive(get_archive_path(self.experiment_id))
+        return self.election_archive
+
+    def convert_elections_to_archive(self) -> None:
+        """ Packs the elections (e.g., imported from .soc/.app files) into the archive """
+        # the elections that could not be imported stay out of the archive
+        self.get_election_archive().append(election for election in self.elections.values()
+                                           if getattr(election, 'is_correct', True))
+        self.elections_format = 'archive'
+
+    def export_elections_to_preflib(self, election_ids=None) -> None:
+        """ Exports the elections (all by default) to .soc/.app files """
+        if election_ids is None:
+            election_ids = list(self.elections)
+        for election_id in election_ids:
+            election = self.elections[election_id]
+            if self.instance_type == 'ordinal':
+                election_exports.export_ordinal_election(election)
+            elif self.instance_type == 'approval':
+                election_exports.export_approval_election(election)
 
     def set_default_num_candidates(self, num_candidates: int) -> None:
         """ Set default number of candidates """
@@ -255,13 +360,20 @@ class ElectionExperiment(Experiment):
         self.num_elections = sum([self.families[family_id].size for family_id in self.families])
         self.main_order = [i for i in range(self.num_elections)]
 
+        is_archived = self.is_exported and self.elections_format == 'archive'
         new_instances = self.families[family_id].prepare_family(
-            is_exported=self.is_exported,
+            is_exported=self.is_exported and not is_archived,
             experiment_id=self.experiment_id,
             instance_type=self.instance_type)
 
         for instance_id in new_instances:
             self.instances[instance_id] = new_instances[instance_id]
+        # the metric indexes are built for the previous elections
+        self.indexes = {}
+
+        if is_archived:
+            # the whole family is appended to the archive at once
+            self.get_election_archive().append(new_instances.values())
 
         self.families[family_id].instance_ids = list(new_instances.keys())
 
@@ -423,87 +535,147 @@ class ElectionExperiment(Experiment):
                           num_processes: int = 1,
                           self_distances: bool = False,
                           ids = None,
+                          resume: bool = False,
+                          incremental: bool = False,
+                          mode: str = 'all',
+                          k: int = 10,
+                          proxy_id: str = None,
+                          num_proxy_neighbors: int = None,
+                          distance_ids: list = None,
                           **kwargs) -> None:
-        """ Compute distances between elections (using processes) """
+        """
+        Compute distances between elections (using processes).
+
+        For exported experiments, the results are appended to a journal while
+        they are computed. With resume=True, the pairs already present in the
+        journal (e.g., of a crashed run) are not computed again.
+
+        With incremental=True, the already known distances (in memory, or stored
+        on disk) are kept and only the missing pairs (e.g., the ones involving
+        newly added families) are computed.
+
+        If the distance cache is enabled (see enable_distance_cache), the pairs
+        found in the cache are not computed, and the new results are cached.
+
+        For distances invariant under renaming candidates and reordering voters,
+        isomorphic elections are grouped into classes and only the distances
+        between the representatives of the classes are computed.
+
+        With mode='knn', the distance is computed only between each election and
+        its num_proxy_neighbors (2 * k by default) nearest elections with respect
+        to a cheap proxy distance (l1-bordawise or l1-approvalwise by default).
+        The remaining distances are missing, so the result is a sparse graph of
+        (approximate) k nearest neighbors, which can be passed to embed.
+
+        With distance_ids (a list), several distances are computed, sharing the
+        preprocessing of the elections (and, for Positionwise distances with
+        different inner distances, a single pass over the pairs). The results
+        of each distance are kept in distances_by_id, times_by_id and
+        matchings_by_id (and exported to separate files).
+        """
+
+        if distance_ids is not None:
+            self._compute_multiple_distances(distance_ids,
+                                             num_processes=num_processes,
+                                             self_distances=self_distances,
+                                             ids=ids,
+                                             resume=resume,
+                                             incremental=incremental,
+                                             mode=mode,
+                                             k=k,
+                                             proxy_id=proxy_id,
+                                             num_proxy_neighbors=num_proxy_neighbors,
+                                             **kwargs)
+            return
 
         if distance_id is None:
             distance_id = self.distance_id
 
+        previous_distance_id = self.distance_id
         self.distance_id = distance_id
 
-        if '-approvalwise' in distance_id:
-            for election in self.elections.values():
-                election.votes_to_approvalwise_vector()
-        elif '-coapproval_frequency' in distance_id:
-            for election in self.elections.values():
-                election.votes_to_coapproval_frequency_vectors(**kwargs)
-        elif '-voterlikeness' in distance_id:
-            for election in self.elections.values():
-                election.votes_to_voterlikeness_matrix(**kwargs)
-        elif '-candidatelikeness' in distance_id:
-            for election in self.elections.values():
-                election.votes_to_candidatelikeness_sorted_vectors()
-        elif '-pairwise' in distance_id:
-            for election in self.elections.values():
-                election.votes_to_pairwise_matrix()
+        self._prepare_for_distance(self.elections, distance_id, **kwargs)
 
-        matchings = {election_id: {} for election_id in self.elections}
-        distances = {election_id: {} for election_id in self.elections}
-        times = {election_id: {} for election_id in self.elections}
+        if incremental:
+            distances, times, matchings = \
+                self._get_stored_distances(distance_id, previous_distance_id)
+        else:
+            matchings = {election_id: {} for election_id in self.elections}
+            distances = DistanceMatrix(self.elections)
+            times = DistanceMatrix(self.elections)
+
+        if mode == 'knn' and ids is None:
+            ids = metr.get_knn_pairs(self, k=k, proxy_id=proxy_id,
+                                     num_proxy_neighbors=num_proxy_neighbors)
+
+        if ids is None and not incremental and metr.distance_cache is None \
+                and metr.is_embedding_free(self, distance_id) \
+                and metr.run_vector_process(self, distances, times, self_distances):
+            # the whole matrix is computed at once, without listing the pairs
+            if self.is_exported:
+                exports.export_distances_to_file(self,
+                                                 distance_id,
+                                                 distances,
+                                                 times,
+                                                 self_distances,
+                                                 ids=self._get_all_pairs(self_distances))
+            self._set_distances(distance_id, distances, times, matchings)
+            return
 
         if ids is None:
-            ids = []
-            for i, election_1 in enumerate(self.elections):
-                for j, election_2 in enumerate(self.elections):
-                    if i < j or (i == j and self_distances):
-                        ids.append((election_1, election_2))
+            ids = self._get_all_pairs(self_distances)
 
-        num_distances = len(ids)
+        remaining_ids = ids
+        if incremental:
+            remaining_ids = self._get_missing_pairs(distances, ids)
 
-        if self.experiment_id == 'virtual' or num_processes == 1:
-            metr.run_single_process(self, ids, distances, times, matchings)
+        cache = metr.distance_cache
+        if cache is not None:
+            cache.reset_stats()
+            remaining_ids = metr.add_cached_distances(self, remaining_ids, distances, times,
+                                                      matchings, params=kwargs)
 
-        else:
-            processes = []
-            for process_id in range(num_processes):
-                print(f'Starting process: {process_id}')
-                sleep(0.1)
-                start = int(process_id * num_distances / num_processes)
-                stop = int((process_id + 1) * num_distances / num_processes)
-                instances_ids = ids[start:stop]
-
-                process = Process(target=metr.run_multiple_processes, args=(self,
-                                                                            instances_ids,
-                                                                            distances,
-                                                                            times,
-                                                                            matchings,
-                                                                            process_id))
-                process.start()
-                processes.append(process)
-
-            for process in processes:
-                process.join()
-
-            distances = {instance_id: {} for instance_id in self.instances}
-            times = {instance_id: {} for instance_id in self.instances}
-
-            for process_id in range(num_processes):
-
-                file_name = f'{distance_id}_p{process_id}.csv'
-                path = os.path.join(os.getcwd(),
-                                    "experiments",
-                                    self.experiment_id,
-                                    "distances",
-                                    file_name)
-
-                with open(path, 'r', newline='') as csv_file:
-                    reader = csv.DictReader(csv_file, delimiter=';')
-
-                    for row in reader:
-                        distances[row['instance_id_1']][row['instance_id_2']] = \
-                            float(row['distance'])
-                        times[row['instance_id_1']][row['instance_id_2']] = \
-                            float(row['time'])
+        journal = None
+        if self.is_exported:
+            journal_path = get_journal_path(self, distance_id)
+            if resume:
+                remaining_ids = self._add_journaled_distances(journal_path, remaining_ids,
+                                                              distances, times, matchings)
+            journal = DistancesJournal(journal_path, resume=resume)
+
+        # isomorphic elections are computed only once (per class)
+        computed_ids, classes = remaining_ids, {}
+        if metr.is_isomorphic(self, distance_id):
+            computed_ids, classes = metr.deduplicate_pairs(self, remaining_ids, distances)
+
+        if isinstance(self.instances, LazyInstances):
+            # the pairs are grouped by blocks of elections fitting in memory together
+            computed_ids = self.instances.order_pairs(computed_ids)
+
+        try:
+            if (self.experiment_id == 'virtual' or num_processes == 1) \
+                    and metr.is_batchable(self, distance_id):
+                metr.run_batched_process(self, computed_ids, distances, times, matchings,
+                                         journal=journal)
+
+            elif self.experiment_id == 'virtual' or num_processes == 1:
+                metr.run_single_process(self, computed_ids, distances, times, matchings,
+                                        journal=journal)
+
+            else:
+                metr.run_multiple_processes(self, computed_ids, distances, times, matchings,
+                                            num_processes, journal=journal)
+        finally:
+            if journal is not None:
+                journal.close()
+
+        if classes:
+            metr.broadcast_distances(self, remaining_ids, classes, distances, times, matchings)
+
+        if cache is not None:
+            metr.store_cached_distances(self, remaining_ids, distances, times, matchings,
+                                        params=kwargs)
+            print(f'Distance cache: {cache.hits} hits, {cache.misses} misses')
 
         if self.is_exported:
             exports.export_distances_to_file(self,
@@ -512,10 +684,321 @@ class ElectionExperiment(Experiment):
                                              times,
                                              self_distances,
                                              ids=ids)
+            journal.remove()
+
+        self._set_distances(distance_id, distances, times, matchings)
 
+    def _set_distances(self, distance_id, distances, times, matchings) -> None:
+        self.distance_id = distance_id
         self.distances = distances
         self.times = times
         self.matchings = matchings
+        self.distances_by_id[distance_id] = distances
+        self.times_by_id[distance_id] = times
+        self.matchings_by_id[distance_id] = matchings
+
+    def _compute_multiple_distances(self,
+                                    distance_ids: list,
+                                    num_processes: int = 1,
+                                    self_distances: bool = False,
+                                    ids=None,
+                                    resume: bool = False,
+                                    incremental: bool = False,
+                                    **kwargs) -> None:
+        """ Compute several distances (the last one becomes the current distance) """
+        shared_ids = []
+        if not resume and not incremental and metr.distance_cache is None \
+                and kwargs.get('mode', 'all') == 'all' \
+                and (self.experiment_id == 'virtual' or num_processes == 1):
+            shared_ids = metr.get_shared_positionwise_ids(self, distance_ids)
+
+        if len(shared_ids) > 1:
+            pairs = self._get_all_pairs(self_distances) if ids is None else ids
+            results = metr.run_shared_positionwise_process(self, shared_ids, pairs)
+            for distance_id, (distances, times, matchings) in results.items():
+                if self.is_exported:
+                    exports.export_distances_to_file(self,
+                                                     distance_id,
+                                                     distances,
+                                                     times,
+                                                     self_distances,
+                                                     ids=pairs)
+                self._set_distances(distance_id, distances, times, matchings)
+        else:
+            shared_ids = []
+
+        for distance_id in dict.fromkeys(distance_ids):
+            if distance_id not in shared_ids:
+                self.compute_distances(distance_id=distance_id,
+                                       num_processes=num_processes,
+                                       self_distances=self_distances,
+                                       ids=ids,
+                                       resume=resume,
+                                       incremental=incremental,
+                                       **kwargs)
+
+        last_id = distance_ids[-1]
+        self._set_distances(last_id,
+                            self.distances_by_id[last_id],
+                            self.times_by_id[last_id],
+                            self.matchings_by_id[last_id])
+
+    def compute_cross_distances(self,
+                                other_experiment,
+                                distance_id: str = None,
+                                num_processes: int = 1,
+                                **kwargs) -> CrossDistanceMatrix:
+        """
+        Compute distances between the elections of this experiment (rows) and
+        the elections of another experiment (columns), e.g., to project new
+        elections onto a fixed map, without the distances within the experiments.
+
+        The results are stored in cross_distances and cross_times (under the id
+        of the other experiment) and, for exported experiments, in the
+        distances/cross folder (together with both lists of election ids).
+        """
+        if distance_id is None:
+            distance_id = self.distance_id
+        if other_experiment.instance_type != self.instance_type:
+            logging.warning('The experiments contain different types of elections!')
+            return None
+
+        self._prepare_for_distance(self.elections, distance_id, **kwargs)
+        self._prepare_for_distance(other_experiment.elections, distance_id, **kwargs)
+
+        distances, times = metr.compute_cross_distances(self, other_experiment, distance_id,
+                                                        num_processes=num_processes)
+
+        other_id = other_experiment.experiment_id
+        if self.is_exported:
+            exports.export_cross_distances_to_file(self, other_id, distance_id, distances, times)
+
+        self.cross_distances[other_id] = distances
+        self.cross_times[other_id] = times
+        return distances
+
+    def import_cross_distances(self,
+                               other_experiment_id: str,
+                               distance_id: str = None) -> CrossDistanceMatrix:
+        """
+        Import the distances to the elections of another experiment (stored by
+        compute_cross_distances) into cross_distances and cross_times.
+        The distances of the experiment's own distance are imported automatically.
+        """
+        if distance_id is None:
+            distance_id = self.distance_id
+        distances, times = imports.import_cross_distances(self, other_experiment_id, distance_id)
+        if distances is not None:
+            self.cross_distances[other_experiment_id] = distances
+            self.cross_times[other_experiment_id] = times
+        return distances
+
+    @staticmethod
+    def _prepare_for_distance(elections: dict, distance_id: str, **kwargs) -> None:
+        """ Computes the representations of the elections used by the distance """
+        if isinstance(elections, LazyInstances) and elections.max_resident is not None:
+            # they would be dropped together with the elections, so they are computed
+            # (by the distances) only when the elections are imported again
+            return
+        if '-approvalwise' in distance_id:
+            for election in elections.values():
+                election.votes_to_approvalwise_vector()
+        elif '-coapproval_frequency' in distance_id:
+            for election in elections.values():
+                election.votes_to_coapproval_frequency_vectors(**kwargs)
+        elif '-voterlikeness' in distance_id:
+            for election in elections.values():
+                election.votes_to_voterlikeness_matrix(**kwargs)
+        elif '-candidatelikeness' in distance_id:
+            for election in elections.values():
+                election.votes_to_candidatelikeness_sorted_vectors()
+        elif '-pairwise' in distance_id:
+            for election in elections.values():
+                election.get_pairwise_matrix()
+
+    def _get_all_pairs(self, self_distances: bool = False) -> list:
+        """ Return all the pairs of elections (in the order of the elections) """
+        ids = []
+        for i, election_1 in enumerate(self.elections):
+            for j, election_2 in enumerate(self.elections):
+                if i < j or (i == j and self_distances):
+                    ids.append((election_1, election_2))
+        return ids
+
+    def _get_stored_distances(self, distance_id, previous_distance_id) -> tuple:
+        """ Return the already known distances, times and matchings (extended to all elections) """
+        distances = None
+        if distance_id == previous_distance_id and self.distances:
+            distances = as_distance_matrix(self.distances).copy()
+            times = as_distance_matrix(self.times).copy() if self.times else None
+            matchings = self.matchings
+        elif distance_id in self.distances_by_id:
+            distances = as_distance_matrix(self.distances_by_id[distance_id]).copy()
+            times = as_distance_matrix(self.times_by_id[distance_id]).copy()
+            matchings = self.matchings_by_id[distance_id]
+        elif self.is_imported and self.experiment_id is not None:
+            distances, times, _, matchings = imports.add_distances_to_experiment(self)
+            if distances is not None:
+                distances = distances.copy()
+                times = times.copy()
+
+        if distances is None:
+            distances = DistanceMatrix()
+            times = None
+            matchings = {}
+        if times is None:
+            times = DistanceMatrix(distances.ids)
+
+        distances.add_ids(self.elections)
+        times.add_ids(distances.ids)
+        matchings = {election_id: dict(matchings.get(election_id, {}))
+                     for election_id in distances.ids}
+        return distances, times, matchings
+
+    @staticmethod
+    def _get_missing_pairs(distances, ids) -> list:
+        """ Return the pairs (out of ids) with unknown distances """
+        if not ids:
+            return []
+        indices_1 = np.array([distances.index[election_id_1] for election_id_1, _ in ids])
+        indices_2 = np.array([distances.index[election_id_2] for _, election_id_2 in ids])
+        is_missing = np.isnan(distances.matrix[indices_1, indices_2])
+        return [pair for pair, missing in zip(ids, is_missing) if missing]
+
+    def _add_journaled_distances(self, journal_path, ids, distances, times, matchings) -> list:
+        """ Fill in the distances stored in the journal and return the pairs still to compute """
+        computed = set()
+        for election_id_1, election_id_2, distance, time_, matching in read_journal(journal_path):
+            if election_id_1 not in distances or election_id_2 not in distances:
+                continue
+            distances[election_id_1][election_id_2] = distance
+            distances[election_id_2][election_id_1] = distance
+            times[election_id_1][election_id_2] = time_
+            times[election_id_2][election_id_1] = time_
+            if matching is not None:
+                matchings[election_id_1][election_id_2] = matching
+                matchings[election_id_2][election_id_1] = np.argsort(matching)
+            computed.add((election_id_1, election_id_2))
+            computed.add((election_id_2, election_id_1))
+        return [pair for pair in ids if tuple(pair) not in computed]
+
+    def build_index(self,
+                    distance_id: str = 'emd-positionwise',
+                    leaf_size: int = 8) -> VPTree:
+        """
+        Builds a metric index (VP-tree) over the elections, used by query_nearest.
+        The already computed distances are reused. For exported experiments,
+        the index is stored in the indexes folder.
+        """
+        known = None
+        if distance_id == self.distance_id and self.distances:
+            known = as_distance_matrix(self.distances)
+
+        def distance(election_id_1, election_id_2) -> float:
+            if known is not None and election_id_1 in known and election_id_2 in known \
+                    and election_id_2 in known[election_id_1]:
+                return known[election_id_1][election_id_2]
+            return metr.get_distance_value(self.elections[election_id_1],
+                                           self.elections[election_id_2],
+                                           distance_id=distance_id)
+
+        index = VPTree.build(list(self.elections), distance, leaf_size=leaf_size)
+        index.content_hash = self._get_content_hash()
+        self.indexes[distance_id] = index
+        if self.is_exported:
+            exports.export_metric_index(self, distance_id, index)
+        return index
+
+    def _get_index(self, distance_id: str) -> VPTree:
+        """ Return the metric index over the current elections (imported or built if needed) """
+        index = self.indexes.get(distance_id)
+        if index is None and self.experiment_id is not None and self.is_imported:
+            index = imports.import_metric_index(self, distance_id)
+            # the stored index may be built for elections since regenerated under the same ids
+            if index is not None and index.content_hash != self._get_content_hash():
+                index = None
+        if index is None or set(index.instance_ids) != set(self.elections):
+            index = self.build_index(distance_id=distance_id)
+        self.indexes[distance_id] = index
+        return index
+
+    def _get_content_hash(self) -> str:
+        """ Return: hash of the ids and the votes of the elections """
+        digest = hashlib.sha256()
+        for election_id in sorted(self.elections):
+            election = self.elections[election_id]
+            election_hash = metr.get_election_hash(election)
+            if election_hash is None:
+                election_hash = f'{election.culture_id};{election.params}'
+            digest.update(f'{election_id};{election_hash};'.encode())
+        return digest.hexdigest()
+
+    def query_nearest(self,
+                      election,
+                      k: int = 1,
+                      distance_id: str = 'emd-positionwise',
+                      radius: float = None) -> list:
+        """
+        Finds the elections of the experiment nearest to a given election.
+
+        The distance has to be a metric (e.g., emd-positionwise), so that
+        the metric index (see build_index) can skip most of the elections.
+
+        :param election: election (not necessarily in the experiment).
+        :param k: number of the nearest elections.
+        :param distance_id: name of the distance.
+        :param radius: if given, all the elections within this distance are returned instead.
+        :return: pairs (election_id, distance), from the nearest one.
+        """
+        index = self._get_index(distance_id)
+
+        def distance_to(election_id) -> float:
+            return metr.get_distance_value(election, self.elections[election_id],
+                                           distance_id=distance_id)
+
+        if radius is not None:
+            return index.query_radius(distance_to, radius)
+        return index.query(distance_to, k=k)
+
+    def memory_report(self) -> dict:
+        """
+        Breaks the memory taken by the experiment down by election and by structure.
+
+        Returns
+        -------
+            dict
+                'instances': bytes taken by every structure of every election
+                (kept in memory),
+                'structures': bytes taken by every structure summed over the elections,
+                'distances': bytes taken by the distances (and the times)
+                of every distance, and 'total': bytes taken by all of them.
+        """
+        elections = self.elections.items()
+        if isinstance(self.elections, LazyInstances):
+            # the elections that are not imported take no memory
+            elections = self.elections.resident_items()
+        instances = {election_id: election.memory_report() for election_id, election in elections}
+
+        structures = {}
+        for report in instances.values():
+            for name, size in report.items():
+                structures[name] = structures.get(name, 0) + size
+
+        distances = {}
+        for distance_id, matrix in self.distances_by_id.items():
+            distances[distance_id] = get_size_in_bytes(matrix) + \
+                                     get_size_in_bytes(self.times_by_id.get(distance_id))
+        if self.distance_id not in distances and self.distances is not None:
+            distances[self.distance_id] = get_size_in_bytes(self.distances) + \
+                                          get_size_in_bytes(self.times)
+        for other_id, matrix in self.cross_distances.items():
+            distances[f'cross_{other_id}'] = get_size_in_bytes(matrix) + \
+                                             get_size_in_bytes(self.cross_times.get(other_id))
+
+        return {'instances': instances,
+                'structures': structures,
+                'distances': distances,
+                'total': sum(structures.values()) + sum(distances.values())}
 
     def get_election_id_from_model_name(self, culture_id: str) -> str:
         for family_id in self.families:
@@ -548,6 +1031,7 @@ class ElectionExperiment(Experiment):
                 num_candidates = None
                 num_voters = None
                 family_id = None
+                path = None
 
                 print_params = {}
 
@@ -1,6 +1,5 @@
 import csv
 import logging
-from collections import Counter
 
 from matplotlib import pyplot as plt
 
@@ -16,9 +15,11 @@ from mapel.elections.cultures.matrices.single_crossing_matrices import get_singl
 from mapel.elections.cultures_ import generate_ordinal_votes, \
     from_approval, generate_ordinal_alliance_votes
 from mapel.elections.features.other import is_condorcet
-from mapel.elections.objects.Election import Election
+from mapel.elections.objects.Election import Election, aggregate_votes, \
+    convert_votes_to_potes, compact_votes
 from mapel.elections.other.winners import compute_sntv_winners, compute_borda_winners, \
     compute_stv_winners
+from mapel.elections.other.approval_bits import votes_to_bits, transpose_bits, set_distances
 from mapel.elections.other.winners import generate_winners
 from mapel.elections.other.winners import get_borda_points
 
@@ -50,6 +51,7 @@ class OrdinalElection(Election):
         self.variable = variable
         self.vectors = []
         self.matrix = []
+        self.pairwise_matrix = None
         self.potes = None
         self.condorcet = None
         self.points = {}
@@ -94,6 +96,8 @@ class OrdinalElection(Election):
                             experiment_id=self.experiment_id,
                             election_id=self.election_id,
                             is_shifted=self.is_shifted)
+                        self.distinct_votes = compact_votes(self.distinct_votes,
+                                                            self.num_candidates)
                         try:
                             self.points['voters'] = self.import_ideal_points('voters')
                             self.points['candidates'] = self.import_ideal_points('candidates')
@@ -127,6 +131,33 @@ class OrdinalElection(Election):
         except:
             pass
 
+    @Election.votes.setter
+    def votes(self, votes):
+        Election.votes.fset(self, compact_votes(votes, self.num_candidates))
+
+    def get_distinct_votes(self):
+        distinct_votes, quantites = super().get_distinct_votes()
+        self.distinct_votes = compact_votes(distinct_votes, self.num_candidates)
+        return self.distinct_votes, quantites
+
+    def get_weighted_votes(self) -> (np.ndarray, np.ndarray):
+        """ Return: distinct votes (as an array) and their quantities """
+        distinct_votes, quantites = self.get_distinct_votes()
+        distinct_votes = np.asarray(distinct_votes, dtype=np.int64)
+        return distinct_votes.reshape(len(distinct_votes), -1), np.asarray(quantites)
+
+    def get_distinct_potes(self) -> np.ndarray:
+        """ Return: potes of the distinct votes """
+        return convert_votes_to_potes(self.get_weighted_votes()[0], self.num_candidates)
+
+    def get_vote_indices(self) -> np.ndarray:
+        """ Return: for every voter, the index of its vote among the distinct votes """
+        distinct_votes, quantites = self.get_distinct_votes()
+        if self._votes is None:
+            return np.repeat(np.arange(len(distinct_votes)), quantites)
+        index = {tuple(vote): i for i, vote in enumerate(distinct_votes)}
+        return np.array([index[tuple(vote)] for vote in self._votes], dtype=np.int64)
+
     def get_vectors(self):
         if self.vectors is not None and len(self.vectors) > 0:
             return self.vectors
@@ -137,6 +168,18 @@ class OrdinalElection(Election):
             return self.matrix
         return self.votes_to_positionwise_matrix()
 
+    def get_pairwise_matrix(self):
+        if self.pairwise_matrix is not None:
+            return self.pairwise_matrix
+        return self.votes_to_pairwise_matrix()
+
+    def memory_report(self) -> dict:
+        report = super().memory_report()
+        report['vectors'] = get_size_in_bytes(self.vectors)
+        report['matrix'] = get_size_in_bytes(self.matrix)
+        report['pairwise_matrix'] = get_size_in_bytes(self.pairwise_matrix)
+        return report
+
     def get_potes(self):
         if self.potes is not None:
             return self.potes
@@ -173,17 +216,17 @@ class OrdinalElection(Election):
                                     num_voters=self.num_voters,
                                     params=self.params)
         else:
-            for i in range(self.num_voters):
-                pos = 0
-                for j in range(self.num_candidates):
-                    vote = self.votes[i][j]
-                    if vote == -1:
-                        continue
-                    vectors[vote][pos] += 1
-                    pos += 1
-            for i in range(self.num_candidates):
-                for j in range(self.num_candidates):
-                    vectors[i][j] /= float(self.num_voters)
+            # weighted histogram of (candidate, position) pairs of the distinct votes,
+            # skipping the -1 entries of truncated votes
+            votes, quantites = self.get_weighted_votes()
+            ranked = votes >= 0
+            positions = np.cumsum(ranked, axis=1) - 1
+            weights = np.broadcast_to(quantites[:, None], votes.shape)
+            counts = np.bincount(votes[ranked] * self.num_candidates + positions[ranked],
+                                 weights=weights[ranked],
+                                 minlength=self.num_candidates ** 2)
+            vectors = counts.reshape(self.num_candidates, self.num_candidates) \
+                      / float(self.num_voters)
 
         self.vectors = vectors
         self.matrix = self.vectors.transpose()
@@ -206,15 +249,19 @@ class OrdinalElection(Election):
                                          get_fake_matrix_single)
 
         else:
-            for v in range(self.num_voters):
-                for c1 in range(self.num_candidates):
-                    for c2 in range(c1 + 1, self.num_candidates):
-                        matrix[int(self.votes[v][c1])][
-                            int(self.votes[v][c2])] += 1
-            for i in range(self.num_candidates):
-                for j in range(i + 1, self.num_candidates):
-                    matrix[i][j] /= float(self.num_voters)
-                    matrix[j][i] = 1. - matrix[i][j]
+            # unranked candidates of truncated votes are below the ranked ones
+            votes, quantites = self.get_weighted_votes()
+            potes = convert_votes_to_potes(votes, self.num_candidates)
+            wins = np.zeros([self.num_candidates, self.num_candidates], dtype=np.int64)
+            block_size = max(1, 2 ** 22 // self.num_candidates ** 2)
+            for start in range(0, len(potes), block_size):
+                block = potes[start:start + block_size]
+                wins += np.tensordot(quantites[start:start + block_size],
+                                     block[:, :, None] < block[:, None, :], axes=1)
+            # both halves are divided from the exact counts, so the matrices of
+            # isomorphic elections consist of exactly the same entries
+            matrix = wins / float(self.num_voters)
+        self.pairwise_matrix = matrix
         return matrix
 
     def votes_to_bordawise_vector(self) -> np.ndarray:
@@ -234,21 +281,16 @@ class OrdinalElection(Election):
             c = self.num_candidates
             v = self.num_voters
             vectors = self.votes_to_positionwise_vectors()
-            borda_vector = [sum([vectors[i][j] * (c - j - 1) for j in range(c)]) * v for i in
-                            range(self.num_candidates)]
-            borda_vector = sorted(borda_vector, reverse=True)
+            borda_vector = np.sort(vectors.dot(np.arange(c - 1, -1, -1)) * v)[::-1]
 
         return np.array(borda_vector)
 
     def votes_to_candidatelikeness_original_vectors(self) -> None:
         """ convert VOTES to candidate-likeness VECTORS """
-        matrix = np.zeros([self.num_candidates, self.num_candidates])
-
-        for c_1 in range(self.num_candidates):
-            for c_2 in range(self.num_candidates):
-                for vote in self.approval_votes:
-                    if (c_1 in vote and c_2 not in vote) or (c_1 not in vote and c_2 in vote):
-                        matrix[c_1][c_2] += 1
+        # Hamming distances between the approvals of the candidates
+        bits = transpose_bits(votes_to_bits(self.approval_votes, self.num_candidates),
+                              self.num_candidates)
+        matrix = set_distances(bits, distance_id='hamming', length=self.num_voters)
         self.candidatelikeness_original_vectors = matrix / self.num_voters
 
     def votes_to_positionwise_intervals(self, precision: int = None) -> list:
@@ -300,7 +342,9 @@ class OrdinalElection(Election):
 
     def compute_winners(self, method=None, num_winners=None):
 
-        self.borda_points = get_borda_points(self.votes, self.num_voters, self.num_candidates)
+        votes, quantites = self.get_weighted_votes()
+        self.borda_points = get_borda_points(votes, len(votes), self.num_candidates,
+                                             quantities=quantites)
 
         if method == 'sntv':
             self.winners = compute_sntv_winners(election=self, num_winners=num_winners)
@@ -324,12 +368,9 @@ class OrdinalElection(Election):
                                                 num_voters=self.num_voters,
                                                 params=self.params)
         if not self.fake:
-            c = Counter(map(tuple, self.votes))
-            counted_votes = [[count, list(row)] for row, count in c.items()]
-            counted_votes = sorted(counted_votes, reverse=True)
-            self.quantites = [a[0] for a in counted_votes]
-            self.distinct_votes = [a[1] for a in counted_votes]
-            self.num_options = len(counted_votes)
+            self.quantites, distinct_votes = aggregate_votes(self.votes)
+            self.distinct_votes = compact_votes(distinct_votes, self.num_candidates)
+            self.num_options = len(self.distinct_votes)
         else:
             self.quantites = [self.num_voters]
             self.num_options = 1
@@ -342,7 +383,7 @@ class OrdinalElection(Election):
         if object_type is None:
             object_type = self.object_type
 
-        self.distinct_potes = convert_votes_to_potes(self.distinct_votes)
+        self.distinct_potes = self.get_distinct_potes()
         self.num_dist_votes = len(self.distinct_votes)
         self.num_options = self.num_dist_votes
 
@@ -515,8 +556,3 @@ class OrdinalElection(Election):
         plt.close()
 
 
-
-def convert_votes_to_potes(votes) -> np.array:
-    """ Convert votes to positional votes (called potes) """
-    return np.array([[list(vote).index(i) for i, _ in enumerate(vote)]
-                     for vote in votes])
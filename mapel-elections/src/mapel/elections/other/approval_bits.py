@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Packed bit-matrix representation of approval ballots.
+
+Row i of the matrix is the ballot of voter i, packed eight candidates per byte
+(as in np.packbits). The approvals of the candidates are packed in the same way
+after transposing the matrix. The sizes of the sets are the popcounts of the rows,
+and the sizes of the intersections of all the pairs of sets are computed as
+a product of the unpacked matrices (block by block, so that only a block of rows
+is unpacked at once).
+"""
+
+import logging
+
+import numpy as np
+
+# number of bits set in every byte
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+def votes_to_bits(votes, num_candidates: int) -> np.ndarray:
+    """ Return: packed bit-matrix of the approval ballots (given as sets of candidates) """
+    matrix = np.zeros([len(votes), num_candidates], dtype=bool)
+    sizes = [len(vote) for vote in votes]
+    voters = np.repeat(np.arange(len(votes)), sizes)
+    candidates = np.fromiter((c for vote in votes for c in vote), dtype=np.int64,
+                             count=sum(sizes))
+    matrix[voters, candidates] = True
+    return np.packbits(matrix, axis=1)
+
+
+def unpack_bits(bits: np.ndarray, length: int) -> np.ndarray:
+    """ Return: boolean matrix of the packed rows (with the given number of columns) """
+    return np.unpackbits(bits, axis=1, count=length).astype(bool)
+
+
+def transpose_bits(bits: np.ndarray, length: int) -> np.ndarray:
+    """ Return: packed bit-matrix of the columns (e.g., the approvals of the candidates) """
+    return np.packbits(unpack_bits(bits, length).T, axis=1)
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """ Return: number of bits set in every row """
+    return _POPCOUNT[bits].sum(axis=-1, dtype=np.int64)
+
+
+def set_distances(bits_1: np.ndarray,
+                  bits_2: np.ndarray = None,
+                  distance_id: str = 'hamming',
+                  length: int = None,
+                  block_size: int = None) -> np.ndarray:
+    """
+    Computes the distances between the sets given by the rows of packed bit-matrices.
+
+    Parameters
+    ----------
+        bits_1 : np.ndarray
+            Packed bit-matrix of the first sets.
+        bits_2 : np.ndarray
+            Packed bit-matrix of the second sets (by default, the first ones).
+        distance_id : str
+            'hamming' (size of the symmetric difference)
+            or 'jaccard' (1 - size of the intersection / size of the union).
+        length : int
+            Number of the elements (by default, eight per byte of a row).
+        block_size : int
+            Number of rows of bits_1 processed at once.
+    Returns
+    -------
+        np.ndarray
+            Matrix of the distances.
+    """
+    if bits_2 is None:
+        bits_2 = bits_1
+    if length is None:
+        length = 8 * bits_1.shape[1]
+    sizes_1 = popcount(bits_1)
+    sizes_2 = popcount(bits_2)
+    if block_size is None:
+        block_size = max(1, 2 ** 20 // max(1, length))
+
+    # the products of 0/1 matrices are exact in floating point (and use BLAS)
+    matrix_2 = np.unpackbits(bits_2, axis=1, count=length).astype(float)
+    intersections = np.empty([len(bits_1), len(bits_2)], dtype=np.int64)
+    for start in range(0, len(bits_1), block_size):
+        block = np.unpackbits(bits_1[start:start + block_size], axis=1, count=length)
+        intersections[start:start + block_size] = block.astype(float) @ matrix_2.T
+
+    unions = sizes_1[:, None] + sizes_2[None, :] - intersections
+    if distance_id == 'hamming':
+        return (unions - intersections).astype(float)
+    elif distance_id == 'jaccard':
+        # the distance between two empty sets is 1
+        return 1 - np.divide(intersections, unions,
+                             out=np.zeros(unions.shape), where=unions > 0)
+    logging.warning(f'Unknown set distance: {distance_id}')
+    return np.zeros(unions.shape)
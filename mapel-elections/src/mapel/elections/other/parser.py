@@ -3,100 +3,244 @@ This parser is compatible with Preflib file format in October 2023
 Sample code for using it:
 from mapel.elections.other.parser import preflib_parser
 votes, nr_candidates, nr_votes, label = preflib_parser(file_name="~Input the absolute path to the file~", file_ending=4)
-"""
-
-import re
-import numpy as np
 
-regex_file_name = r'# FILE NAME:'
-regex_title = r'# TITLE:'
-regex_data_type = r'# DATA TYPE:'
-regex_number_alternatives = r"# NUMBER ALTERNATIVES:"
-regex_number_voters = r"# NUMBER VOTERS:"
-regex_number_unique_orders = r"# NUMBER UNIQUE ORDERS:"
-regex_number_categories = r"# NUMBER CATEGORIES:"
-
-
-def validate():
-    pass
+The votes of .soc, .soi, .toc and .toi files are read in blocks of characters, and each
+block is converted to integers at once by NumPy. Truncated votes (.soi, .toi) are
+padded with -1. The votes are aggregated block by block, so only the distinct
+votes (with their quantities) are kept in memory.
 
+The votes are strict orders: the candidates tied in a vote (.toc, .toi) are ranked
+in the order in which they are listed (with a warning). The tie groups are
+returned next to the votes with with_ties=True.
+"""
 
-def process_soc_line(line: str, votes: list):
-    tokens = line.split(':')
-    nr_this_vote = int(tokens[0])
-    vote = [int(x) for x in tokens[1].split(',')]
-    vote = np.array([x-1 for x in vote])
-    for i in range(0, nr_this_vote):
-        votes.append(vote)
-    pass
+import logging
 
+import numpy as np
 
-def process_soi_line(line: str, votes: list):
-    pass
+PREFLIB_ORDINAL_DATA_TYPES = {'soc', 'soi', 'toc', 'toi'}
+DEFAULT_BLOCK_SIZE = 2 ** 22
 
 
-def process_toc_line(line: str, votes: list):
-    pass
+def read_preflib_header(file) -> (dict, str):
+    """
+    Reads the metadata lines (# KEY: value) of a PrefLib file.
 
+    Returns
+    -------
+        dict
+            Metadata (with lowercase keys, e.g., 'data type', 'number alternatives').
+        str
+            First line after the metadata (empty at the end of the file).
+    """
+    metadata = {}
+    for line in file:
+        if not line.startswith('#'):
+            return metadata, line
+        key, _, value = line[1:].partition(':')
+        metadata[key.strip().lower()] = value.strip()
+    return metadata, ''
+
+
+def _to_rows(values: np.ndarray, lengths: np.ndarray, num_candidates: int) -> np.ndarray:
+    """ Return: matrix of the values of the lines (without the first ones), padded with -1 """
+    first = np.cumsum(lengths) - lengths
+    if np.all(lengths == num_candidates + 1):
+        return values.reshape(len(lengths), num_candidates + 1)[:, 1:]
+    rows = np.full([len(lengths), num_candidates], -1, dtype=np.int64)
+    is_vote = np.ones(len(values), dtype=bool)
+    is_vote[first] = False
+    lines = np.repeat(np.arange(len(lengths)), lengths - 1)
+    columns = np.arange(len(values)) - np.repeat(first, lengths) - 1
+    rows[lines, columns[is_vote]] = values[is_vote]
+    return rows
+
+
+def parse_preflib_text(text: str,
+                       num_candidates: int,
+                       is_shifted: bool = False,
+                       with_ties: bool = False) -> tuple:
+    """
+    Converts a block of vote lines (quantity: vote) of a .soc/.soi/.toc/.toi file.
+
+    All the numbers of the block are found and converted at once (as the runs
+    of digits of its bytes), so the braces of the ties and the empty lines
+    are skipped.
+
+    Parameters
+    ----------
+        text : str
+            Complete lines with the votes.
+        num_candidates : int
+            Number of candidates (the width of the votes).
+        is_shifted : bool
+            If True then the candidates are numbered from 1.
+        with_ties : bool
+            If True then the tie groups of the votes are returned too.
+    Returns
+    -------
+        tuple
+            Quantities and votes (padded with -1), and (if with_ties) the tie groups:
+            ties[v, j] is the index of the group of tied candidates at position j
+            of vote v (the candidates of a group are listed in the file order).
+    """
+    data = np.frombuffer(text.encode(), dtype=np.uint8)
+    is_digit = (data >= ord('0')) & (data <= ord('9'))
+    is_start = is_digit.copy()
+    is_start[1:] &= ~is_digit[:-1]
+    is_end = is_digit.copy()
+    is_end[:-1] &= ~is_digit[1:]
+    starts, ends = np.flatnonzero(is_start), np.flatnonzero(is_end)
+
+    # every digit is weighted by the power of ten of its position in the number
+    digits = np.flatnonzero(is_digit)
+    numbers = np.cumsum(is_start)[digits] - 1
+    powers = np.power(10., ends[numbers] - digits)
+    tokens = np.bincount(numbers, weights=(data[digits] - ord('0')) * powers,
+                         minlength=len(starts)).astype(np.int64)
+
+    # the first number of a line is the quantity of the vote
+    lines = np.cumsum(data == ord('\n'))[starts]
+    lengths = np.bincount(lines)
+    lengths = lengths[lengths > 0]
+    if np.any(lengths > num_candidates + 1):
+        raise ValueError('Votes longer than the number of candidates.')
+
+    quantities = tokens[np.cumsum(lengths) - lengths]
+    votes = _to_rows(tokens, lengths, num_candidates)
+    if is_shifted:
+        votes = np.where(votes > 0, votes - 1, votes)
+    if not with_ties:
+        return quantities, votes
+
+    # a number starts a new group, unless it is inside braces and no brace
+    # was opened since the previous number
+    is_open = data == ord('{')
+    depth = np.cumsum(is_open.astype(np.int64) - (data == ord('}')))
+    last_open = np.maximum.accumulate(np.where(is_open, np.arange(len(data)), -1))
+    is_new_group = depth[starts] <= 0
+    is_new_group[1:] |= last_open[starts[1:]] > ends[:-1]
+    groups = np.cumsum(is_new_group)
+    # the quantity is a group of its own
+    groups = groups - np.repeat(groups[np.cumsum(lengths) - lengths], lengths) - 1
+    return quantities, votes, _to_rows(groups, lengths, num_candidates)
+
+
+def _unique_rows(votes: np.ndarray) -> (np.ndarray, np.ndarray):
+    """ Return: distinct rows (in the lexicographic order) and the row of every vote """
+    base = int(votes.max(initial=-1)) + 2
+    if votes.shape[1] * np.log2(base) < 62:
+        # every vote is encoded as a single number (preserving the order)
+        keys = np.zeros(len(votes), dtype=np.int64)
+        for column in votes.T:
+            keys = keys * base + (column + 1)
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        return votes[first], inverse
+    order = np.lexsort(votes.T[::-1])
+    sorted_votes = votes[order]
+    is_new = np.ones(len(votes), dtype=bool)
+    is_new[1:] = np.any(sorted_votes[1:] != sorted_votes[:-1], axis=1)
+    inverse = np.empty(len(votes), dtype=np.int64)
+    inverse[order] = np.cumsum(is_new) - 1
+    return sorted_votes[is_new], inverse
+
+
+def aggregate_distinct_votes(quantities: np.ndarray,
+                             votes: np.ndarray) -> (np.ndarray, np.ndarray):
+    """ Return: quantities and distinct votes (the most frequent ones first) """
+    if len(votes) == 0:
+        return quantities, votes
+    distinct_votes, inverse = _unique_rows(votes)
+    quantities = np.bincount(inverse, weights=quantities,
+                             minlength=len(distinct_votes)).astype(np.int64)
+    # the same order as sorting [quantity, vote] pairs in the decreasing order
+    # (the distinct votes are sorted, so a stable sort by the quantities suffices)
+    quantities, distinct_votes = quantities[::-1], distinct_votes[::-1]
+    order = np.argsort(-quantities, kind='stable')
+    return quantities[order], distinct_votes[order]
+
+
+def read_preflib_votes(file,
+                       num_candidates: int,
+                       first_line: str = '',
+                       is_shifted: bool = False,
+                       block_size: int = DEFAULT_BLOCK_SIZE,
+                       with_ties: bool = False) -> tuple:
+    """
+    Reads the (remaining) vote lines of a PrefLib file in blocks of (about)
+    block_size characters, so only the distinct votes of the file are kept.
+
+    Returns
+    -------
+        tuple
+            Quantities and distinct votes (the most frequent ones first), and
+            (if with_ties) their tie groups (see parse_preflib_text).
+    """
+    # with the ties, the distinct votes are the distinct pairs (vote, tie groups)
+    width = 2 * num_candidates if with_ties else num_candidates
+    all_quantities = [np.zeros(0, dtype=np.int64)]
+    all_votes = [np.zeros([0, width], dtype=np.int64)]
+    has_ties = False
+    rest = first_line
+    while True:
+        block = file.read(block_size)
+        text = rest + block
+        rest = ''
+        if block:
+            # the last (incomplete) line is parsed with the next block
+            end = text.rfind('\n') + 1
+            text, rest = text[:end], text[end:]
+        if text:
+            has_ties = has_ties or '{' in text
+            quantities, *votes = parse_preflib_text(text, num_candidates,
+                                                    is_shifted=is_shifted,
+                                                    with_ties=with_ties)
+            quantities, votes = aggregate_distinct_votes(quantities, np.hstack(votes))
+            all_quantities.append(quantities)
+            all_votes.append(votes)
+        if not block:
+            break
 
-def process_toi_line(line: str, votes: list):
-    pass
+    if has_ties and not with_ties:
+        logging.warning('The ties are broken in the order in which the candidates are listed.')
+    quantities, votes = aggregate_distinct_votes(np.concatenate(all_quantities),
+                                                 np.concatenate(all_votes))
+    if with_ties:
+        return quantities, votes[:, :num_candidates], votes[:, num_candidates:]
+    return quantities, votes
+
+
+def import_preflib_file(path: str,
+                        is_shifted: bool = False,
+                        block_size: int = DEFAULT_BLOCK_SIZE,
+                        with_ties: bool = False) -> tuple:
+    """
+    Imports an ordinal (.soc, .soi, .toc or .toi) PrefLib file.
+
+    Returns
+    -------
+        tuple
+            Metadata, quantities and distinct votes (the most frequent ones first),
+            and (if with_ties) their tie groups (see parse_preflib_text).
+    """
+    with open(path, 'r') as file_:
+        metadata, first_line = read_preflib_header(file_)
+        data_type = metadata.get('data type')
+        if data_type not in PREFLIB_ORDINAL_DATA_TYPES:
+            raise ValueError(f'Unknown data format: {data_type}')
+        num_candidates = int(metadata['number alternatives'])
+        return (metadata, *read_preflib_votes(file_, num_candidates,
+                                              first_line=first_line,
+                                              is_shifted=is_shifted,
+                                              block_size=block_size,
+                                              with_ties=with_ties))
 
 
 def preflib_parser(file_name: str, label: str = None, file_ending: int = 4):
-    votes = []
-    nr_candidates = 0
-    nr_votes = 0
-    nr_unique = 0
-    alternative_names = list()
-    from_file_file_name = ''
-    from_file_title = ''
-    from_file_data_type = ''
-    if label == "" or label is None:
-        label = file_name[:-file_ending]
-    file = open(file_name, "r")
-    # read metadata
-    for line in file:
-        if line[-1] == '\n':
-            line = line[:-1]
-        if line[0] != '#':
-            if from_file_data_type == 'soc':
-                process_soc_line(line, votes)
-            elif from_file_data_type == 'soi':
-                process_soi_line(line, votes)
-            elif from_file_data_type == 'toc':
-                process_toc_line(line, votes)
-            elif from_file_data_type == 'toi':
-                process_toi_line(line, votes)
-            break
-        elif re.search(regex_file_name, line):
-            from_file_file_name = line.split(':')[1][1:-file_ending]
-        elif re.search(regex_title, line):
-            from_file_title = line.split(':')[1].replace(" ", "")
-        elif re.search(regex_data_type, line):
-            from_file_data_type = line.split(':')[1][1:]
-        elif re.search(regex_number_alternatives, line):
-            nr_candidates = int(line.split(':')[1])
-        elif re.search(regex_number_voters, line):
-            nr_votes = int(line.split(':')[1])
-        elif re.search(regex_number_unique_orders, line):
-            nr_unique = int(line.split(':')[1])
-
-    label = from_file_title + "_" + from_file_file_name
-    # read votes
-    if from_file_data_type == 'soc':
-        for line in file:
-            process_soc_line(line, votes)
-    elif from_file_data_type == 'soi':
-        for line in file:
-            process_soi_line(line, votes)
-    elif from_file_data_type == 'toc':
-        for line in file:
-            process_toc_line(line, votes)
-    elif from_file_data_type == 'toi':
-        for line in file:
-            process_toi_line(line, votes)
-    else:
-        print(label, " - unknown data format.")
-
-    return np.array(votes), nr_candidates, nr_votes, label
+    metadata, quantities, distinct_votes = import_preflib_file(file_name, is_shifted=True)
+    nr_candidates = int(metadata['number alternatives'])
+    nr_votes = int(metadata.get('number voters', quantities.sum()))
+    label = metadata.get('title', '').replace(" ", "") + "_" + \
+            metadata.get('file name', '')[:-file_ending]
+    votes = np.repeat(distinct_votes, quantities, axis=0)
+    return votes, nr_candidates, nr_votes, label
@@ -27,8 +27,9 @@ def randomize(vector, num_winners):
 def compute_sntv_winners(election=None, num_winners=1):
     """ Compute SNTV winners for a given election """
     scores = [0 for _ in range(election.num_candidates)]
-    for vote in election.votes:
-        scores[vote[0]] += 1
+    distinct_votes, quantites = election.get_distinct_votes()
+    for vote, quantity in zip(distinct_votes, quantites):
+        scores[vote[0]] += quantity
     candidates = [i for i in range(election.num_candidates)]
     results = sorted(zip(scores, candidates), reverse=True)
     ranking = randomize(results, num_winners)
@@ -39,9 +40,10 @@ def compute_borda_winners(election=None, num_winners=1):
     """ Compute Borda winners for a given election """
 
     scores = [0 for _ in range(election.num_candidates)]
-    for vote in election.votes:
+    distinct_votes, quantites = election.get_distinct_votes()
+    for vote, quantity in zip(distinct_votes, quantites):
         for i in range(election.num_candidates):
-            scores[vote[i]] += election.num_candidates - i - 1
+            scores[vote[i]] += (election.num_candidates - i - 1) * quantity
     candidates = [i for i in range(election.num_candidates)]
     results = sorted(zip(scores, candidates), reverse=True)
     ranking = randomize(results, num_winners)
@@ -122,7 +124,7 @@ def compute_stv_winners(election=None, num_winners=1):
 
 ###
 
-def get_borda_points(votes, num_voters, num_candidates):
+def get_borda_points(votes, num_voters, num_candidates, quantities=None):
     points = np.zeros([num_candidates])
     scoring = [1. for _ in range(num_candidates)]
 
@@ -130,8 +132,9 @@ def get_borda_points(votes, num_voters, num_candidates):
         scoring[i] = len(scoring) - i - 1
 
     for i in range(num_voters):
+        quantity = 1 if quantities is None else quantities[i]
         for j in range(num_candidates):
-            points[int(votes[i][j])] += scoring[j]
+            points[int(votes[i][j])] += scoring[j] * quantity
 
     return points
 
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Single-file archive of the elections of an experiment.
+
+Instead of one .soc/.app file per election, the distinct votes and their
+quantities of all the elections are packed into a single zip file of numpy
+arrays. The elections are stored in chunks; every chunk consists of:
+
+    votes_<k>.npy       the distinct votes of its elections (concatenated),
+    lengths_<k>.npy     the length of every distinct vote,
+    quantities_<k>.npy  the quantity of every distinct vote,
+    index_<k>.json      the metadata of its elections (culture, params, sizes)
+                        and the position of their votes in the arrays.
+
+New elections are appended as new chunks. They are written to a copy of the
+archive, which then replaces it at once, so an interrupted append leaves the
+archive as it was. An election appended again replaces the previous one.
+An election is read by loading only the arrays of its chunk.
+"""
+
+import ast
+import itertools
+import json
+import os
+import shutil
+import zipfile
+
+import numpy as np
+
+from mapel.elections.objects.Election import get_compact_dtype
+
+ARCHIVE_FILE_NAME = 'elections.npz'
+DEFAULT_CHUNK_SIZE = 256
+
+
+def get_archive_path(experiment_id: str) -> str:
+    return os.path.join(os.getcwd(), "experiments", experiment_id, ARCHIVE_FILE_NAME)
+
+
+def _write_array(archive: zipfile.ZipFile, name: str, array: np.ndarray) -> None:
+    with archive.open(name, 'w', force_zip64=True) as file_:
+        np.lib.format.write_array(file_, np.ascontiguousarray(array), allow_pickle=False)
+
+
+def _read_array(archive: zipfile.ZipFile, name: str) -> np.ndarray:
+    with archive.open(name) as file_:
+        return np.lib.format.read_array(file_, allow_pickle=False)
+
+
+def _flatten_votes(distinct_votes) -> (np.ndarray, list):
+    """ Return: concatenated votes and the length of every vote """
+    if isinstance(distinct_votes, np.ndarray) and distinct_votes.ndim == 2:
+        return distinct_votes.ravel(), [distinct_votes.shape[1]] * len(distinct_votes)
+    lengths = [len(vote) for vote in distinct_votes]
+    votes = np.fromiter(itertools.chain.from_iterable(distinct_votes), dtype=np.int64,
+                        count=sum(lengths))
+    return votes, lengths
+
+
+class ElectionArchive:
+    """ Single-file (chunked) archive of the votes of the elections of an experiment """
+
+    def __init__(self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.index = {}
+        self.num_chunks = 0
+        self._chunk = None
+        if os.path.isfile(path):
+            self._read_index()
+
+    def _read_index(self) -> None:
+        with zipfile.ZipFile(self.path) as archive:
+            chunks = sorted(int(name[len('index_'):-len('.json')])
+                            for name in archive.namelist() if name.startswith('index_'))
+            for chunk in chunks:
+                index = json.loads(archive.read(f'index_{chunk}.json'))
+                for election_id, metadata in index.items():
+                    self.index[election_id] = (chunk, metadata)
+        self.num_chunks = chunks[-1] + 1 if chunks else 0
+
+    def __contains__(self, election_id) -> bool:
+        return election_id in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def append(self, elections) -> None:
+        """ Appends the elections (in chunks of at most chunk_size elections) """
+        # zipfile rewrites the central directory of the file in place,
+        # so the new chunks are written to a copy of the archive
+        temporary_path = f'{self.path}.tmp'
+        if os.path.isfile(self.path):
+            shutil.copyfile(self.path, temporary_path)
+        elif os.path.isfile(temporary_path):
+            os.remove(temporary_path)
+
+        indices = []
+        with zipfile.ZipFile(temporary_path, 'a') as archive:
+            chunk = []
+            for election in elections:
+                chunk.append(election)
+                if len(chunk) == self.chunk_size:
+                    indices.append(self._write_chunk(archive, chunk,
+                                                     self.num_chunks + len(indices)))
+                    chunk = []
+            if chunk:
+                indices.append(self._write_chunk(archive, chunk,
+                                                 self.num_chunks + len(indices)))
+        os.replace(temporary_path, self.path)
+
+        for index in indices:
+            for election_id, metadata in index.items():
+                self.index[election_id] = (self.num_chunks, metadata)
+            self.num_chunks += 1
+
+    def _write_chunk(self, archive: zipfile.ZipFile, elections: list, chunk: int) -> dict:
+        """ Return: index of the written chunk """
+        index = {}
+        votes, lengths, quantities = [], [], []
+        for election in elections:
+            distinct_votes, quantites = None, None
+            if not election.fake:
+                distinct_votes, quantites = election.get_distinct_votes()
+            if distinct_votes is None:
+                distinct_votes, quantites = [], []
+            election_votes, election_lengths = _flatten_votes(distinct_votes)
+            index[str(election.election_id)] = {
+                'culture_id': election.culture_id,
+                'params': str(election.params),
+                'num_candidates': int(election.num_candidates),
+                'num_voters': int(election.num_voters),
+                'alliances': str(getattr(election, 'alliances', None)),
+                'offset': len(lengths),
+                'num_options': len(election_lengths)}
+            votes.append(election_votes)
+            lengths.extend(election_lengths)
+            quantities.extend(quantites)
+
+        votes = np.concatenate(votes) if votes else np.zeros(0)
+        votes = votes.astype(get_compact_dtype(int(votes.max(initial=0)) + 1))
+        _write_array(archive, f'votes_{chunk}.npy', votes)
+        _write_array(archive, f'lengths_{chunk}.npy', np.array(lengths, dtype=np.int64))
+        _write_array(archive, f'quantities_{chunk}.npy', np.array(quantities, dtype=np.int64))
+        archive.writestr(f'index_{chunk}.json', json.dumps(index))
+        return index
+
+    def _read_chunk(self, chunk: int) -> tuple:
+        """ Return: votes, starting positions of the votes and quantities of the chunk """
+        if self._chunk is None or self._chunk[0] != chunk:
+            with zipfile.ZipFile(self.path) as archive:
+                votes = _read_array(archive, f'votes_{chunk}.npy')
+                lengths = _read_array(archive, f'lengths_{chunk}.npy')
+                quantities = _read_array(archive, f'quantities_{chunk}.npy')
+            starts = np.concatenate([[0], np.cumsum(lengths)])
+            self._chunk = (chunk, votes, starts, quantities)
+        return self._chunk[1:]
+
+    def read(self, election_id) -> dict:
+        """
+        Reads a single election.
+
+        Returns
+        -------
+            dict
+                Metadata of the election (culture_id, params, num_candidates,
+                num_voters, alliances), its distinct votes (a matrix,
+                if all of them have the same length) and their quantities.
+        """
+        chunk, metadata = self.index[election_id]
+        votes, starts, quantities = self._read_chunk(chunk)
+        first, last = metadata['offset'], metadata['offset'] + metadata['num_options']
+        lengths = np.diff(starts[first:last + 1])
+
+        election_votes = votes[starts[first]:starts[last]].astype(np.int64)
+        if len(lengths) > 0 and np.all(lengths == lengths[0]):
+            distinct_votes = election_votes.reshape(len(lengths), lengths[0])
+        else:
+            distinct_votes = np.split(election_votes, np.cumsum(lengths)[:-1]) \
+                if len(lengths) > 0 else []
+
+        data = dict(metadata)
+        data['params'] = ast.literal_eval(metadata['params'])
+        data['alliances'] = ast.literal_eval(metadata['alliances'])
+        data['distinct_votes'] = distinct_votes
+        data['quantities'] = quantities[first:last].tolist()
+        return data
@@ -7,6 +7,7 @@ from collections import Counter
 import numpy as np
 
 from mapel.core.glossary import *
+from mapel.elections.other.parser import import_preflib_file
 
 regex_file_name = r'# FILE NAME:'
 regex_title = r'# TITLE:'
@@ -80,14 +81,14 @@ def import_coordinates(experiment,
     return coordinates
 
 
-def process_soc_line(line: str, votes: list):
-    tokens = line.split(':')
-    nr_this_vote = int(tokens[0])
-    vote = [int(x) for x in tokens[1].split(',')]
-    vote = np.array(vote)
-    for i in range(0, nr_this_vote):
-        votes.append(vote)
-    pass
+def aggregate_weighted_votes(votes: list, quantities: list) -> (list, list):
+    """ Return: quantities and distinct votes (the most frequent ones first) """
+    c = Counter()
+    for vote, quantity in zip(votes, quantities):
+        c[tuple(vote)] += quantity
+    counted_votes = [[count, list(row)] for row, count in c.items()]
+    counted_votes = sorted(counted_votes, reverse=True)
+    return [a[0] for a in counted_votes], [a[1] for a in counted_votes]
 
 
 def process_app_line(line: str, votes: list):
@@ -99,111 +100,39 @@ def process_app_line(line: str, votes: list):
     pass
 
 
-def process_soi_line(line: str, votes: list):
-    pass
-
-
-def process_toc_line(line: str, votes: list):
-    pass
-
-
-def process_toi_line(line: str, votes: list):
-    pass
-
-
 def import_real_new_soc_election(experiment_id: str = None,
                                  election_id: str = None,
                                  is_shifted=False,
                                  file_ending=4):
-    """ Import real ordinal election form .soc file """
+    """ Import real ordinal election form .soc (or .soi, .toc, .toi) file """
 
-    file_name = f'{election_id}.soc'
-    path = os.path.join(os.getcwd(), "experiments", experiment_id, "elections", file_name)
-    file = open(path, 'r')
-    params = None
-    culture_id = None
-    votes = []
-    num_candidates = 0
-    nr_votes = 0
-    nr_unique = 0
-    alternative_names = list()
-    from_file_file_name = ''
-    from_file_title = ''
-    from_file_data_type = ''
-    # read metadata
-    for line in file:
-        if line[-1] == '\n':
-            line = line[:-1]
-        if line[0] != '#':
-            if from_file_data_type == 'soc':
-                process_soc_line(line, votes)
-            elif from_file_data_type == 'soi':
-                process_soi_line(line, votes)
-            elif from_file_data_type == 'toc':
-                process_toc_line(line, votes)
-            elif from_file_data_type == 'toi':
-                process_toi_line(line, votes)
-            else:
-                print("Unknown data format.")
+    path = os.path.join(os.getcwd(), "experiments", experiment_id, "elections", election_id)
+    # truncated and tied votes may be stored in the other PrefLib formats
+    for data_type in ['soc', 'soi', 'toc', 'toi']:
+        if os.path.isfile(f'{path}.{data_type}'):
+            path = f'{path}.{data_type}'
             break
-        elif re.search(regex_file_name, line):
-            from_file_file_name = line.split(':')[1][1:-file_ending]
-        elif re.search(regex_title, line):
-            from_file_title = line.split(':')[1].replace(" ", "")
-        elif re.search(regex_data_type, line):
-            from_file_data_type = line.split(':')[1].replace(" ", "")
-        elif re.search(regex_number_alternatives, line):
-            num_candidates = int(line.split(':')[1])
-        elif re.search(regex_number_voters, line):
-            num_voters = int(line.split(':')[1])
-        elif re.search(regex_number_unique_orders, line):
-            nr_unique = int(line.split(':')[1])
-        elif re.search(regex_culture_id, line):
-            culture_id = str(line.split(':')[1])
-        elif re.search(regex_params, line):
-            line = line.strip().split()
-            if len(line) <= 2:
-                params = {}
-            else:
-                params = ast.literal_eval(" ".join(line[2:]))
+    metadata, quantites, distinct_votes = import_preflib_file(path, is_shifted=is_shifted)
 
-    if from_file_data_type == 'soc':
-        for line in file:
-            process_soc_line(line, votes)
-    elif from_file_data_type == 'soi':
-        for line in file:
-            process_soi_line(line, votes)
-    elif from_file_data_type == 'toc':
-        for line in file:
-            process_toc_line(line, votes)
-    elif from_file_data_type == 'toi':
-        for line in file:
-            process_toi_line(line, votes)
-    else:
-        print("Unknown data format.")
-
-    file.close()
+    num_candidates = int(metadata['number alternatives'])
+    culture_id = metadata.get('culture id')
+    params = None
+    if 'params' in metadata:
+        params = ast.literal_eval(metadata['params']) if metadata['params'] else {}
 
     alliances = None
 
-    c = Counter(map(tuple, votes))
-    counted_votes = [[count, list(row)] for row, count in c.items()]
-    counted_votes = sorted(counted_votes, reverse=True)
-    quantites = [a[0] for a in counted_votes]
-    distinct_votes = [a[1] for a in counted_votes]
-    num_options = len(counted_votes)
+    # the votes are kept only in the weighted form (distinct votes with their quantities)
+    num_options = len(distinct_votes)
 
-    if is_shifted:
-        votes = [[vote - 1 for vote in voter] for voter in votes]
-
-    return np.array(votes), \
-           len(votes), \
+    return None, \
+           int(quantites.sum()), \
            num_candidates, \
            params, \
            culture_id, \
            alliances, \
            num_options, \
-           quantites, \
+           quantites.tolist(), \
            distinct_votes
 
 
@@ -245,31 +174,22 @@ def import_real_old_soc_election(experiment_id: str = None,
     line = my_file.readline().rstrip("\n").split(',')
     num_voters = int(line[0])
     num_options = int(line[2])
-    votes = [[0 for _ in range(num_candidates)] for _ in range(num_voters)]
-
-    it = 0
-    quantites = []
+    votes = []
+    quantities = []
     for j in range(num_options):
         line = list(map(int, my_file.readline().rstrip("\n").split(',')))
-        quantity = line[0]
-        quantites.append(quantity)
-
-        for k in range(quantity):
-            votes[it] = line[1:num_candidates + 1]
-            it += 1
-
-    c = Counter(map(tuple, votes))
-    counted_votes = [[count, list(row)] for row, count in c.items()]
-    counted_votes = sorted(counted_votes, reverse=True)
-    quantites = [a[0] for a in counted_votes]
-    distinct_votes = [a[1] for a in counted_votes]
-    num_options = len(counted_votes)
+        quantities.append(line[0])
+        votes.append(line[1:num_candidates + 1])
 
     if is_shifted:
         votes = [[vote - 1 for vote in voter] for voter in votes]
     my_file.close()
 
-    return np.array(votes), \
+    # the votes are kept only in the weighted form (distinct votes with their quantities)
+    quantites, distinct_votes = aggregate_weighted_votes(votes, quantities)
+    num_options = len(distinct_votes)
+
+    return None, \
            num_voters, \
            num_candidates, \
            params, \
@@ -323,6 +243,7 @@ def import_real_new_app_election(experiment_id: str = None,
     params = None
     culture_id = None
     votes = []
+    quantities = []
     num_candidates = 0
     nr_votes = 0
     nr_unique = 0
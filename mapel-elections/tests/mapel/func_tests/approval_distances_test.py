@@ -28,3 +28,24 @@ class TestOrdinalDistances:
         distance, mapping = mapel.compute_distance(ele_1, ele_2, distance_id=distance_id)
 
         assert type(float(distance)) is float
+
+
+class TestDistancesBetweenVotes:
+
+    @pytest.mark.parametrize("distance_id", ['hamming', 'jaccard'])
+    def test_distances_between_votes(self, distance_id):
+
+        election = mapel.generate_approval_election(culture_id='ic', p=0.5,
+                                                    num_voters=np.random.randint(10, 20),
+                                                    num_candidates=np.random.randint(5, 10))
+        election.is_exported = False
+        distances = election.compute_distances(object_type='vote', distance_id=distance_id)
+
+        for v1, vote_1 in enumerate(election.votes):
+            for v2, vote_2 in enumerate(election.votes):
+                union = len(vote_1 | vote_2)
+                if distance_id == 'hamming':
+                    expected = len(vote_1 ^ vote_2)
+                else:
+                    expected = 1 - len(vote_1 & vote_2) / union if union else 1
+                assert distances[v1][v2] == expected
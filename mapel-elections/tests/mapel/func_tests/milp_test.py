@@ -0,0 +1,135 @@
+import pytest
+import numpy as np
+
+import mapel.elections as mapel
+from mapel.elections.distances import milp
+from mapel.elections.distances import ilp_isomorphic
+
+
+class TestModel:
+
+    def test_assignment(self):
+
+        cost_table = np.array([[4, 1, 3], [2, 0, 5], [3, 2, 2]])
+        model = milp.Model(sense='min')
+        x = model.add_variables((3, 3), obj=cost_table, vtype=milp.BINARY)
+        model.add_constraints(x, lb=1, ub=1)
+        model.add_constraints(x.T, lb=1, ub=1)
+        solution = model.solve(backend='highs')
+
+        assert solution.is_optimal
+        assert np.isclose(solution.objective, 5)
+        assert np.allclose(solution[x], [[0, 1, 0], [1, 0, 0], [0, 0, 1]])
+
+    def test_integer_variables(self):
+
+        model = milp.Model(sense='max')
+        x = model.add_variables(2, obj=[5, 4], vtype=milp.INTEGER)
+        model.add_constraint(x, [6, 4], ub=24)
+        model.add_constraint(x, [1, 2], ub=6)
+        solution = model.solve(backend='highs')
+
+        assert solution.is_optimal
+        assert np.isclose(solution.objective, 20)
+        assert np.allclose(solution[x], [4, 0])
+
+    def test_infeasible(self):
+
+        model = milp.Model()
+        x = model.add_variables(1, lb=2)
+        model.add_constraint(x, ub=1)
+
+        assert model.solve(backend='highs').status == milp.INFEASIBLE
+
+
+class TestBackends:
+
+    def test_set_default_backend(self):
+
+        with pytest.raises(ValueError):
+            milp.set_default_backend('unknown')
+        if milp.gp is None:
+            with pytest.raises(ImportError):
+                milp.set_default_backend('gurobi')
+        assert milp.default_backend == 'highs'
+
+    def test_add_backend(self):
+
+        calls = []
+
+        def solve_counting(model, **options):
+            calls.append(model.num_variables)
+            return milp.solve_highs(model, **options)
+
+        milp.add_backend('counting', solve_counting)
+        election_1 = mapel.generate_approval_election(culture_id='ic', p=0.5,
+                                                      num_voters=2, num_candidates=3)
+        election_2 = mapel.generate_approval_election(culture_id='ic', p=0.5,
+                                                      num_voters=2, num_candidates=3)
+        election_1.votes = [{0}, {1, 2}]
+        election_2.votes = [{1, 2}, {0, 1}]
+        try:
+            milp.set_default_backend('counting')
+            distance, _ = mapel.compute_distance(election_1, election_2, distance_id='hamming')
+        finally:
+            milp.set_default_backend('highs')
+            del milp.registered_backends['counting']
+
+        assert distance == 1
+        assert calls == [4]
+
+
+class TestIlpDistances:
+
+    def test_candidate_subelection(self):
+
+        election_1 = mapel.generate_ordinal_election(culture_id='ic',
+                                                     num_voters=2, num_candidates=3)
+        election_2 = mapel.generate_ordinal_election(culture_id='ic',
+                                                     num_voters=2, num_candidates=3)
+        election_1.votes = np.array([[0, 1, 2], [0, 1, 2]])
+        election_2.votes = np.array([[0, 1, 2], [2, 1, 0]])
+        election_1.potes = None
+        election_2.potes = None
+
+        assert mapel.compute_distance(election_1, election_1,
+                                      distance_id='candidate_subelection') == 3
+        assert mapel.compute_distance(election_1, election_2,
+                                      distance_id='candidate_subelection') == 1
+
+    def test_hamming(self):
+
+        election_1 = mapel.generate_approval_election(culture_id='ic', p=0.5,
+                                                      num_voters=3, num_candidates=4)
+        election_2 = mapel.generate_approval_election(culture_id='ic', p=0.5,
+                                                      num_voters=3, num_candidates=4)
+        election_1.votes = [{0}, {1, 2}, set()]
+        election_2.votes = [{1, 2, 3}, {0, 1}, {3}]
+
+        distance, _ = mapel.compute_distance(election_1, election_2, distance_id='hamming')
+
+        assert distance == 3
+
+    @pytest.mark.parametrize("distance_id, expected", [('swap', 1), ('spearman', 2)])
+    def test_isomorphic_ilp(self, distance_id, expected):
+
+        votes_1 = np.array([[0, 1, 2], [1, 2, 0], [2, 1, 0]])
+        votes_2 = np.array([[0, 1, 2], [0, 1, 2], [2, 0, 1]])
+        params = {'voters': 3, 'candidates': 3}
+        if distance_id == 'swap':
+            distance = ilp_isomorphic.solve_ilp_swap_distance(votes_1, votes_2, params,
+                                                               backend='highs')
+        else:
+            distance = ilp_isomorphic.solve_ilp_spearman_distance(votes_1, votes_2, params,
+                                                                   backend='highs')
+        assert np.isclose(distance, expected)
+
+        # with HiGHS as the default backend, the exact Branch-and-Bound is used
+        election_1 = mapel.generate_ordinal_election(culture_id='ic',
+                                                     num_voters=3, num_candidates=3)
+        election_2 = mapel.generate_ordinal_election(culture_id='ic',
+                                                     num_voters=3, num_candidates=3)
+        election_1.votes, election_2.votes = votes_1, votes_2
+        distance, _ = mapel.compute_distance(election_1, election_2,
+                                             distance_id=f'ilp_{distance_id}')
+        assert distance == expected
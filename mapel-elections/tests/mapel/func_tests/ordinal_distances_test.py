@@ -1,7 +1,16 @@
+import copy
+import os
+
 import pytest
 import numpy as np
 
 import mapel.elections as mapel
+import mapel.elections.distances_ as metr
+from mapel.elections.distances import canonical_form
+from mapel.core.objects.LazyInstances import LazyInstances
+import mapel.core.persistence.experiment_imports as imports
+from mapel.core.persistence.distances_journal import DistancesJournal, get_journal_path, \
+    read_journal
 
 registered_ordinal_distances_to_test = {
     'emd-positionwise',
@@ -9,12 +18,23 @@ registered_ordinal_distances_to_test = {
     'emd-bordawise',
     'l1-bordawise',
     'l1-pairwise',
+    'l1-approx_pairwise',
     'discrete',
     'swap',
     'spearman',
+    'positionwise_infty',
 }
 
 
+def prepare_experiment(size, num_candidates=5, num_voters=10, **kwargs):
+    """ Return: online experiment with a family of impartial culture elections """
+    experiment = mapel.prepare_online_ordinal_experiment()
+    experiment.set_default_num_candidates(num_candidates)
+    experiment.set_default_num_voters(num_voters)
+    experiment.add_family(culture_id='ic', size=size, **kwargs)
+    return experiment
+
+
 class TestOrdinalDistances:
 
     @pytest.mark.parametrize("distance_id", registered_ordinal_distances_to_test)
@@ -33,3 +53,494 @@ class TestOrdinalDistances:
 
         distance, mapping = mapel.compute_distance(ele_1, ele_2, distance_id=distance_id)
         assert type(float(distance)) is float
+
+
+class TestMatrixMatchingDistances:
+
+    @pytest.mark.parametrize("distance_id", ['l1-pairwise', 'l1-voterlikeness'])
+    def test_approx_matrix_matching_distances(self, distance_id):
+
+        ele_1 = mapel.generate_ordinal_election(culture_id='ic',
+                                                num_voters=6,
+                                                num_candidates=5)
+
+        ele_2 = mapel.generate_ordinal_election(culture_id='ic',
+                                                num_voters=6,
+                                                num_candidates=5)
+
+        inner_distance, main_distance = distance_id.split('-')
+        distance, _ = mapel.compute_distance(ele_1, ele_2, distance_id=distance_id)
+        approx_distance, matching = mapel.compute_distance(
+            ele_1, ele_2, distance_id=f'{inner_distance}-approx_{main_distance}')
+        assert distance <= approx_distance + 1e-9
+        assert sorted(matching) == list(range(len(matching)))
+
+
+class TestBatchedDistances:
+
+    @pytest.mark.parametrize("distance_id", ['emd-positionwise', 'l1-positionwise'])
+    def test_batched_positionwise_distances(self, distance_id):
+
+        experiment = prepare_experiment(6, num_candidates=np.random.randint(5, 10),
+                                        num_voters=np.random.randint(10, 20))
+        experiment.compute_distances(distance_id=distance_id)
+
+        for election_id_1 in experiment.instances:
+            for election_id_2 in experiment.instances:
+                if election_id_1 < election_id_2:
+                    distance, _ = mapel.compute_distance(experiment.instances[election_id_1],
+                                                         experiment.instances[election_id_2],
+                                                         distance_id=distance_id)
+                    assert distance == experiment.distances[election_id_1][election_id_2]
+
+    @pytest.mark.parametrize("distance_id", ['swap', 'spearman'])
+    def test_batched_native_distances(self, distance_id):
+
+        experiment = prepare_experiment(6, num_voters=np.random.randint(10, 20))
+        experiment.compute_distances(distance_id=distance_id, num_processes=2)
+
+        for election_id_1 in experiment.instances:
+            for election_id_2 in experiment.instances:
+                if election_id_1 < election_id_2:
+                    distance, _ = mapel.compute_distance(experiment.instances[election_id_1],
+                                                         experiment.instances[election_id_2],
+                                                         distance_id=distance_id)
+                    assert distance == experiment.distances[election_id_1][election_id_2]
+
+    def test_compact_native_votes(self):
+
+        cppd = pytest.importorskip('mapel.elections.distances.cppdistances')
+        experiment = prepare_experiment(2)
+        votes_1, votes_2 = (election.votes for election in experiment.instances.values())
+        assert votes_1.dtype == np.int8
+        pairs = np.array([[0, 1], [1, 0]])
+
+        for dtype in [np.int8, np.int16, np.intc, np.int64]:
+            elc1, elc2 = votes_1.astype(dtype), votes_2.astype(dtype)
+            assert cppd.swapd(elc1, elc2) == cppd.swapd(votes_1, votes_2)
+            assert cppd.speard(elc1, elc2) == cppd.speard(votes_1, votes_2)
+            assert np.array_equal(cppd.swapd_pairs(np.stack([elc1, elc2]), pairs),
+                                  [cppd.swapd(votes_1, votes_2)] * 2)
+            assert np.array_equal(cppd.speard_pairs(np.stack([elc1, elc2]), pairs),
+                                  [cppd.speard(votes_1, votes_2)] * 2)
+
+    @pytest.mark.parametrize("distance_id", ['l1-bordawise', 'emd-bordawise'])
+    def test_vector_distances(self, distance_id):
+
+        experiment = prepare_experiment(6, num_candidates=np.random.randint(5, 10),
+                                        num_voters=np.random.randint(10, 20))
+        experiment.compute_distances(distance_id=distance_id)
+
+        for election_id_1 in experiment.instances:
+            assert election_id_1 not in experiment.distances[election_id_1]
+            for election_id_2 in experiment.instances:
+                if election_id_1 < election_id_2:
+                    distance, _ = mapel.compute_distance(experiment.instances[election_id_1],
+                                                         experiment.instances[election_id_2],
+                                                         distance_id=distance_id)
+                    assert np.isclose(distance, experiment.distances[election_id_1][election_id_2])
+
+
+class TestIsomorphicElections:
+
+    @pytest.mark.parametrize("distance_id", ['emd-positionwise', 'swap'])
+    def test_isomorphic_elections(self, distance_id):
+
+        experiment = prepare_experiment(3)
+        for election_id in list(experiment.instances):
+            election = experiment.instances[election_id]
+            relabelling = np.random.permutation(election.num_candidates)
+            votes = relabelling[np.random.permutation(election.votes)]
+            experiment.add_election(culture_id='ic', election_id=f'{election_id}_copy')
+            experiment.instances[f'{election_id}_copy'].votes = votes
+            experiment.instances[f'{election_id}_copy'].potes = None
+        experiment.compute_distances(distance_id=distance_id)
+
+        for election_id_1 in experiment.instances:
+            for election_id_2 in experiment.instances:
+                if election_id_1 < election_id_2:
+                    distance, _ = mapel.compute_distance(experiment.instances[election_id_1],
+                                                         experiment.instances[election_id_2],
+                                                         distance_id=distance_id)
+                    assert np.isclose(distance, experiment.distances[election_id_1][election_id_2])
+
+    def test_truncated_elections(self):
+
+        votes = {'truncated': [[0, 1, -1], [0, 1, -1]],
+                 'complete': [[0, 1, 2], [0, 1, 2]],
+                 'partial': [[0, 1, 2], [0, 1, 2], [1, -1, -1]],
+                 'partial_copy': [[2, 0, 1], [2, 0, 1], [0, -1, -1]],
+                 'only_truncated': [[0, -1, -1], [1, -1, -1], [1, -1, -1]],
+                 'only_truncated_copy': [[2, -1, -1], [0, -1, -1], [0, -1, -1]]}
+        instances = {}
+        for election_id, election_votes in votes.items():
+            election = mapel.generate_ordinal_election(culture_id='ic',
+                                                       num_voters=len(election_votes),
+                                                       num_candidates=3)
+            election.votes = np.array(election_votes)
+            instances[election_id] = election
+
+        for _ in range(3):
+            classes = canonical_form.group_isomorphic_elections(instances, list(instances))
+            assert set(classes) == {'partial', 'partial_copy'}
+            representative_id, candidate_map = classes['partial_copy']
+            assert representative_id == 'partial'
+            assert candidate_map.tolist() == [1, 2, 0]
+
+
+class TestKnnDistances:
+
+    def test_knn_distances(self):
+
+        experiment = prepare_experiment(12)
+        experiment.compute_distances(distance_id='emd-positionwise', mode='knn', k=2)
+
+        for election_id_1 in experiment.instances:
+            assert len(experiment.distances[election_id_1]) >= 4
+            for election_id_2, distance in experiment.distances[election_id_1].items():
+                true_distance, _ = mapel.compute_distance(experiment.instances[election_id_1],
+                                                          experiment.instances[election_id_2],
+                                                          distance_id='emd-positionwise')
+                assert np.isclose(distance, true_distance)
+
+        experiment.embed_2d(embedding_id='kk')
+        assert len(experiment.coordinates) == 12
+
+
+class TestQueryNearest:
+
+    def test_query_nearest(self):
+
+        experiment = prepare_experiment(20)
+        election = mapel.generate_ordinal_election(culture_id='ic',
+                                                   num_voters=10,
+                                                   num_candidates=5)
+
+        distances = sorted(mapel.compute_distance(election, other,
+                                                  distance_id='emd-positionwise')[0]
+                           for other in experiment.instances.values())
+        nearest = experiment.query_nearest(election, k=3)
+        assert np.allclose([distance for _, distance in nearest], distances[:3])
+        within = experiment.query_nearest(election, radius=distances[5])
+        assert len(within) >= 6
+
+    def test_regenerated_elections(self, tmp_path, monkeypatch):
+
+        monkeypatch.chdir(tmp_path)
+        experiment = prepare_experiment(20)
+        experiment.experiment_id = 'index'
+        experiment.is_exported = True
+        stale = experiment.build_index()
+        election = mapel.generate_ordinal_election(culture_id='ic',
+                                                   num_voters=10,
+                                                   num_candidates=5)
+
+        # the same ids, but other elections: neither the stored nor the built index is used
+        for regenerated in [prepare_experiment(20), experiment]:
+            regenerated.experiment_id = 'index'
+            regenerated.is_imported = True
+            regenerated.add_family(culture_id='ic', size=20, family_id='ic_5_10')
+            distances = sorted(mapel.compute_distance(election, other,
+                                                      distance_id='emd-positionwise')[0]
+                               for other in regenerated.instances.values())
+            nearest = regenerated.query_nearest(election, k=3)
+            assert np.allclose([distance for _, distance in nearest], distances[:3])
+            assert not np.array_equal(regenerated.indexes['emd-positionwise'].thresholds,
+                                      stale.thresholds)
+
+
+class TestCrossDistances:
+
+    @pytest.mark.parametrize("distance_id", ['emd-positionwise', 'l1-bordawise', 'spearman'])
+    def test_cross_distances(self, distance_id):
+
+        experiment = prepare_experiment(4)
+
+        other_experiment = prepare_experiment(3)
+
+        distances = experiment.compute_cross_distances(other_experiment, distance_id=distance_id)
+        assert distances.matrix.shape == (4, 3)
+        for election_id_1 in experiment.instances:
+            for election_id_2 in other_experiment.instances:
+                distance, _ = mapel.compute_distance(experiment.instances[election_id_1],
+                                                     other_experiment.instances[election_id_2],
+                                                     distance_id=distance_id)
+                assert np.isclose(distance, distances[election_id_1][election_id_2])
+
+    def test_import_cross_distances(self, tmp_path, monkeypatch):
+
+        monkeypatch.chdir(tmp_path)
+        experiment = prepare_experiment(4)
+        experiment.experiment_id = 'cross'
+        experiment.is_exported = True
+        other_experiment = prepare_experiment(3)
+        other_experiment.experiment_id = 'other'
+
+        experiment.distances_format = 'npy'
+        experiment.compute_cross_distances(other_experiment, distance_id='l1-bordawise')
+        # the .npy files of the previous run are not used for the .csv format
+        experiment.distances_format = 'csv'
+        other_experiment = prepare_experiment(3)
+        other_experiment.experiment_id = 'other'
+        distances = experiment.compute_cross_distances(other_experiment,
+                                                       distance_id='l1-bordawise')
+        experiment.compute_cross_distances(other_experiment, distance_id='emd-positionwise')
+
+        reopened = mapel.prepare_offline_ordinal_experiment(experiment_id='cross',
+                                                            distance_id='l1-bordawise')
+        assert list(reopened.cross_distances) == ['other']
+        assert reopened.cross_distances['other'].row_ids == list(experiment.instances)
+        assert reopened.cross_distances['other'].column_ids == \
+               list(other_experiment.instances)
+        assert np.allclose(reopened.cross_distances['other'].matrix, distances.matrix)
+
+        imported = reopened.import_cross_distances('other', distance_id='emd-positionwise')
+        assert np.allclose(imported.matrix, experiment.cross_distances['other'].matrix)
+
+
+class TestMultipleProcesses:
+
+    @pytest.mark.parametrize("distance_id", ['emd-positionwise', 'spearman'])
+    def test_multiple_processes_distances(self, distance_id):
+
+        experiment = prepare_experiment(6)
+
+        experiment.compute_distances(distance_id=distance_id)
+        distances = {election_id: dict(row) for election_id, row in experiment.distances.items()}
+
+        experiment.compute_distances(distance_id=distance_id, num_processes=2)
+        for election_id_1 in distances:
+            for election_id_2 in distances[election_id_1]:
+                assert distances[election_id_1][election_id_2] == \
+                       experiment.distances[election_id_1][election_id_2]
+
+    def test_modified_elections(self):
+
+        experiment = prepare_experiment(4, family_id='ic')
+        experiment.compute_distances(distance_id='l1-pairwise', num_processes=2)
+
+        # the workers must not compute on the elections from the previous run
+        experiment.add_family(culture_id='ic', size=4, family_id='ic')
+        experiment.compute_distances(distance_id='l1-pairwise', num_processes=2)
+        distances = experiment.distances.matrix.copy()
+
+        experiment.compute_distances(distance_id='l1-pairwise')
+        assert np.array_equal(distances, experiment.distances.matrix, equal_nan=True)
+
+
+class TestDistanceMatrix:
+
+    def test_distance_matrix_views(self):
+
+        experiment = prepare_experiment(5)
+        experiment.compute_distances(distance_id='emd-positionwise')
+
+        election_ids = list(experiment.instances)
+        matrix = experiment.distances.submatrix(election_ids)
+        assert np.allclose(matrix, matrix.T, equal_nan=True)
+        for i, election_id_1 in enumerate(election_ids):
+            assert election_id_1 not in experiment.distances[election_id_1]
+            for j, election_id_2 in enumerate(election_ids):
+                if i != j:
+                    assert experiment.distances[election_id_1][election_id_2] == matrix[i, j]
+
+    def test_npy_distances(self, tmp_path, monkeypatch):
+
+        monkeypatch.chdir(tmp_path)
+        experiment = prepare_experiment(5)
+        experiment.experiment_id = 'npy'
+        experiment.is_exported = True
+        election_ids = list(experiment.instances)
+
+        # round trip through the .npy files
+        experiment.distances_format = 'npy'
+        experiment.compute_distances(distance_id='swap')
+        distances, times, _, _ = imports.add_distances_to_experiment(experiment)
+        assert np.array_equal(distances.submatrix(election_ids),
+                              experiment.distances.submatrix(election_ids), equal_nan=True)
+        assert np.array_equal(times.submatrix(election_ids),
+                              experiment.times.submatrix(election_ids), equal_nan=True)
+
+        # the .csv file is used if there are no .npy files
+        experiment.distances_format = 'csv'
+        experiment.compute_distances(distance_id='l1-pairwise')
+        experiment.distances_format = 'npy'
+        distances, _, _, _ = imports.add_distances_to_experiment(experiment)
+        expected = experiment.distances.submatrix(election_ids)
+        assert np.allclose(distances.submatrix(election_ids), expected, equal_nan=True)
+
+        # and it can be converted to the .npy files (even if the instances are not loaded)
+        instances, experiment.instances = experiment.instances, {}
+        experiment.convert_distances_to_npy('l1-pairwise')
+        experiment.instances = instances
+        distances, _, _, _ = imports.import_distances_from_npy(experiment, 'l1-pairwise')
+        assert np.allclose(distances.submatrix(election_ids), expected, equal_nan=True)
+
+
+class TestDistanceCache:
+
+    def test_cached_distances(self, tmp_path):
+
+        cache = mapel.enable_distance_cache(str(tmp_path / 'cache.sqlite'))
+        try:
+            experiment = prepare_experiment(4)
+
+            experiment.compute_distances(distance_id='emd-positionwise')
+            distances = experiment.distances.matrix.copy()
+            assert cache.hits == 0 and cache.misses == 6
+
+            experiment.compute_distances(distance_id='emd-positionwise')
+            assert cache.hits == 6 and cache.misses == 0
+            assert np.array_equal(distances, experiment.distances.matrix, equal_nan=True)
+        finally:
+            mapel.disable_distance_cache()
+
+    def test_cache_key(self, tmp_path):
+
+        cache = mapel.enable_distance_cache(str(tmp_path / 'cache.sqlite'))
+        try:
+            experiment = prepare_experiment(4)
+            experiment.compute_distances(distance_id='emd-positionwise')
+
+            # the order of the voters is not a part of the key
+            for election in experiment.instances.values():
+                election.votes = np.random.permutation(election.votes)
+            experiment.compute_distances(distance_id='emd-positionwise')
+            assert cache.hits == 6 and cache.misses == 0
+
+            # the additional arguments are
+            experiment.compute_distances(distance_id='emd-positionwise', param=1)
+            assert cache.hits == 0 and cache.misses == 6
+        finally:
+            mapel.disable_distance_cache()
+
+
+class TestMultipleDistances:
+
+    def test_multiple_distances(self):
+
+        experiment = prepare_experiment(5)
+
+        distance_ids = ['emd-positionwise', 'l1-positionwise', 'l1-bordawise']
+        distances = {}
+        for distance_id in distance_ids:
+            experiment.compute_distances(distance_id=distance_id)
+            distances[distance_id] = experiment.distances.matrix.copy()
+
+        experiment.compute_distances(distance_ids=distance_ids)
+        assert experiment.distance_id == distance_ids[-1]
+        for distance_id in distance_ids:
+            assert np.array_equal(distances[distance_id],
+                                  experiment.distances_by_id[distance_id].matrix,
+                                  equal_nan=True)
+
+
+class TestLazyInstances:
+
+    @pytest.mark.parametrize("distance_id", ['emd-positionwise', 'swap', 'l1-pairwise'])
+    def test_lazy_instances(self, distance_id):
+
+        experiment = prepare_experiment(8)
+        experiment.compute_distances(distance_id=distance_id)
+        distances = experiment.distances.matrix.copy()
+
+        stored = experiment.instances
+        experiment.instances = LazyInstances(stored, lambda election_id: copy.deepcopy(
+            stored[election_id]), max_resident=3)
+        experiment.compute_distances(distance_id=distance_id)
+        assert experiment.instances.num_resident <= 3
+        assert np.array_equal(distances, experiment.distances.matrix, equal_nan=True)
+
+
+class TestDistancesJournal:
+
+    def test_resume_distances(self, tmp_path, monkeypatch):
+
+        monkeypatch.chdir(tmp_path)
+        experiment = prepare_experiment(4)
+        experiment.experiment_id = 'journal'
+        experiment.is_exported = True
+        experiment.compute_distances(distance_id='swap')
+        distances = experiment.distances.matrix.copy()
+
+        # the journal of a crashed run: three pairs and a row not completely written
+        pairs = experiment._get_all_pairs()
+        journal_path = get_journal_path(experiment, 'swap')
+        with DistancesJournal(journal_path) as journal:
+            for election_id_1, election_id_2 in pairs[:3]:
+                journal.append(election_id_1, election_id_2,
+                               experiment.distances[election_id_1][election_id_2], 123.)
+        with open(journal_path, 'a') as journal_file:
+            journal_file.write(f'{pairs[3][0]};{pairs[3][1]};1')
+
+        experiment.compute_distances(distance_id='swap', resume=True)
+
+        assert np.array_equal(distances, experiment.distances.matrix, equal_nan=True)
+        for election_id_1, election_id_2 in pairs[:3]:
+            assert experiment.times[election_id_1][election_id_2] == 123.
+        for election_id_1, election_id_2 in pairs[3:]:
+            assert experiment.times[election_id_1][election_id_2] != 123.
+        assert not os.path.isfile(journal_path)
+
+    def test_truncated_journal(self, tmp_path):
+
+        journal_path = str(tmp_path / 'swap.journal.csv')
+        with DistancesJournal(journal_path) as journal:
+            journal.append('a', 'b', 1., 0.1)
+        with open(journal_path, 'a') as journal_file:
+            journal_file.write('a;c;2')
+        with DistancesJournal(journal_path, resume=True) as journal:
+            journal.append('b', 'c', 3., 0.1)
+
+        assert [row[:3] for row in read_journal(journal_path)] == [('a', 'b', 1.), ('b', 'c', 3.)]
+
+    def test_truncated_mapping(self, tmp_path):
+
+        journal_path = str(tmp_path / 'swap.journal.csv')
+        with DistancesJournal(journal_path) as journal:
+            journal.append('a', 'b', 1., 0.1, matching=[2, 0, 1, 4, 3])
+        with open(journal_path, 'a') as journal_file:
+            journal_file.write('a;c;2.0;0.1;2 0 1 4\r\na;d;2.0;0.1;2 0 1')
+        rows = read_journal(journal_path)
+        assert [row[:3] for row in rows] == [('a', 'b', 1.)]
+        assert np.array_equal(rows[0][4], [2, 0, 1, 4, 3])
+
+        with DistancesJournal(journal_path, resume=True) as journal:
+            journal.append('b', 'c', 3., 0.1, matching=[0, 1, 2, 3, 4])
+        assert [row[:3] for row in read_journal(journal_path)] == [('a', 'b', 1.), ('b', 'c', 3.)]
+
+
+class TestIncrementalDistances:
+
+    def test_incremental_distances(self, monkeypatch):
+
+        experiment = prepare_experiment(3, family_id='old')
+        experiment.compute_distances(distance_id='l1-pairwise')
+        old_ids = list(experiment.instances)
+        old_distances = {(election_id_1, election_id_2):
+                         experiment.distances[election_id_1][election_id_2]
+                         for election_id_1, election_id_2 in experiment._get_all_pairs()}
+
+        experiment.add_family(culture_id='ic', size=2, family_id='new')
+        computed = []
+        compute_distance = metr.compute_distance
+
+        def compute_logged_distance(election_1, election_2, **kwargs):
+            computed.append({election_1.election_id, election_2.election_id})
+            return compute_distance(election_1, election_2, **kwargs)
+
+        monkeypatch.setattr(metr, 'compute_distance', compute_logged_distance)
+        experiment.compute_distances(distance_id='l1-pairwise', incremental=True)
+
+        new_pairs = [{election_id_1, election_id_2}
+                     for election_id_1, election_id_2 in experiment._get_all_pairs()
+                     if election_id_1 not in old_ids or election_id_2 not in old_ids]
+        assert len(computed) == len(new_pairs) == 7
+        assert all(pair in new_pairs for pair in computed)
+        for (election_id_1, election_id_2), distance in old_distances.items():
+            assert experiment.distances[election_id_1][election_id_2] == distance
+        for election_id_1, election_id_2 in experiment._get_all_pairs():
+            distance, _ = compute_distance(experiment.instances[election_id_1],
+                                           experiment.instances[election_id_2],
+                                           distance_id='l1-pairwise')
+            assert experiment.distances[election_id_1][election_id_2] == distance
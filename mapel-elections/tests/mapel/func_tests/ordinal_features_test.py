@@ -3,6 +3,8 @@ import pytest
 import numpy as np
 
 import mapel.elections as mapel
+import mapel.elections.features.diversity as diversity
+from mapel.elections.objects.Election import convert_votes_to_potes
 
 registered_ordinal_features_to_test = {
     'highest_borda_score',
@@ -74,3 +76,76 @@ class TestFeatures:
                                                    num_voters=num_voters,
                                                    num_candidates=num_candidates)
         election.compute_feature(feature_id)
+
+
+class TestWeightedVotes:
+
+    def test_weighted_votes(self):
+
+        distinct_votes = np.array([np.random.permutation(5) for _ in range(3)])
+        votes = distinct_votes[np.random.randint(0, 3, 20)]
+        election = mapel.generate_ordinal_election_from_votes(votes)
+        _, quantites = election.get_distinct_votes()
+        assert sum(quantites) == 20
+
+        vectors = np.zeros([5, 5])
+        for vote in votes:
+            for position, candidate in enumerate(vote):
+                vectors[candidate][position] += 1
+        assert np.array_equal(election.votes_to_positionwise_vectors(), vectors / 20)
+
+        election.compute_feature('vote_dist_mean')
+        distances = diversity.calculate_vote_swap_dist(election)
+        for v1 in range(20):
+            for v2 in range(20):
+                assert (distances[v1][v2] == 0) == np.array_equal(votes[v1], votes[v2])
+
+
+class TestVoteConversions:
+
+    def test_vote_conversions(self):
+
+        votes = np.array([[0, 1, 2], [0, 1, 2], [2, 1, 0]])
+        election = mapel.generate_ordinal_election_from_votes(votes)
+
+        assert np.array_equal(election.compute_potes(), [[0, 1, 2], [0, 1, 2], [2, 1, 0]])
+        assert np.allclose(election.votes_to_positionwise_vectors(),
+                           np.array([[2, 0, 1], [0, 3, 0], [1, 0, 2]]) / 3)
+        assert np.allclose(election.votes_to_pairwise_matrix(),
+                           np.array([[0, 2, 2], [1, 0, 2], [1, 1, 0]]) / 3)
+        assert np.array_equal(election.votes_to_bordawise_vector(), [4, 3, 2])
+
+    def test_truncated_potes(self):
+
+        votes = np.array([[1, -1, -1], [2, 0, -1]])
+
+        assert np.array_equal(convert_votes_to_potes(votes, 3), [[1, 0, 1], [1, 2, 0]])
+
+
+class TestCompactVotes:
+
+    @pytest.mark.parametrize("num_candidates, dtype", [(5, np.int8), (200, np.int16)])
+    def test_compact_votes(self, num_candidates, dtype):
+
+        experiment = mapel.prepare_online_ordinal_experiment()
+        experiment.set_default_num_candidates(num_candidates)
+        experiment.set_default_num_voters(10)
+        experiment.add_family(culture_id='ic', size=2)
+        experiment.compute_distances(distance_id='l1-bordawise')
+
+        for election in experiment.instances.values():
+            election.compute_potes()
+            assert election.votes.dtype == dtype
+            assert election.distinct_votes.dtype == dtype
+            assert election.potes.dtype == dtype
+            assert np.array_equal(np.sort(election.votes, axis=1),
+                                  np.tile(np.arange(num_candidates), (10, 1)))
+
+        report = experiment.memory_report()
+        assert set(report['instances']) == set(experiment.instances)
+        for election_id, election in experiment.instances.items():
+            assert report['instances'][election_id]['votes'] == election.votes.nbytes
+            assert report['instances'][election_id]['potes'] == election.potes.nbytes
+        assert report['distances']['l1-bordawise'] > 0
+        assert report['total'] == sum(report['structures'].values()) + \
+               sum(report['distances'].values())
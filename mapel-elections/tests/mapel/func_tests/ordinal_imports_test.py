@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+
+import numpy as np
+
+import mapel.elections as mapel
+import mapel.elections.persistence.election_archive as election_archive
+from mapel.elections.other.parser import import_preflib_file
+from mapel.elections.persistence.election_archive import ElectionArchive
+
+
+class TestPreflibParser:
+
+    def test_import_preflib_file(self, tmp_path):
+
+        path = tmp_path / 'election.toi'
+        path.write_text('# FILE NAME: election.toi\n'
+                        '# DATA TYPE: toi\n'
+                        '# NUMBER ALTERNATIVES: 3\n'
+                        '# NUMBER VOTERS: 9\n'
+                        '3: 1,{2,3}\n'
+                        '2: 3\n'
+                        '\n'
+                        '1: 2,1,3\n'
+                        '3: 3\n')
+
+        for block_size in [8, 2 ** 16]:
+            metadata, quantities, votes = import_preflib_file(str(path), is_shifted=True,
+                                                              block_size=block_size)
+            assert metadata['data type'] == 'toi'
+            assert quantities.tolist() == [5, 3, 1]
+            assert votes.tolist() == [[2, -1, -1], [0, 1, 2], [1, 0, 2]]
+
+    def test_import_preflib_file_with_ties(self, tmp_path):
+
+        path = tmp_path / 'election.toc'
+        path.write_text('# DATA TYPE: toc\n'
+                        '# NUMBER ALTERNATIVES: 3\n'
+                        '3: 1,{2,3}\n'
+                        '2: {1,2,3}\n'
+                        '1: {2,1},3\n'
+                        '1: 1,2,3\n')
+
+        _, quantities, votes, ties = import_preflib_file(str(path), is_shifted=True,
+                                                         with_ties=True)
+        assert quantities.tolist() == [3, 2, 1, 1]
+        assert votes.tolist() == [[0, 1, 2], [0, 1, 2], [1, 0, 2], [0, 1, 2]]
+        assert ties.tolist() == [[0, 1, 1], [0, 0, 0], [0, 0, 1], [0, 1, 2]]
+
+
+class TestElectionArchive:
+
+    def test_election_archive(self, tmp_path):
+
+        elections = [mapel.generate_ordinal_election(culture_id='ic',
+                                                     num_voters=20,
+                                                     num_candidates=5)
+                     for _ in range(5)]
+        for i, election in enumerate(elections):
+            election.election_id = f'election_{i}'
+
+        path = str(tmp_path / 'elections.npz')
+        ElectionArchive(path, chunk_size=2).append(elections[:3])
+        ElectionArchive(path, chunk_size=2).append(elections[3:])
+
+        archive = ElectionArchive(path)
+        assert len(archive) == 5 and archive.num_chunks == 3
+        for election in elections:
+            data = archive.read(election.election_id)
+            assert data['num_candidates'] == 5 and data['num_voters'] == 20
+            votes = np.repeat(data['distinct_votes'], data['quantities'], axis=0)
+            assert sorted(map(tuple, votes)) == sorted(map(tuple, election.votes))
+
+    def test_interrupted_append(self, tmp_path):
+
+        elections = [mapel.generate_ordinal_election(culture_id='ic',
+                                                     num_voters=20,
+                                                     num_candidates=5)
+                     for _ in range(4)]
+        for i, election in enumerate(elections):
+            election.election_id = f'election_{i}'
+        path = str(tmp_path / 'elections.npz')
+        ElectionArchive(path, chunk_size=2).append(elections[:2])
+
+        def append_and_exit():
+            write_array = election_archive._write_array
+
+            def write_array_and_exit(*args):
+                write_array(*args)
+                os._exit(1)
+
+            election_archive._write_array = write_array_and_exit
+            ElectionArchive(path, chunk_size=2).append(elections[2:])
+
+        process = multiprocessing.get_context('fork').Process(target=append_and_exit)
+        process.start()
+        process.join()
+        assert process.exitcode == 1
+
+        archive = ElectionArchive(path)
+        assert sorted(archive) == ['election_0', 'election_1']
+        for election in elections[:2]:
+            votes = np.repeat(archive.read(election.election_id)['distinct_votes'],
+                              archive.read(election.election_id)['quantities'], axis=0)
+            assert sorted(map(tuple, votes)) == sorted(map(tuple, election.votes))
+
+    def test_archive_experiment(self, tmp_path, monkeypatch):
+
+        monkeypatch.chdir(tmp_path)
+        # the template map.csv lists a family (ic) that has no elections
+        experiment = mapel.prepare_offline_ordinal_experiment(experiment_id='archive')
+        experiment.add_family(culture_id='ic', size=2, family_id='old',
+                              num_candidates=4, num_voters=6)
+        experiment.convert_elections_to_archive()
+
+        experiment = mapel.prepare_offline_ordinal_experiment(experiment_id='archive',
+                                                              elections_format='archive')
+        assert not experiment.instances['ic_0'].is_correct
+        experiment.add_family(culture_id='ic', size=2, family_id='new',
+                              num_candidates=4, num_voters=6)
+        assert sorted(experiment.get_election_archive()) == ['new_0', 'new_1', 'old_0', 'old_1']
+
+        reopened = mapel.prepare_offline_ordinal_experiment(experiment_id='archive',
+                                                            elections_format='archive')
+        for election_id in ['old_0', 'old_1', 'new_0', 'new_1']:
+            assert sorted(map(tuple, reopened.instances[election_id].votes)) == \
+                   sorted(map(tuple, experiment.instances[election_id].votes))
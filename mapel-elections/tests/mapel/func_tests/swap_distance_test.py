@@ -1,3 +1,6 @@
+import pytest
+import numpy as np
+
 import mapel.elections as mapel
 
 
@@ -19,3 +22,68 @@ class TestSwapDistance:
                                                    distance_id='ilp_swap')
 
             assert distance_1 == distance_2, "BF swap distance differs from ILP swap distance"
+
+    def test_bf_vs_bb_swap_distance(self):
+        for _ in range(20):
+            election_1 = mapel.generate_ordinal_election(culture_id='ic',
+                                                         num_voters=6,
+                                                         num_candidates=5)
+            election_2 = mapel.generate_ordinal_election(culture_id='ic',
+                                                         num_voters=6,
+                                                         num_candidates=5)
+
+            for distance_id in ['swap', 'spearman']:
+                distance_1, _ = mapel.compute_distance(election_1, election_2,
+                                                       distance_id=distance_id)
+
+                distance_2, _ = mapel.compute_distance(election_1, election_2,
+                                                       distance_id=f'bb_{distance_id}')
+
+                distance_3, _ = mapel.compute_distance(election_1, election_2,
+                                                       distance_id=f'aa_{distance_id}')
+
+                assert distance_1 == distance_2, "BF distance differs from BB distance"
+                assert distance_1 <= distance_3, "AA distance is not an upper bound"
+
+    @pytest.mark.parametrize("distance_id", ['bb_swap', 'bb_spearman', 'aa_swap', 'aa_spearman'])
+    def test_different_sizes(self, distance_id):
+        election_1 = mapel.generate_ordinal_election(culture_id='ic',
+                                                     num_voters=5,
+                                                     num_candidates=4)
+        election_2 = mapel.generate_ordinal_election(culture_id='ic',
+                                                     num_voters=6,
+                                                     num_candidates=4)
+
+        with pytest.raises(ValueError):
+            mapel.compute_distance(election_1, election_2, distance_id=distance_id)
+
+    @pytest.mark.parametrize("distance_id", ['bb_swap', 'bb_spearman', 'aa_swap', 'aa_spearman'])
+    def test_truncated_votes(self, distance_id):
+        election_1 = mapel.generate_ordinal_election(culture_id='ic',
+                                                     num_voters=5,
+                                                     num_candidates=4)
+        election_2 = mapel.generate_ordinal_election(culture_id='ic',
+                                                     num_voters=5,
+                                                     num_candidates=4)
+        election_2.votes = election_2.votes.copy()
+        election_2.votes[:, -1] = -1
+
+        with pytest.raises(ValueError):
+            mapel.compute_distance(election_1, election_2, distance_id=distance_id)
+
+    def test_isomorphic_pairwise_distance(self):
+        for _ in range(10):
+            election_1 = mapel.generate_ordinal_election(culture_id='ic',
+                                                         num_voters=7,
+                                                         num_candidates=5)
+            election_2 = mapel.generate_ordinal_election(culture_id='ic',
+                                                         num_voters=7,
+                                                         num_candidates=5)
+            relabelling = np.random.permutation(5)
+            election_2.votes = relabelling[np.random.permutation(election_1.votes)]
+            election_2.pairwise_matrix = None
+
+            distance, _ = mapel.compute_distance(election_1, election_2,
+                                                 distance_id='l1-pairwise')
+
+            assert distance == 0
@@ -1,16 +1,16 @@
 #!/usr/bin/env python
 
 
+from functools import partial
 from time import time
 from typing import Callable
 
 import copy
-import os
-import csv
 import numpy as np
 
 from mapel.core.inner_distances import map_str_to_func
 from mapel.core.objects.Experiment import Experiment
+from mapel.core.scheduler import compute_pairs
 from mapel.marriages.distances import main_marriages_distances as mrd
 from mapel.marriages.objects.Marriages import Marriages
 
@@ -75,43 +75,26 @@ def run_single_process(exp: Experiment, instances_ids: list,
 
 
 def run_multiple_processes(exp: Experiment, instances_ids: list,
-                      distances: dict, times: dict, matchings: dict,
-                      printing: bool, t) -> None:
-    """ Single thread for computing distances """
-
-    for instance_id_1, instance_id_2 in instances_ids:
-        if t == 0 and printing:
-            print(instance_id_1, instance_id_2)
-        start_time = time()
-        distance = get_distance(copy.deepcopy(exp.instances[instance_id_1]),
-                                copy.deepcopy(exp.instances[instance_id_2]),
-                                distance_id=copy.deepcopy(exp.distance_id))
-        if type(distance) is tuple:
-            distance, matching = distance
+                           distances: dict, times: dict, matchings: dict,
+                           num_processes: int) -> None:
+    """ Multiple processes (sharing a pool of workers) for computing distances """
+
+    compute_chunk = partial(compute_pairs,
+                            distance_function=get_distance,
+                            distance_id=exp.distance_id)
+
+    scheduler = exp.get_scheduler(num_processes)
+    for instance_id_1, instance_id_2, distance, matching, time_ in \
+            scheduler.map(exp.instances, instances_ids, compute_chunk):
+        if matching is not None:
             matching = np.array(matching)
             matchings[instance_id_1][instance_id_2] = matching
             matchings[instance_id_2][instance_id_1] = np.argsort(matching)
         distances[instance_id_1][instance_id_2] = distance
         distances[instance_id_2][instance_id_1] = distances[instance_id_1][instance_id_2]
-        times[instance_id_1][instance_id_2] = time() - start_time
+        times[instance_id_1][instance_id_2] = time_
         times[instance_id_2][instance_id_1] = times[instance_id_1][instance_id_2]
 
-    if exp.is_exported:
-        _store_distances(exp, instances_ids, distances, times, t)
-
-
-def _store_distances(exp, instances_ids, distances, times, t):
-    """ Store distances to file """
-    file_name = f'{exp.distance_id}_p{t}.csv'
-    path = os.path.join(os.getcwd(), "election", exp.experiment_id, "distances", file_name)
-    with open(path, 'w', newline='') as csv_file:
-        writer = csv.writer(csv_file, delimiter=';')
-        writer.writerow(["instance_id_1", "instance_id_2", "distance", "time"])
-        for election_id_1, election_id_2 in instances_ids:
-            distance = float(distances[election_id_1][election_id_2])
-            time_ = float(times[election_id_1][election_id_2])
-            writer.writerow([election_id_1, election_id_2, distance, time_])
-
 # # # # # # # # # # # # # # # #
 # LAST CLEANUP ON: 13.10.2021 #
 # # # # # # # # # # # # # # # #
@@ -3,13 +3,12 @@ import ast
 import csv
 import itertools
 import os
-from multiprocessing import Process
-from time import sleep
 
+from mapel.core.objects.DistanceMatrix import DistanceMatrix
 from mapel.core.objects.Experiment import Experiment
 from mapel.marriages.objects.MarriagesFamily import MarriagesFamily
 from mapel.marriages.objects.Marriages import Marriages
-import mapel.marriages.distances as metr
+import mapel.marriages.distances_ as metr
 import mapel.marriages.features.basic_features as basic
 import mapel.marriages.features as features
 from mapel.core.persistence.experiment_imports import get_values_from_csv_file
@@ -96,8 +95,8 @@ class MarriagesExperiment(Experiment):
                 instance.votes_to_pairwise_matrix()
 
         matchings = {election_id: {} for election_id in self.instances}
-        distances = {election_id: {} for election_id in self.instances}
-        times = {election_id: {} for election_id in self.instances}
+        distances = DistanceMatrix(self.instances)
+        times = DistanceMatrix(self.instances)
 
         ids = []
         for i, election_1 in enumerate(self.instances):
@@ -108,45 +107,10 @@ class MarriagesExperiment(Experiment):
                 elif i < j:
                     ids.append((election_1, election_2))
 
-        num_distances = len(ids)
-
         if self.experiment_id == 'virtual' or num_processes == 1:
             metr.run_single_process(self, ids, distances, times, matchings, printing)
-
         else:
-            processes = []
-            for t in range(num_processes):
-                print(f'Starting thread: {t}')
-                sleep(0.1)
-                start = int(t * num_distances / num_processes)
-                stop = int((t + 1) * num_distances / num_processes)
-                instances_ids = ids[start:stop]
-
-                process = Process(target=metr.run_multiple_processes, args=(self, instances_ids,
-                                                                            distances, times,
-                                                                            matchings,
-                                                                            printing, t))
-                process.start()
-                processes.append(process)
-
-            for process in processes:
-                process.join()
-
-            distances = {instance_id: {} for instance_id in self.instances}
-            times = {instance_id: {} for instance_id in self.instances}
-            for t in range(num_processes):
-
-                file_name = f'{distance_id}_p{t}.csv'
-                path = os.path.join(os.getcwd(), "election", self.experiment_id, "distances",
-                                    file_name)
-
-                with open(path, 'r', newline='') as csv_file:
-                    reader = csv.DictReader(csv_file, delimiter=';')
-
-                    for row in reader:
-                        distances[row['instance_id_1']][row['instance_id_2']] = float(
-                            row['distance'])
-                        times[row['instance_id_1']][row['instance_id_2']] = float(row['time'])
+            metr.run_multiple_processes(self, ids, distances, times, matchings, num_processes)
 
         if self.is_exported:
             exports.export_distances_to_file(self, distance_id, distances, times)
@@ -23,3 +23,19 @@ class TestMarriagesDistances:
         distance, mapping = mapel.compute_distance(instance_1, instance_2,
                                                    distance_id=distance_id)
         assert type(float(distance)) is float
+
+
+class TestMultipleProcesses:
+
+    def test_multiple_processes_distances(self):
+
+        experiment = mapel.MarriagesExperiment(is_exported=False, is_imported=False)
+        experiment.instances = {f'ic_{i}': mapel.generate_marriages_instance(culture_id='ic',
+                                                                             num_agents=10)
+                                for i in range(5)}
+
+        experiment.compute_distances(distance_id='l1-mutual_attraction')
+        distances = experiment.distances.matrix.copy()
+
+        experiment.compute_distances(distance_id='l1-mutual_attraction', num_processes=2)
+        assert np.array_equal(distances, experiment.distances.matrix, equal_nan=True)
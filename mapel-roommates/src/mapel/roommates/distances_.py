@@ -1,15 +1,15 @@
 #!/usr/bin/env python
 import copy
-import csv
+from functools import partial
 from time import time
 import logging
-import os
 from typing import Callable
 
 import numpy as np
 
 from mapel.core.inner_distances import map_str_to_func
 from mapel.core.objects.Experiment import Experiment
+from mapel.core.scheduler import compute_pairs
 from mapel.roommates.distances import main_distances as mrd
 from mapel.roommates.objects.Roommates import Roommates
 
@@ -51,8 +51,7 @@ def run_single_thread(experiment: Experiment,
                       thread_ids: list,
                       distances: dict,
                       times: dict,
-                      matchings: dict,
-                      t) -> None:
+                      matchings: dict) -> None:
     """ Single thread for computing distances """
     for election_id_1, election_id_2 in thread_ids:
         start_time = time()
@@ -71,21 +70,28 @@ def run_single_thread(experiment: Experiment,
         times[election_id_1][election_id_2] = time() - start_time
         times[election_id_2][election_id_1] = times[election_id_1][election_id_2]
 
-    if experiment.is_exported:
-
-        file_name = f'{experiment.distance_id}_p{t}.csv'
-        path = os.path.join(os.getcwd(), "election", experiment.experiment_id, "distances",
-                            file_name)
-
-        with open(path, 'w', newline='') as csv_file:
-            writer = csv.writer(csv_file, delimiter=';')
-            writer.writerow(
-                ["instance_id_1", "instance_id_2", "distance", "time"])
-
-            for election_id_1, election_id_2 in thread_ids:
-                distance = float(distances[election_id_1][election_id_2])
-                time_ = float(times[election_id_1][election_id_2])
-                writer.writerow([election_id_1, election_id_2, distance, time_])
+def run_multiple_threads(experiment: Experiment,
+                         instances_ids: list,
+                         distances: dict,
+                         times: dict,
+                         matchings: dict,
+                         num_threads: int) -> None:
+    """ Multiple processes (sharing a pool of workers) for computing distances """
+    compute_chunk = partial(compute_pairs,
+                            distance_function=get_distance,
+                            distance_id=experiment.distance_id)
+
+    scheduler = experiment.get_scheduler(num_threads)
+    for election_id_1, election_id_2, distance, matching, time_ in \
+            scheduler.map(experiment.instances, instances_ids, compute_chunk):
+        if matching is not None:
+            matching = np.array(matching)
+            matchings[election_id_1][election_id_2] = matching
+            matchings[election_id_2][election_id_1] = np.argsort(matching)
+        distances[election_id_1][election_id_2] = distance
+        distances[election_id_2][election_id_1] = distances[election_id_1][election_id_2]
+        times[election_id_1][election_id_2] = time_
+        times[election_id_2][election_id_1] = times[election_id_1][election_id_2]
 
 # # # # # # # # # # # # # # # #
 # LAST CLEANUP ON: 13.10.2021 #
@@ -3,10 +3,9 @@ import ast
 import copy
 import csv
 import itertools
-from multiprocessing import Process
-from time import sleep
 import time
 
+from mapel.core.objects.DistanceMatrix import DistanceMatrix
 from mapel.core.objects.Experiment import Experiment
 from mapel.roommates.objects.RoommatesFamily import RoommatesFamily
 from mapel.roommates.objects.Roommates import Roommates
@@ -136,8 +135,8 @@ class RoommatesExperiment(Experiment):
                 instance.votes_to_pairwise_matrix()
 
         matchings = {instance_id: {} for instance_id in self.instances}
-        distances = {instance_id: {} for instance_id in self.instances}
-        times = {instance_id: {} for instance_id in self.instances}
+        distances = DistanceMatrix(self.instances)
+        times = DistanceMatrix(self.instances)
 
         ids = []
         for i,instance_1 in enumerate(self.instances):
@@ -148,43 +147,10 @@ class RoommatesExperiment(Experiment):
                 elif i < j:
                     ids.append((instance_1, instance_2))
 
-        num_distances = len(ids)
-        processes =[]
-
-        for t in range(num_threads):
-            print(f'Starting thread: {t}')
-            sleep(0.1)
-            start = int(t * num_distances / num_threads)
-            stop = int((t + 1) * num_distances / num_threads)
-            thread_ids = ids[start:stop]
-
-            process = Process(target=metr.run_single_thread, args=(self,
-                                                                   thread_ids,
-                                                                     distances,
-                                                                   times,
-                                                                   matchings,
-                                                                     t ))
-
-            process.start()
-            processes.append(process)
-
-        for process in processes:
-            process.join()
-
-        distances = {instance_id: {} for instance_id in self.instances}
-        times = {instance_id: {} for instance_id in self.instances}
-        for t in range(num_threads):
-
-            file_name = f'{distance_id}_p{t}.csv'
-            path = os.path.join(os.getcwd(), "election", self.experiment_id, "distances",
-                                file_name)
-
-            with open(path, 'r', newline='') as csv_file:
-                reader = csv.DictReader(csv_file, delimiter=';')
-
-                for row in reader:
-                    distances[row['instance_id_1']][row['instance_id_2']] = float(row['distance'])
-                    times[row['instance_id_1']][row['instance_id_2']] = float(row['time'])
+        if num_threads == 1:
+            metr.run_single_thread(self, ids, distances, times, matchings)
+        else:
+            metr.run_multiple_threads(self, ids, distances, times, matchings, num_threads)
 
         if self.is_exported:
 